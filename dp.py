@@ -1,6 +1,42 @@
 #!/usr/bin/env python3
 import numpy as np
 
+from dp_band import BandedScoreMatrix
+from dp_cache import BoundedCache, recursion_limit
+from dp_sequence import DnaSequence, get_sigma_profile
+from dp_shared import (
+    STRIPED_DTYPES,
+    STRIPED_LANES,
+    AlignmentResultMethods,
+    chain_local_gaps,
+    chain_striped_gaps,
+    get_impossible_score,
+    get_linear_actions_from_score_matrix,
+    get_linear_gap_offsets,
+    get_linear_score_dtype,
+    get_previous_positions,
+    get_rest_bound,
+    get_striped_dtype,
+    get_striped_values,
+)
+
+# Largest score matrix the Hirschberg engine fills directly instead of splitting the alignment in half
+HIRSCHBERG_TABLE_CELLS = 1 << 14
+
+
+# Actions in the order of their 2-bit codes in the direction matrix of the table engine
+DIRECTION_ACTIONS = ("deletion", "insertion", "match")
+
+# Bit shift of each of the four cells packed into a byte of the direction matrix
+DIRECTION_SHIFTS = np.arange(0, 8, 2, dtype=np.uint8)
+
+# Ends of the DNA sequences whose gaps can be made free, where a leading gap skips the terms of a DNA sequence before the
+# alignment starts and a trailing gap skips the terms after it ends
+FREE_END_GAPS = ("leading_1", "trailing_1", "leading_2", "trailing_2")
+
+# Engines that can fill the score matrix
+ENGINES = ("recursive", "memoized", "table", "hirschberg", "wavefront", "striped")
+
 
 # Main function to simplify Pairwise Alignment Code
 def main():
@@ -42,54 +78,158 @@ def main():
 
 
 # Class Definition for the Pairwise Alignment functions
-class PairwiseAlignment:
+class PairwiseAlignment(AlignmentResultMethods):
     # Init function that globalizes the delta, sigma_array, and dna_sequence variables
-    def __init__(self, sigma_array: np.array, delta: int, dna_sequence_1: list, dna_sequence_2: list):
+    def __init__(
+        self,
+        sigma_array: np.array,
+        delta: int,
+        dna_sequence_1: list,
+        dna_sequence_2: list,
+        engine: str = "recursive",
+        cache_size: int = None,
+        cache_policy: str = "lru",
+        track_memory: bool = False,
+        band: int = None,
+        x_drop: int = None,
+        mode: str = "global",
+        free_end_gaps: tuple = (),
+        min_score: int = None,
+    ):
         self.delta = delta
         self.sigma_array = sigma_array
-        self.dna_sequence_1 = []
-        for term in dna_sequence_1:
-            self.dna_sequence_1.append(term)
-        self.dna_sequence_2 = []
-        for term in dna_sequence_2:
-            self.dna_sequence_2.append(term)
+        self.engine = engine
+        self.track_memory = track_memory
+        self.band = band
+        self.x_drop = x_drop
+        self.mode = mode
+        self.free_end_gaps = tuple(free_end_gaps)
+        self.min_score = min_score
+        self.cache = BoundedCache(cache_size, cache_policy)
+        self.stats = {}
+
+        # Store the DNA sequences as arrays of codes, where a DnaSequence is used without copying it
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.dna_sequence_2 = DnaSequence(dna_sequence_2)
 
     def pairwise_alignment(self):
-        # Instantiate the top and bottom alignment strings
-        top_pairwise_alignment = ""
-        bottom_pairwise_alignment = ""
-
-        # Create copies of the DNA sequence arrays in order to modify them
-        dna_sequence_1 = self.dna_sequence_1[:]
-        dna_sequence_2 = self.dna_sequence_2[:]
-
-        # Get the actions to produce the optimal alignment and the corresponding score
-        score, actions = self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
-
-        # Iterate for each action
-        for action in actions:
-            # Logic for a "deletion"
-            if action == "deletion":
-                # Add the current value from the first DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + "_"
-
-            # Logic for an "insertion"
-            elif action == "insertion":
-                # Add the current value from the second DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + "_"
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
-
-            # Logic for a "match"
-            elif action == "match":
-                # Add the current value from the first and second DNA sequences to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
-
-        # Concentrate the top and bottom alignments to get the final pairwise alignment
-        pairwise_alignment = top_pairwise_alignment + "\n" + bottom_pairwise_alignment
-
-        return pairwise_alignment, score, actions
+        # Align the DNA sequences and render the alignment from the run-length actions in time linear in its length
+        alignment_result = self.alignment_result()
+
+        return str(alignment_result), alignment_result.score, alignment_result.get_actions()
+
+    # Function that calculates only the optimal score, keeping two rows of the score matrix at a time, since every engine
+    # fills the same score matrix
+    def score_only(self):
+        self.check_alignment_options()
+
+        # The local mode needs the whole score matrix to find its best cell, and the band and X-drop modes only fill the
+        # cells near the diagonal, so both keep the cells of the table engine
+        if self.mode != "global" or self.band is not None or self.x_drop is not None:
+            return self.get_score_and_actions()[0]
+
+        # Free end gaps change the base cases and the cell where the alignment ends, so the rows keep running along the first
+        # DNA sequence and the last column is kept along with the last row
+        if len(self.free_end_gaps) > 0:
+            score_row, last_column = self.get_last_score_row_and_column(
+                self.get_sigma_indices(self.dna_sequence_1), self.get_sigma_indices(self.dna_sequence_2)
+            )
+            if score_row is None:
+                return None
+            return self.get_end_cell(score_row, last_column)[2]
+
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        sigma_array = np.asarray(self.sigma_array)
+
+        # Make the rows run along the shorter DNA sequence; swapping the DNA sequences swaps insertions and deletions,
+        # which score the same, and transposes the sigma array
+        if len(indices_2) > len(indices_1):
+            indices_1, indices_2 = indices_2, indices_1
+            sigma_array = sigma_array.T
+
+        score_row = self.get_last_score_row(indices_1, indices_2, sigma_array)
+        return None if score_row is None else score_row[-1]
+
+    # Check that the free end gaps are known ends and that the table engine is used without an X-drop, which assumes that
+    # every alignment starts from the first cell
+    def check_free_end_gaps(self):
+        unknown_ends = [end for end in self.free_end_gaps if end not in FREE_END_GAPS]
+        if len(unknown_ends) > 0:
+            raise ValueError(f"Unknown free end gaps {unknown_ends}, expected any of {', '.join(FREE_END_GAPS)}")
+        if self.engine != "table" or self.x_drop is not None:
+            raise ValueError(f"Free end gaps need the 'table' engine without an X-drop, got '{self.engine}'")
+
+    # Check that the engine, the mode, and the options can be used together, so that the full alignment and the score alone
+    # reject the same combinations
+    def check_alignment_options(self):
+        # The minimum score is checked against each row of the table engine as the rows are filled
+        if self.min_score is not None and (
+            self.mode != "global" or self.engine != "table" or self.band is not None or self.x_drop is not None
+        ):
+            raise ValueError(
+                f"A minimum score needs the 'table' engine in the global mode without a band or X-drop, got '{self.engine}'"
+            )
+
+        # The local mode fills its own score matrix on the table engine, where every cell can start an alignment
+        if self.mode == "local":
+            if self.engine != "table" or self.band is not None or self.x_drop is not None or len(self.free_end_gaps) > 0:
+                raise ValueError(
+                    f"The local mode needs the 'table' engine without a band, X-drop, or free end gaps, got '{self.engine}'"
+                )
+        elif self.mode != "global":
+            raise ValueError(f"Unknown mode '{self.mode}', expected 'global' or 'local'")
+
+        # Free end gaps change the base cases and the cell where the table engine's traceback starts
+        if len(self.free_end_gaps) > 0:
+            self.check_free_end_gaps()
+
+        # The band and X-drop modes only limit the cells the table engine fills
+        if (self.band is not None or self.x_drop is not None) and self.engine != "table":
+            raise ValueError(f"The band and X-drop modes need the 'table' engine, got '{self.engine}'")
+
+        # Every other engine fills the same score matrix in its own order
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{self.engine}', expected any of {', '.join(ENGINES)}")
+
+    # Function that runs the selected engine on the full DNA sequences
+    def get_score_and_actions(self):
+        self.check_alignment_options()
+
+        # The local mode fills its own score matrix, where every cell can start an alignment
+        if self.mode == "local":
+            return self.get_score_and_actions_from_local()
+
+        # The band and X-drop modes only limit the cells the table engine fills
+        if self.band is not None or self.x_drop is not None:
+            return self.get_score_and_actions_from_band()
+
+        # The recursive engine is the reference formulation and is only practical for short sequences
+        if self.engine == "recursive":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
+
+        # The memoized engine keeps the recursive formulation but caches each pair of prefix lengths
+        elif self.engine == "memoized":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_memo()
+
+        # The table engine fills the score matrix from the bottom up
+        elif self.engine == "table":
+            return self.get_score_and_actions_from_table()
+
+        # The Hirschberg engine only keeps a few rows of the score matrix at a time
+        elif self.engine == "hirschberg":
+            return self.get_score_and_actions_from_hirschberg()
+
+        # The wavefront engine fills the score matrix one anti-diagonal at a time
+        elif self.engine == "wavefront":
+            return self.get_score_and_actions_from_wavefront()
+
+        # The striped engine fills the score matrix one column at a time with the first DNA sequence striped across lanes
+        elif self.engine == "striped":
+            return self.get_score_and_actions_from_striped()
 
     # Function that calculates the optimal actions and score of the optimal actions with Dynamic Programming
     def get_score_and_actions_from_dp(self, dna_sequence_1, dna_sequence_2):
@@ -144,7 +284,7 @@ class PairwiseAlignment:
             # Calculate the values of the deletion, insertion, and match actions by adding the delta or sigma value
             deletion = recursive_deletion + self.delta
             insertion = recursive_insertion + self.delta
-            match = recursive_match + self.compute_sigma(dna_sequence_1[-1], dna_sequence_2[-1])
+            match = recursive_match + self.get_sigma_value(len(dna_sequence_1), len(dna_sequence_2))
 
             # Find the maximum action
             max_value = max(deletion, insertion, match)
@@ -168,19 +308,824 @@ class PairwiseAlignment:
 
             return max_value, max_prev_actions
 
-    # Compute the sigma value by stripping the corresponding value from the sigma array
-    def compute_sigma(self, l1, l2):
-        # Define a set to use for indexing the sigma array
-        indexing = {"A": 0, "C": 1, "G": 2, "T": 3}
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with memoized recursion
+    def get_score_and_actions_from_memo(self):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(self.dna_sequence_1)
+        dna_size_2 = len(self.dna_sequence_2)
+
+        # The recursion goes at most one level deeper for each DNA term
+        with recursion_limit(dna_size_1 + dna_size_2 + 100):
+            score, _ = self.get_score_and_action_from_memo(dna_size_1, dna_size_2)
+
+            # Follow the last action of each pair of prefix lengths back to the base case
+            actions = []
+            i = dna_size_1
+            j = dna_size_2
+            while i != 0 and j != 0:
+                _, action = self.get_score_and_action_from_memo(i, j)
+                actions.append(action)
+                if action != "insertion":
+                    i -= 1
+                if action != "deletion":
+                    j -= 1
+
+        # Add the base case actions for the remaining terms and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return score, actions
+
+    # Function that calculates the optimal score and last action for the first i and j terms of the DNA sequences
+    def get_score_and_action_from_memo(self, i, j):
+        # If either of the prefixes are empty, we have hit the base case
+        if i == 0:
+            return self.delta * j, "insertion"
+        if j == 0:
+            return self.delta * i, "deletion"
+
+        # Return the cached result if this pair of prefixes was already solved
+        result = self.cache.get((i, j))
+        if result is not None:
+            return result
+
+        # Use recursion on the shorter prefixes to calculate the value of each action
+        deletion = self.get_score_and_action_from_memo(i - 1, j)[0] + self.delta
+        insertion = self.get_score_and_action_from_memo(i, j - 1)[0] + self.delta
+        match = self.get_score_and_action_from_memo(i - 1, j - 1)[0] + self.get_sigma_value(i, j)
+
+        # Find the maximum action; prioritizes match actions, then insertion actions, like the recursion
+        max_value = max(deletion, insertion, match)
+        if match == max_value:
+            result = (max_value, "match")
+        elif insertion == max_value:
+            result = (max_value, "insertion")
+        else:
+            result = (max_value, "deletion")
+
+        self.cache.put((i, j), result)
+
+        return result
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with a score matrix
+    def get_score_and_actions_from_table(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # Fill the score rows while recording the direction of every cell, then walk the directions back once from the cell
+        # where the alignment ends
+        score_row, direction_matrix, last_column = self.get_direction_matrix(indices_1, indices_2)
+        if score_row is None:
+            return None, []
+        i, j, score = self.get_end_cell(score_row, last_column)
+        actions = self.get_actions_from_direction_matrix(direction_matrix, i, j)
+
+        # A free trailing gap skips the rest of a DNA sequence after the end cell
+        actions.extend(["deletion"] * (len(indices_1) - i))
+        actions.extend(["insertion"] * (len(indices_2) - j))
+
+        return score, actions
+
+    # Function that calculates the optimal actions and score like the table engine, but only fills the cells inside the band
+    # around the main diagonal that the X-drop keeps
+    def get_score_and_actions_from_band(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # Fill the cells of the score matrix inside the band and the X-drop
+        score_matrix = self.get_banded_score_matrix(indices_1, indices_2)
+        self.stats["cells_computed"] = score_matrix.cells
+
+        # If the X-drop pruned every path to the last cell, fall back to the full score matrix
+        if not score_matrix.is_computed(len(indices_1), len(indices_2)):
+            score_matrix = self.get_score_matrix(indices_1, indices_2)
+            self.stats["cells_computed"] += score_matrix.size
+            self.stats["band_constrained"] = True
+            return score_matrix[-1, -1], self.get_actions_from_score_matrix(score_matrix, indices_1, indices_2)
+
+        # Trace the optimal actions back through the cells that were filled from the cell where the alignment ends, which is
+        # the last cell unless there is a free trailing gap, and check whether they touch a cell that was not
+        last_row = np.array([score_matrix[len(indices_1), j] for j in range(len(indices_2) + 1)])
+        last_column = np.array([score_matrix[i, len(indices_2)] for i in range(len(indices_1) + 1)])
+        i, j, score = self.get_end_cell(last_row, last_column)
+        actions = self.get_actions_from_score_matrix(score_matrix, indices_1[:i], indices_2[:j])
+        self.stats["band_constrained"] = self.is_band_constrained(score_matrix, len(indices_1), len(indices_2), score)
+
+        # A free trailing gap skips the rest of a DNA sequence after the end cell
+        actions.extend(["deletion"] * (len(indices_1) - i))
+        actions.extend(["insertion"] * (len(indices_2) - j))
+
+        return score, actions
+
+    # Yield the local alignments one after another as their score, actions, start cell, and best cell, where the cells of
+    # each alignment are blocked before the next one is found
+    def iter_local_alignments(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        dtype = self.get_score_dtype()
+
+        # Column j of the sigma rows holds the sigma values against term j of the second DNA sequence, where the first column
+        # has no term to match
+        sigma_profile = get_sigma_profile(self.sigma_array, indices_2)
+        sigma_rows = np.full((len(sigma_profile), len(indices_2) + 1), get_impossible_score(dtype), dtype=dtype)
+        sigma_rows[:, 1:] = sigma_profile
+
+        # Fill every row of the score matrix, keeping the best score of each row so the best cell is found without a scan
+        score_matrix = np.empty((len(indices_1) + 1, len(indices_2) + 1), dtype=dtype)
+        blocked_cells = np.zeros(score_matrix.shape, dtype=bool)
+        row_maxima = np.empty(len(score_matrix), dtype=dtype)
+        for i in range(len(score_matrix)):
+            self.fill_local_score_row(score_matrix, blocked_cells, i, 0, sigma_rows, indices_1)
+            row_maxima[i] = score_matrix[i].max()
+        self.stats["cells_computed"] = score_matrix.size
+
+        # Take the best cell that is left until no cell is above zero
+        while True:
+            i = int(np.argmax(row_maxima))
+            j = int(np.argmax(score_matrix[i]))
+            if not score_matrix[i, j] > 0:
+                return
+            actions, cells, start_cell = self.get_actions_from_local_score_matrix(
+                score_matrix, blocked_cells, sigma_rows, indices_1, i, j
+            )
+            yield score_matrix[i, j], actions, start_cell, (i, j)
+
+            self.refill_local_score_matrix(score_matrix, blocked_cells, cells, sigma_rows, indices_1, row_maxima)
+
+    # Block the cells of a local alignment and fill again the cells that depend on them, which are below them and to their
+    # right, stopping at the first row below the alignment that is left unchanged
+    def refill_local_score_matrix(self, score_matrix, blocked_cells, cells, sigma_rows, indices_1, row_maxima):
+        # Find the first blocked column of each row of the alignment, whose rows follow one another
+        blocked_starts = {}
+        for i, j in cells:
+            blocked_cells[i, j] = True
+            blocked_starts[i] = min(j, blocked_starts.get(i, j))
+
+        # A row is filled again from its first blocked column or from the first column that changed in the row above, since a
+        # change only reaches the cell below it, the cell below and to its right, and the insertions that chain from those
+        changed_start = None
+        for i in range(min(blocked_starts), len(score_matrix)):
+            starts = [start for start in (changed_start, blocked_starts.get(i)) if start is not None]
+            if len(starts) == 0:
+                break
+            start = min(starts)
+            changed_columns = self.fill_local_score_row(score_matrix, blocked_cells, i, start, sigma_rows, indices_1)
+            self.stats["cells_computed"] += score_matrix.shape[1] - start
+            row_maxima[i] = score_matrix[i].max()
+            changed_start = start + int(changed_columns[0]) if len(changed_columns) > 0 else None
+
+    # Fill row i of a local score matrix from the start column on, where every cell can also start an alignment with a score
+    # of zero and the blocked cells are held at zero, and return the columns from the start whose score changed
+    def fill_local_score_row(self, score_matrix, blocked_cells, i, start, sigma_rows, indices_1):
+        impossible = get_impossible_score(score_matrix.dtype)
+        columns = slice(start, None)
+
+        # A match or a deletion only depends on the row above, where the first row has no row above it
+        if i == 0:
+            current_row = np.zeros(score_matrix.shape[1] - start, dtype=score_matrix.dtype)
+        else:
+            previous_row = score_matrix[i - 1]
+            diagonal_row = np.concatenate(([impossible], previous_row[:-1]))
+            current_row = np.maximum(
+                previous_row[columns] + self.delta, diagonal_row[columns] + sigma_rows[indices_1[i - 1], columns]
+            )
+            np.maximum(current_row, 0, out=current_row)
+
+        # Insertions chain along the row from the cell before the start, but never through a blocked cell
+        first_value = score_matrix[i, start - 1] if start != 0 else impossible
+        current_row = chain_local_gaps(current_row, first_value, self.delta, blocked_cells[i, columns], 0)
+
+        changed_columns = np.flatnonzero(current_row != score_matrix[i, columns])
+        score_matrix[i, columns] = current_row
+
+        return changed_columns
+
+    # Trace the actions of a local alignment back from a cell of a local score matrix, breaking ties like the table engine,
+    # until starting over is as good as every action or a blocked cell is reached; return the actions, the cells they align
+    # from the last one back, and the cell the alignment starts at
+    def get_actions_from_local_score_matrix(self, score_matrix, blocked_cells, sigma_rows, indices_1, i, j):
+        impossible = get_impossible_score(score_matrix.dtype)
+        actions = []
+        cells = []
+        while not blocked_cells[i, j]:
+            # Recompute the value of each action into the current cell
+            deletion = score_matrix[i - 1, j] + self.delta if i != 0 else impossible
+            insertion = score_matrix[i, j - 1] + self.delta if j != 0 else impossible
+            match = score_matrix[i - 1, j - 1] + sigma_rows[indices_1[i - 1], j] if i != 0 and j != 0 else impossible
+            max_value = max(deletion, insertion, match)
+            if max_value <= 0:
+                break
+
+            # Prioritize match actions, then insertion actions, then deletion actions
+            cells.append((i, j))
+            if match == max_value:
+                actions.append("match")
+                i -= 1
+                j -= 1
+            elif insertion == max_value:
+                actions.append("insertion")
+                j -= 1
+            else:
+                actions.append("deletion")
+                i -= 1
+
+        actions.reverse()
+
+        return actions, cells, (i, j)
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp along anti-diagonals
+    def get_score_and_actions_from_wavefront(self):
+        # Convert the DNA sequences to sigma array indices so a whole anti-diagonal of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # Fill the score matrix and trace the optimal actions back through it like the table engine
+        score_matrix = self.get_score_matrix_by_wavefront(indices_1, indices_2)
+        actions = self.get_actions_from_score_matrix(score_matrix, indices_1, indices_2)
+
+        return score_matrix[-1, -1], actions
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with a striped query
+    def get_score_and_actions_from_striped(self):
+        # Convert the DNA sequences to sigma array indices so the query profile can be built at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # Fill the score matrix and trace the optimal actions back through it like the table engine
+        score_matrix = self.get_score_matrix_by_striping(indices_1, indices_2)
+        actions = self.get_actions_from_score_matrix(score_matrix, indices_1, indices_2)
+
+        return score_matrix[-1, -1], actions
+
+    # Function that calculates the same optimal actions and score in linear space by splitting the alignment in half
+    def get_score_and_actions_from_hirschberg(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # Build the actions half by half
+        actions = []
+        score = self.align_with_hirschberg(indices_1, indices_2, actions)
+
+        return score, actions
+
+    # Append the optimal actions for two DNA sequences to the running list of actions and return their score
+    def align_with_hirschberg(self, indices_1, indices_2, actions):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # Small alignments and alignments with a single row use a score matrix, which only takes linear space here
+        if dna_size_1 <= 1 or (dna_size_1 + 1) * (dna_size_2 + 1) <= HIRSCHBERG_TABLE_CELLS:
+            score_matrix = self.get_score_matrix(indices_1, indices_2)
+            actions.extend(self.get_actions_from_score_matrix(score_matrix, indices_1, indices_2))
+            return score_matrix[-1, -1]
+
+        # Fill the score rows down to the middle row, then keep filling while tracking for every cell the column where
+        # its traceback crosses the middle row, which gives a cell of the optimal traceback to split the alignment at
+        middle = dna_size_1 // 2
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.get_gap_offsets(dna_size_2)
+        score_row = self.get_last_score_row(indices_1[:middle], indices_2, np.asarray(self.sigma_array))
+        crossing_row = np.arange(dna_size_2 + 1)
+        for index_1 in indices_1[middle:]:
+            score_row, crossing_row = self.get_next_score_and_crossing_row(
+                score_row, crossing_row, sigma_rows[index_1], gap_offsets
+            )
+        split = int(crossing_row[-1])
+
+        # Align each half on its own, in order, so the actions stay in order
+        self.align_with_hirschberg(indices_1[:middle], indices_2[:split], actions)
+        self.align_with_hirschberg(indices_1[middle:], indices_2[split:], actions)
+
+        return score_row[-1]
+
+    # Compute a row of the score matrix and the column where the traceback from each of its cells crosses the middle row
+    def get_next_score_and_crossing_row(self, previous_row, previous_crossing_row, sigma_row, gap_offsets):
+        current_row = self.get_next_score_row(previous_row, sigma_row, gap_offsets)
+
+        # Recompute the value of each action into every cell and make the same choice as the traceback
+        deletions = previous_row[1:] + self.delta
+        insertions = current_row[:-1] + self.delta
+        matches = previous_row[:-1] + sigma_row
+        max_values = np.maximum(np.maximum(deletions, insertions), matches)
+        is_match = matches == max_values
+        is_insertion = insertions == max_values
+        is_insertion &= ~is_match
+
+        # Matches and deletions cross where the cell they come from in the previous row crosses
+        crossing_row = np.empty_like(previous_crossing_row)
+        crossing_row[0] = previous_crossing_row[0]
+        np.copyto(crossing_row[1:], previous_crossing_row[1:])
+        np.copyto(crossing_row[1:], previous_crossing_row[:-1], where=is_match)
+
+        # Insertions cross where the nearest cell to their left that is not an insertion crosses
+        sources = np.arange(len(crossing_row))
+        sources[1:][is_insertion] = 0
+        np.maximum.accumulate(sources, out=sources)
+
+        return current_row, crossing_row[sources]
+
+    # Fill the score matrix for two DNA sequences, where each cell is the optimal score of a pair of prefixes
+    def get_score_matrix(self, indices_1, indices_2):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.get_gap_offsets(len(indices_2))
+
+        # The first row and column are the recursive base cases
+        score_matrix = np.empty((len(indices_1) + 1, len(indices_2) + 1), dtype=gap_offsets.dtype)
+        score_matrix[0] = gap_offsets
+
+        # Fill the score matrix row by row
+        for i in range(1, len(indices_1) + 1):
+            score_matrix[i] = self.get_next_score_row(score_matrix[i - 1], sigma_rows[indices_1[i - 1]], gap_offsets)
+
+        return score_matrix
+
+    # Fill the score matrix two rows at a time, keeping only the action that reaches each cell as a 2-bit direction, four
+    # cells to a byte, and return the last score row along with the direction matrix
+    def get_direction_matrix(self, indices_1, indices_2):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.get_gap_offsets(len(indices_2))
+        free_start = "leading_1" in self.free_end_gaps
+
+        # The first row is reached by insertions, and the first column by deletions
+        direction_matrix = np.empty((len(indices_1) + 1, -(-(len(indices_2) + 1) // 4)), dtype=np.uint8)
+        directions = np.full(len(indices_2) + 1, DIRECTION_ACTIONS.index("insertion"), dtype=np.uint8)
+        directions[0] = DIRECTION_ACTIONS.index("deletion")
+        direction_matrix[0] = self.pack_directions(directions, direction_matrix.shape[1])
+
+        # Fill the score rows row by row and record the directions and the last cell of each row
+        score_row = self.get_first_score_row(gap_offsets)
+        last_column = np.empty(len(indices_1) + 1, dtype=score_row.dtype)
+        last_column[0] = score_row[-1]
+        for i in range(1, len(indices_1) + 1):
+            if not self.can_reach_min_score(score_row, i - 1, len(indices_1), last_column):
+                return None, None, None
+            previous_row = score_row
+            score_row = self.get_next_score_row(previous_row, sigma_rows[indices_1[i - 1]], gap_offsets, free_start)
+            directions = self.get_directions(previous_row, score_row, sigma_rows[indices_1[i - 1]])
+            direction_matrix[i] = self.pack_directions(directions, direction_matrix.shape[1])
+            last_column[i] = score_row[-1]
+        if not self.can_reach_min_score(score_row, len(indices_1), len(indices_1), last_column):
+            return None, None, None
+
+        return score_row, direction_matrix, last_column
+
+    # Find the action that reaches each cell of a score row, breaking ties in the same order as the recursion
+    def get_directions(self, previous_row, score_row, sigma_row):
+        # Recompute the value of each action into the cells after the first column, which is reached by a deletion
+        deletion = previous_row[1:] + self.delta
+        insertion = score_row[:-1] + self.delta
+        match = previous_row[:-1] + sigma_row
+        max_values = np.maximum(np.maximum(deletion, insertion), match)
+
+        # Prioritize match actions, then insertion actions, then deletion actions, which is the largest code of the actions
+        # that reach the maximum
+        directions = np.zeros(len(score_row), dtype=np.uint8)
+        np.maximum((match == max_values).view(np.uint8) << 1, (insertion == max_values).view(np.uint8), out=directions[1:])
+
+        return directions
+
+    # Pack a row of 2-bit directions into bytes, four cells to a byte with the first cell in the lowest bits
+    def pack_directions(self, directions, packed_size):
+        padded_directions = np.zeros(4 * packed_size, dtype=np.uint8)
+        padded_directions[: len(directions)] = directions
+        cells = padded_directions.reshape(-1, 4) << DIRECTION_SHIFTS
+        return cells[:, 0] | cells[:, 1] | cells[:, 2] | cells[:, 3]
+
+    # Walk the directions back from the last cell of a direction matrix to rebuild the optimal actions
+    def get_actions_from_direction_matrix(self, direction_matrix, i, j):
+        actions = []
+        while i != 0 and j != 0:
+            action = DIRECTION_ACTIONS[(direction_matrix[i, j >> 2] >> DIRECTION_SHIFTS[j & 3]) & 3]
+            actions.append(action)
+            if action != "insertion":
+                i -= 1
+            if action != "deletion":
+                j -= 1
+
+        # Add the base case actions for the remaining terms and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return actions
+
+    # Fill the cells of the score matrix inside the band of diagonals around the main diagonal that the X-drop keeps, which
+    # trims each row to the cells between the first and last cells that are not more than X below the best score so far
+    def get_banded_score_matrix(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        gap_offsets = self.get_gap_offsets(dna_size_2)
+        impossible = get_impossible_score(gap_offsets.dtype)
+
+        # Column j of the sigma rows holds the sigma values against term j - 1, and the first column has no match
+        sigma_array = np.asarray(self.sigma_array)
+        sigma_rows = np.zeros((sigma_array.shape[0], dna_size_2 + 1), dtype=gap_offsets.dtype)
+        sigma_rows[:, 1:] = get_sigma_profile(sigma_array, indices_2)
+
+        # The band covers the diagonals j - i from the diagonal of the first cell to the diagonal of the last cell, widened
+        # by the band on both sides
+        lowest_diagonal = -dna_size_1
+        highest_diagonal = dna_size_2
+        if self.band is not None:
+            if self.band < 0:
+                raise ValueError(f"Band must be at least 0, got {self.band}")
+            lowest_diagonal = min(0, dna_size_2 - dna_size_1) - self.band
+            highest_diagonal = max(0, dna_size_2 - dna_size_1) + self.band
+        if self.x_drop is not None and self.x_drop < 0:
+            raise ValueError(f"X-drop must be at least 0, got {self.x_drop}")
+
+        # Fill the rows one at a time, where the X-drop keeps the range of columns between the first and last cells that are
+        # not more than X below the best score so far
+        score_matrix = BandedScoreMatrix(dna_size_2 + 1, impossible)
+        best_score = None
+        for i in range(dna_size_1 + 1):
+            # The cells of a row come from the cells of the previous row above or diagonally before them and from the cell
+            # to their left, and the first row starts from the first cell
+            limit = min(i + highest_diagonal, dna_size_2) + 1
+            start = 0
+            stop = limit
+            if i != 0:
+                start = max(score_matrix.row_starts[-1], i + lowest_diagonal)
+                stop = min(score_matrix.get_row_stop(i - 1) + 1, limit)
+            sigma_row = sigma_rows[indices_1[i - 1]] if i != 0 else None
+            while start < stop:
+                row = self.get_next_banded_score_row(score_matrix, i, start, stop, limit, sigma_row, gap_offsets, best_score)
+                if self.x_drop is None:
+                    break
+
+                # Keep the row up to its last kept cell if it starts with a kept cell, or else fill it again without the
+                # cells before its first kept cell, since the insertions they start are left out with them
+                row_best_score = row.max() if best_score is None else max(best_score, row.max())
+                kept = np.flatnonzero(row >= row_best_score - self.x_drop)
+                if len(kept) != 0 and kept[0] == 0:
+                    best_score = row_best_score
+                    stop_kept = kept[-1] + 1
+                    row = row[:stop_kept]
+                    break
+                # Every alignment starts from the first cell, so the first row cannot be filled again without it
+                start = stop if len(kept) == 0 or i == 0 else start + kept[0]
+            if start >= stop:
+                break
+
+            score_matrix.append_row(start, row)
+
+        return score_matrix
+
+    # Compute the cells of a row from the start column, up to the stop column from the kept cells of the previous row, and
+    # past them up to the limit column through insertions
+    def get_next_banded_score_row(self, score_matrix, i, start, stop, limit, sigma_row, gap_offsets, best_score):
+        # The first row only holds the insertions from the first cell, or the free leading gap on the second DNA sequence
+        if i == 0:
+            return self.get_first_score_row(gap_offsets)[:stop].copy()
+
+        # Line the previous row up with the columns from start - 1 to stop - 1, where the columns it does not keep are
+        # impossible
+        previous_start = score_matrix.row_starts[i - 1]
+        previous_row = score_matrix.rows[i - 1]
+        previous_values = np.full(stop - start + 1, score_matrix.impossible, dtype=previous_row.dtype)
+        overlap_start = max(previous_start, start - 1)
+        overlap_stop = min(previous_start + len(previous_row), stop)
+        target = slice(overlap_start - start + 1, overlap_stop - start + 1)
+        source = slice(overlap_start - previous_start, overlap_stop - previous_start)
+        previous_values[target] = previous_row[source]
+
+        # A match or a deletion only depends on the previous row, so both are computed for the whole row at once
+        row = previous_values[:-1] + sigma_row[start:stop]
+        np.maximum(row, previous_values[1:] + self.delta, out=row)
+
+        # A free leading gap on the first DNA sequence lets the alignment start in the first column
+        if start == 0 and "leading_1" in self.free_end_gaps:
+            row[0] = max(row[0], 0)
+
+        # Insertions chain along the row, which is a running maximum once the gap offsets are taken out
+        row -= gap_offsets[start:stop]
+        np.maximum.accumulate(row, out=row)
+        row += gap_offsets[start:stop]
+
+        # Cells past the previous row are only reached by insertions from the left, which the X-drop stops once they drop
+        # more than X below the best score so far
+        tail_length = limit - stop
+        if self.x_drop is not None and self.delta < 0:
+            threshold = max(best_score, row.max()) - self.x_drop
+            tail_length = min(tail_length, max(0, int((row[-1] - threshold) // -self.delta)))
+        if tail_length > 0:
+            row = np.concatenate((row, row[-1] - gap_offsets[stop - 1] + gap_offsets[stop:][:tail_length]))
+
+        return row
+
+    # Check whether an alignment through a cell that the band or the X-drop left out could score more than the banded score.
+    # Such an alignment either leaves the filled cells from a cell next to one that was left out, or starts in a left-out
+    # cell through a free leading gap, so the score of that cell plus the rest bound from it caps the alignment
+    def is_band_constrained(self, score_matrix, dna_size_1, dna_size_2, score):
+        match_score, gap_score = self.get_rest_scores()
+        score_bound = -np.inf
+        row_stops = [score_matrix.get_row_stop(i) for i in range(len(score_matrix.rows))]
+        for i, (start, row) in enumerate(zip(score_matrix.row_starts, score_matrix.rows)):
+            # A cell leaves the filled cells if the cell to its right, below it, or diagonally after it was left out, where
+            # every cell below the last filled row was left out
+            columns = np.arange(start, row_stops[i])
+            next_start, next_stop = (score_matrix.row_starts[i + 1], row_stops[i + 1]) if i + 1 < len(row_stops) else (0, 0)
+            leaves = (columns == row_stops[i] - 1) & (columns < dna_size_2)
+            if i < dna_size_1:
+                leaves |= (columns < next_start) | (columns >= next_stop)
+                leaves |= (columns < dna_size_2) & ((columns + 1 < next_start) | (columns + 1 >= next_stop))
+            if np.any(leaves):
+                rest_bound = get_rest_bound(dna_size_1 - i, dna_size_2 - columns[leaves], match_score, gap_score)
+                score_bound = max(score_bound, np.max(row[leaves] + rest_bound))
+
+        # A free leading gap starts an alignment with a score of zero in any cell of the first column or row
+        if "leading_1" in self.free_end_gaps:
+            rows = np.arange(1, dna_size_1 + 1)
+            left_out = np.array([i >= len(row_stops) or score_matrix.row_starts[i] > 0 for i in rows], dtype=bool)
+            if np.any(left_out):
+                score_bound = max(
+                    score_bound, np.max(get_rest_bound(dna_size_1 - rows[left_out], dna_size_2, match_score, gap_score))
+                )
+        if "leading_2" in self.free_end_gaps and len(row_stops) > 0:
+            columns = np.arange(row_stops[0], dna_size_2 + 1)
+            if len(columns) > 0:
+                score_bound = max(score_bound, np.max(get_rest_bound(dna_size_1, dna_size_2 - columns, match_score, gap_score)))
+
+        return bool(score_bound > score)
+
+    # Fill the same score matrix as get_score_matrix one anti-diagonal at a time, since each cell only depends on cells of
+    # the two anti-diagonals before it
+    def get_score_matrix_by_wavefront(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        score_matrix = self.get_base_case_score_matrix(dna_size_1, dna_size_2)
+        if dna_size_2 == 0:
+            return score_matrix
+
+        # Cell (i, j) is at i * (dna_size_2 + 1) + j in the flattened matrix, so the cells of an anti-diagonal are a strided
+        # slice with a step of dna_size_2, and shifted views put each cell at the same index as the cell diagonally before
+        # it, the cell above it, and the cell to its left
+        cells = score_matrix.reshape(-1)
+        step = dna_size_2
+        above_offset = 1
+        left_offset = step + 1
+        current_offset = step + 2
+        current_cells = cells[current_offset:]
+        above_cells = cells[above_offset:]
+        left_cells = cells[left_offset:]
+
+        # Precompute the index arrays into the flattened sigma array; walking down an anti-diagonal walks back along the
+        # second DNA sequence, so its indices are reversed to make the sigma lookups of each anti-diagonal slices as well
+        sigma_array = np.asarray(self.sigma_array)
+        sigma_values = sigma_array.reshape(-1)
+        sigma_row_indices = indices_1.astype(np.intp) * sigma_array.shape[1]
+        reversed_indices_2 = indices_2[::-1]
+
+        # Fill each anti-diagonal, where i + j is the diagonal, below the first row and to the right of the first column
+        for diagonal in range(2, dna_size_1 + dna_size_2 + 1):
+            first_i = max(1, diagonal - dna_size_2)
+            last_i = min(dna_size_1, diagonal - 1)
+            cells_on_diagonal = slice((first_i - 1) * step + diagonal - 2, (last_i - 1) * step + diagonal - 1, step)
+            diagonal_cells = current_cells[cells_on_diagonal]
+
+            # Look up the sigma values of the anti-diagonal and add them to the cells diagonally before it
+            row_start = first_i - 1
+            reversed_start = dna_size_2 - diagonal + first_i
+            reversed_stop = dna_size_2 - diagonal + last_i + 1
+            sigma_indices = sigma_row_indices[row_start:last_i] + reversed_indices_2[reversed_start:reversed_stop]
+            np.add(cells[cells_on_diagonal], sigma_values[sigma_indices], out=diagonal_cells)
+
+            # Take the maximum with a deletion from the cell above and an insertion from the cell to the left
+            np.maximum(diagonal_cells, above_cells[cells_on_diagonal] + self.delta, out=diagonal_cells)
+            np.maximum(diagonal_cells, left_cells[cells_on_diagonal] + self.delta, out=diagonal_cells)
+
+        return score_matrix
+
+    # Fill the same score matrix as get_score_matrix one column at a time, with the first DNA sequence as the query striped
+    # across lanes, so that query position q is in segment q % segment_length of lane q // segment_length
+    def get_score_matrix_by_striping(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        score_matrix = self.get_base_case_score_matrix(dna_size_1, dna_size_2)
+        if dna_size_1 == 0 or dna_size_2 == 0:
+            return score_matrix
+
+        # Precompute the query profile, which holds the sigma values of every query position against each term in striped
+        # order, so each column only looks up the profile of its term
+        segment_length = -(-dna_size_1 // STRIPED_LANES)
+        sigma_array = np.asarray(self.sigma_array)
+        profile = np.zeros((sigma_array.shape[1], STRIPED_LANES * segment_length), dtype=score_matrix.dtype)
+        profile[:, :dna_size_1] = get_sigma_profile(sigma_array.T, indices_1)
+        profile = profile.reshape(sigma_array.shape[1], STRIPED_LANES, segment_length).transpose(0, 2, 1)
+
+        # Scores change by at most one step per action, and the deletion offsets of a lane add up to one step per segment,
+        # so a data type is wide enough while the scores stay this far from a quarter of its range
+        step_size = max(abs(self.delta), np.abs(sigma_array).max())
+        margin = (segment_length + 2) * step_size
+        magnitude = max(np.abs(score_matrix[0]).max().item(), np.abs(score_matrix[:, 0]).max().item()) + margin
+
+        # Start from the narrowest data type, or the data type of the scores if they are floats
+        dtype = np.dtype(STRIPED_DTYPES[0])
+        if np.issubdtype(score_matrix.dtype, np.floating):
+            dtype = score_matrix.dtype
+        column = get_striped_values(score_matrix[1:, 0], segment_length)
+        striped_profile = None
+        for j in range(1, dna_size_2 + 1):
+            # Widen the data type before any score of this column could overflow
+            striped_dtype = get_striped_dtype(magnitude, dtype)
+            if striped_profile is None or striped_dtype != dtype:
+                dtype = striped_dtype
+                column = column.astype(dtype)
+                striped_profile = profile.astype(dtype)
+                delta = dtype.type(self.delta)
+                segment_offsets = delta * np.arange(segment_length, dtype=dtype)[:, None]
+
+            column = self.get_next_striped_column(
+                column,
+                dtype.type(score_matrix[0, j - 1]),
+                dtype.type(score_matrix[0, j]),
+                striped_profile[indices_2[j - 1]],
+                delta,
+                segment_offsets,
+            )
+            score_matrix[1:, j] = column.T.reshape(-1)[:dna_size_1]
+            magnitude = max(abs(column.max().item()), abs(column.min().item()), abs(score_matrix[0, j].item())) + margin
+
+        self.stats["striped_dtype"] = dtype.name
+
+        return score_matrix
+
+    # Compute a striped column of the score matrix from the column before it, the first row values above both columns, and
+    # the query profile of the term for the column
+    def get_next_striped_column(self, previous_column, previous_first_value, first_value, profile_column, delta, segment_offsets):
+        # A match adds the sigma value to the previous query position in the previous column, and an insertion comes from
+        # the same query position in the previous column
+        column = get_previous_positions(previous_column, previous_first_value)
+        column += profile_column
+        np.maximum(column, previous_column + delta, out=column)
+
+        # A deletion comes from the previous query position in the same column, starting from the first row
+        column[0, 0] = max(column[0, 0], first_value + delta)
+        chain_striped_gaps(column, segment_offsets)
+
+        # Deletions that cross from the last segment of a lane into the next lane are corrected lazily, which takes at most
+        # one pass per lane and usually none
+        while True:
+            carried_values = column[-1, :-1] + delta
+            if not (carried_values > column[0, 1:]).any():
+                return column
+            np.maximum(column[0, 1:], carried_values, out=column[0, 1:])
+            chain_striped_gaps(column, segment_offsets)
+
+    # Get a score matrix with the first row and column filled in, which are the recursive base cases, where the column adds
+    # one deletion at a time like the rows
+    def get_base_case_score_matrix(self, dna_size_1, dna_size_2):
+        gap_offsets = self.get_gap_offsets(dna_size_2)
+        score_matrix = np.empty((dna_size_1 + 1, dna_size_2 + 1), dtype=gap_offsets.dtype)
+        score_matrix[0] = gap_offsets
+        score_matrix[1:, 0] = np.add.accumulate(np.full(dna_size_1, self.delta, dtype=gap_offsets.dtype))
+
+        return score_matrix
+
+    # Compute only the last row of the score matrix, keeping two rows at a time
+    def get_last_score_row(self, indices_1, indices_2, sigma_array):
+        sigma_rows = get_sigma_profile(sigma_array, indices_2)
+        gap_offsets = self.get_gap_offsets(len(indices_2))
+
+        score_row = gap_offsets
+        for i, index_1 in enumerate(indices_1):
+            if not self.can_reach_min_score(score_row, i, len(indices_1)):
+                return None
+            score_row = self.get_next_score_row(score_row, sigma_rows[index_1], gap_offsets)
+        if not self.can_reach_min_score(score_row, len(indices_1), len(indices_1)):
+            return None
+
+        return score_row
+
+    # Compute the last row of the score matrix and the last cell of every row with free end gaps, keeping two rows at a time
+    def get_last_score_row_and_column(self, indices_1, indices_2):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.get_gap_offsets(len(indices_2))
+        free_start = "leading_1" in self.free_end_gaps
+
+        score_row = self.get_first_score_row(gap_offsets)
+        last_column = np.empty(len(indices_1) + 1, dtype=score_row.dtype)
+        last_column[0] = score_row[-1]
+        for i, index_1 in enumerate(indices_1, start=1):
+            if not self.can_reach_min_score(score_row, i - 1, len(indices_1), last_column):
+                return None, None
+            score_row = self.get_next_score_row(score_row, sigma_rows[index_1], gap_offsets, free_start)
+            last_column[i] = score_row[-1]
+        if not self.can_reach_min_score(score_row, len(indices_1), len(indices_1), last_column):
+            return None, None
+
+        return score_row, last_column
+
+    # Check whether an alignment can still reach the minimum score from the score row filled after i terms of the first DNA
+    # sequence, recording the cells computed so far and stopping the rows early once the score bound falls below it, where a
+    # free trailing gap on the first DNA sequence may already have ended an alignment in the last column filled so far
+    def can_reach_min_score(self, score_row, i, dna_size_1, last_column=None):
+        if self.min_score is None:
+            return True
+        self.stats["cells_computed"] = (i + 1) * len(score_row)
+        self.stats["status"] = "completed"
+        if self.get_score_bound(score_row, dna_size_1 - i) >= self.min_score:
+            return True
+        if "trailing_1" in self.free_end_gaps and last_column is not None and np.max(last_column[: i + 1]) >= self.min_score:
+            return True
+        self.stats["status"] = "rejected_early"
+        return False
+
+    # Get an upper bound on the final score from a score row, which is the best cell of the row plus the most the rest of the
+    # DNA sequences can add: the largest sigma value for each pair of terms that can still be matched and a gap for the rest,
+    # where a free trailing gap scores zero
+    def get_score_bound(self, score_row, rows_left):
+        match_score, gap_score = self.get_rest_scores()
+        columns_left = np.arange(len(score_row) - 1, -1, -1)
+        score_bound = np.max(score_row + get_rest_bound(rows_left, columns_left, match_score, gap_score))
+
+        # A free leading gap on the first DNA sequence lets an alignment start in the first column of any later row with a
+        # score of zero, where the bound on the rest is largest when the rows left are none, all, or as many as the columns
+        if "leading_1" in self.free_end_gaps:
+            later_rows_left = np.array([0, min(rows_left, len(columns_left) - 1), rows_left])
+            score_bound = max(score_bound, np.max(get_rest_bound(later_rows_left, len(columns_left) - 1, match_score, gap_score)))
+
+        return score_bound
+
+    # Get the most a pair of terms and a gap can add to an alignment, where a free trailing gap scores zero and two gaps can
+    # stand in for a match, so a pair of terms adds whichever of the two is larger
+    def get_rest_scores(self):
+        gap_score = self.delta
+        if "trailing_1" in self.free_end_gaps or "trailing_2" in self.free_end_gaps:
+            gap_score = max(gap_score, 0)
+        return max(np.max(self.sigma_array), 2 * gap_score), gap_score
+
+    # Get the first row of the score matrix, which is reached by insertions, where a free leading gap on the second DNA
+    # sequence lets the alignment start at any of its cells with a score of zero
+    def get_first_score_row(self, gap_offsets):
+        if "leading_2" in self.free_end_gaps:
+            return np.maximum(gap_offsets, 0)
+        return gap_offsets
+
+    # Find the cell where the alignment ends along with its score, which is the last cell unless a free trailing gap reaches a
+    # better cell of the last column or the last row; ties go to the last cell, then to the lowest cell of the last column
+    def get_end_cell(self, last_row, last_column):
+        i = len(last_column) - 1
+        j = len(last_row) - 1
+        end_score = last_row[j]
+        if "trailing_1" in self.free_end_gaps:
+            row = len(last_column) - 1 - int(np.argmax(last_column[::-1]))
+            if last_column[row] > end_score:
+                i, end_score = row, last_column[row]
+        if "trailing_2" in self.free_end_gaps:
+            column = len(last_row) - 1 - int(np.argmax(last_row[::-1]))
+            if last_row[column] > end_score:
+                i, j, end_score = len(last_column) - 1, column, last_row[column]
+
+        return i, j, end_score
+
+    # Compute a row of the score matrix from the row above it and the sigma values of its term against the other sequence,
+    # where a free start lets the alignment start in the first column with a score of zero
+    def get_next_score_row(self, previous_row, sigma_row, gap_offsets, free_start=False):
+        # A match or a deletion only depends on the previous row, so both are computed for the whole row at once
+        current_row = np.empty_like(previous_row)
+        current_row[0] = max(previous_row[0] + self.delta, 0) if free_start else previous_row[0] + self.delta
+        np.add(previous_row[:-1], sigma_row, out=current_row[1:])
+        np.maximum(current_row[1:], previous_row[1:] + self.delta, out=current_row[1:])
+
+        # Insertions chain along the row, which is a running maximum once the gap offsets are taken out
+        current_row -= gap_offsets
+        np.maximum.accumulate(current_row, out=current_row)
+        current_row += gap_offsets
+
+        return current_row
+
+    # Compute the score of every number of consecutive insertions, which is also the first row of the score matrix
+    def get_gap_offsets(self, dna_size):
+        return get_linear_gap_offsets(self.sigma_array, self.delta, dna_size)
+
+    # Trace the optimal actions back from the last cell of a score matrix, breaking ties in the same order as the recursion
+    def get_actions_from_score_matrix(self, score_matrix, indices_1, indices_2):
+        return get_linear_actions_from_score_matrix(score_matrix, indices_1, indices_2, self.sigma_array, self.delta)
+
+    # Get the data type that holds every score, which is a float if sigma or delta are floats
+    def get_score_dtype(self):
+        return get_linear_score_dtype(self.sigma_array, self.delta)
 
-        # Find the indices of the letters from the indexing set
-        index_l1 = indexing[l1]
-        index_l2 = indexing[l2]
+    # Convert a DNA sequence to an array of indices into the sigma array
+    def get_sigma_indices(self, dna_sequence):
+        # The codes of a DNA sequence are its sigma array indices
+        return DnaSequence(dna_sequence).codes
 
-        # Obtain sigma using the indices from above to find the corresponding value in the sigma array
-        sigma = self.sigma_array[index_l1][index_l2]
+    # Gather the sigma profile of the second DNA sequence as lists, for the engines that look up one sigma value at a time
+    def prepare_sigma_values(self):
+        self.sigma_codes_1 = self.get_sigma_indices(self.dna_sequence_1).tolist()
+        self.sigma_values = get_sigma_profile(self.sigma_array, self.dna_sequence_2).tolist()
 
-        return sigma
+    # Get the sigma value of the i-th term of the first DNA sequence against the j-th term of the second DNA sequence
+    def get_sigma_value(self, i, j):
+        return self.sigma_values[self.sigma_codes_1[i - 1]][j - 1]
 
 
 if __name__ == "__main__":
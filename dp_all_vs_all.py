@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dp_batch import BatchAlignment
+from dp_sequence import DnaSequence
+from dp_shared import get_linear_score_dtype
+
+# Number of sequences along each side of a tile of the score matrix
+ALL_VS_ALL_TILE_SIZE = 64
+
+# The shared sequences, the scoring, and the score matrix of a worker process, set once by its initializer
+worker_state = {}
+
+
+# Function that aligns every sequence against every other with the linear gap model of dp.py, where the scoring is the pair
+# of the sigma array and delta, and returns the matrix of their scores. The scores are written to a memory-mapped matrix at the
+# output path, so that a run that was interrupted picks up from the tiles it had finished
+def all_vs_all(sequences, scoring, output_path=None, tile_size=ALL_VS_ALL_TILE_SIZE, max_workers=None):
+    if tile_size < 1:
+        raise ValueError(f"Tile size must be at least 1, got {tile_size}")
+
+    # Each score is mirrored into the lower triangle, which only holds when swapping the sequences keeps the sigma values
+    if not np.array_equal(np.asarray(scoring[0]), np.asarray(scoring[0]).T):
+        raise ValueError("All-vs-all alignment mirrors the scores, so the sigma array must be symmetric")
+
+    # Without an output path, the matrix is written to a temporary file and returned in memory
+    if output_path is None:
+        with tempfile.TemporaryDirectory() as directory:
+            return np.array(all_vs_all(sequences, scoring, os.path.join(directory, "scores.npy"), tile_size, max_workers))
+
+    # Convert the sequences to sigma array indices once, stored one after another from their offsets
+    sigma_array, delta = scoring
+    sequence_indices = [DnaSequence(sequence).codes for sequence in sequences]
+    offsets = np.cumsum([0] + [len(indices) for indices in sequence_indices])
+
+    # Open the score matrix along with the tiles of its upper triangle that were finished
+    tile_count = -(-len(sequence_indices) // tile_size)
+    digest = get_all_vs_all_digest(sequence_indices, sigma_array, delta, tile_size)
+    scores, finished_tiles = open_all_vs_all_output(
+        output_path, len(sequence_indices), tile_count, get_linear_score_dtype(sigma_array, delta), digest
+    )
+    pending_tiles = [
+        (tile_1, tile_2)
+        for tile_1 in range(tile_count)
+        for tile_2 in range(tile_1, tile_count)
+        if not finished_tiles[tile_1, tile_2]
+    ]
+    if len(pending_tiles) == 0:
+        return scores
+
+    # Share the sequences with the workers instead of sending them along with every tile
+    shared_sequences = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+    try:
+        shared_indices = np.ndarray(int(offsets[-1]), dtype=np.uint8, buffer=shared_sequences.buf)
+        if len(sequence_indices) > 0:
+            np.concatenate(sequence_indices, out=shared_indices, casting="unsafe")
+        del shared_indices
+
+        # Mark each tile as finished once its worker has flushed it to the score matrix
+        with ProcessPoolExecutor(
+            max_workers,
+            initializer=start_all_vs_all_worker,
+            initargs=(shared_sequences.name, offsets, sigma_array, delta, output_path),
+        ) as executor:
+            futures = {
+                executor.submit(align_all_vs_all_tile, tile_1 * tile_size, tile_2 * tile_size, tile_size): (tile_1, tile_2)
+                for tile_1, tile_2 in pending_tiles
+            }
+            for future in as_completed(futures):
+                future.result()
+                finished_tiles[futures[future]] = True
+                finished_tiles.flush()
+    finally:
+        shared_sequences.close()
+        shared_sequences.unlink()
+
+    return scores
+
+
+# Get a digest of the input of an all-vs-all run, which is the sigma array indices of the sequences, the scoring, and the tile
+# size, so that a run only picks up the tiles of an earlier run of the same input
+def get_all_vs_all_digest(sequence_indices, sigma_array, delta, tile_size):
+    digest = hashlib.blake2b(digest_size=16)
+    for value in (np.asarray(sigma_array), np.asarray(delta), np.asarray(tile_size)):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+
+    # The lengths of the sequences tell where each one ends among their concatenated indices
+    digest.update(np.asarray([len(indices) for indices in sequence_indices], dtype=np.int64).tobytes())
+    for indices in sequence_indices:
+        digest.update(np.ascontiguousarray(indices, dtype=np.uint8).tobytes())
+
+    return digest.hexdigest()
+
+
+# Open the memory-mapped score matrix and the matrix of finished tiles at the output path, or create both if they are missing,
+# where the digest of the input is kept in a file next to them
+def open_all_vs_all_output(output_path, sequence_count, tile_count, dtype, digest):
+    tiles_path = output_path + ".tiles.npy"
+    digest_path = output_path + ".digest"
+
+    # Pick up from an earlier run, as long as it was aligning the same sequences with the same scoring in the same tiles
+    if os.path.exists(output_path) and os.path.exists(tiles_path):
+        scores = np.load(output_path, mmap_mode="r+")
+        finished_tiles = np.load(tiles_path, mmap_mode="r+")
+        saved_digest = None
+        if os.path.exists(digest_path):
+            with open(digest_path) as handle:
+                saved_digest = handle.read().strip()
+        if (
+            saved_digest != digest
+            or scores.shape != (sequence_count, sequence_count)
+            or scores.dtype != dtype
+            or finished_tiles.shape != (tile_count, tile_count)
+        ):
+            raise ValueError(f"{output_path} holds the scores of a different all-vs-all run")
+        return scores, finished_tiles
+
+    # The score matrix and the digest are created first, so that a crash in between leaves no tiles marked as finished
+    scores = np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=(sequence_count, sequence_count))
+    with open(digest_path, "w") as handle:
+        handle.write(digest + "\n")
+    finished_tiles = np.lib.format.open_memmap(tiles_path, mode="w+", dtype=bool, shape=(tile_count, tile_count))
+
+    return scores, finished_tiles
+
+
+# Attach a worker process to the shared sequences and the score matrix
+def start_all_vs_all_worker(shared_name, offsets, sigma_array, delta, output_path):
+    shared_sequences = shared_memory.SharedMemory(name=shared_name)
+    shared_indices = np.ndarray(int(offsets[-1]), dtype=np.uint8, buffer=shared_sequences.buf)
+    worker_state["shared_sequences"] = shared_sequences
+    worker_state["sequence_indices"] = np.split(shared_indices, offsets[1:-1])
+    worker_state["scoring"] = (sigma_array, delta)
+    worker_state["scores"] = np.load(output_path, mmap_mode="r+")
+
+
+# Align the sequences of a tile in a worker process and flush their scores to the score matrix
+def align_all_vs_all_tile(row_start, column_start, tile_size):
+    sequence_indices = worker_state["sequence_indices"]
+    sigma_array, delta = worker_state["scoring"]
+    scores = worker_state["scores"]
+
+    # Each sequence of the tile is aligned against the sequences of the tile in the upper triangle at once, where the scoring
+    # is symmetric, so each score is mirrored into the lower triangle
+    row_stop = min(row_start + tile_size, len(sequence_indices))
+    column_stop = min(column_start + tile_size, len(sequence_indices))
+    for i in range(row_start, row_stop):
+        columns = np.arange(max(i, column_start), column_stop)
+        if len(columns) == 0:
+            continue
+        batch_alignment = BatchAlignment(sigma_array, delta, sequence_indices[i], [sequence_indices[j] for j in columns])
+        row_scores, _ = batch_alignment.batch_alignment()
+        scores[i, columns] = row_scores
+        scores[columns, i] = row_scores
+
+    scores.flush()
@@ -0,0 +1,40 @@
+# Class Definition for a score matrix that only keeps a range of columns in each row, where every other cell is impossible
+class BandedScoreMatrix:
+    # Init function that globalizes the number of columns and the score of the cells that are not kept
+    def __init__(self, columns: int, impossible):
+        self.columns = columns
+        self.impossible = impossible
+        self.row_starts = []
+        self.rows = []
+        self.cells = 0
+
+    # Get the score of a cell, where negative indices count from the end like NumPy
+    def __getitem__(self, cell):
+        i, j = cell
+        if i < 0:
+            i += len(self.rows)
+        if j < 0:
+            j += self.columns
+        if i >= len(self.rows):
+            return self.impossible
+
+        # Cells outside the kept range of the row are impossible
+        j -= self.row_starts[i]
+        if j < 0 or j >= len(self.rows[i]):
+            return self.impossible
+
+        return self.rows[i][j]
+
+    # Add the next row, which keeps the columns from the start column onwards
+    def append_row(self, start, row):
+        self.row_starts.append(start)
+        self.rows.append(row)
+        self.cells += len(row)
+
+    # Get the first column after the kept range of a row
+    def get_row_stop(self, i):
+        return self.row_starts[i] + len(self.rows[i])
+
+    # Check whether a cell was computed, which is a kept cell that is not impossible
+    def is_computed(self, i, j):
+        return self[i, j] != self.impossible
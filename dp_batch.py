@@ -0,0 +1,117 @@
+import numpy as np
+
+from dp_sequence import DnaSequence
+from dp_shared import get_linear_actions_from_score_matrix, get_linear_gap_offsets, get_linear_score_dtype
+
+# Largest number of targets aligned together in one bucket
+BATCH_BUCKET_SIZE = 256
+
+
+# Class Definition for aligning one query against many targets with the linear gap model of dp.py
+class BatchAlignment:
+    # Init function that globalizes the delta, sigma_array, query, targets, bucket size, and whether to trace the actions back
+    def __init__(
+        self,
+        sigma_array: np.array,
+        delta: int,
+        query: str,
+        targets: list,
+        bucket_size: int = BATCH_BUCKET_SIZE,
+        traceback: bool = False,
+    ):
+        if bucket_size < 1:
+            raise ValueError(f"Bucket size must be at least 1, got {bucket_size}")
+        self.delta = delta
+        self.sigma_array = sigma_array
+        self.query = query
+        self.targets = list(targets)
+        self.bucket_size = bucket_size
+        self.traceback = traceback
+        self.stats = {}
+
+    # Function that aligns the query against every target, returning the scores in the order of the targets, along with the
+    # actions for each target if the traceback was asked for
+    def batch_alignment(self):
+        # Convert the query and the targets to sigma array indices, where arrays of codes are used without copying them
+        query_indices = DnaSequence(self.query).codes
+        target_indices = [DnaSequence(target).codes for target in self.targets]
+        self.stats = {"cells_computed": 0, "padded_cells": 0}
+
+        # Align the targets bucket by bucket and put the results back in the order of the targets
+        scores = np.empty(len(target_indices), dtype=get_linear_score_dtype(self.sigma_array, self.delta))
+        actions = [None] * len(target_indices) if self.traceback else None
+        for bucket in self.get_buckets([len(indices) for indices in target_indices]):
+            bucket_scores, bucket_actions = self.align_bucket(query_indices, [target_indices[target] for target in bucket])
+            scores[bucket] = bucket_scores
+            if self.traceback:
+                for target, target_actions in zip(bucket, bucket_actions):
+                    actions[target] = target_actions
+
+        return scores, actions
+
+    # Split the targets into buckets of similar lengths, so that little of each bucket is padding
+    def get_buckets(self, target_lengths):
+        if len(target_lengths) == 0:
+            return []
+
+        # Sort the targets by length and cut them into buckets of at most the bucket size
+        order = np.argsort(target_lengths, kind="stable")
+        return np.array_split(order, -(-len(order) // self.bucket_size))
+
+    # Align the query against every target of a bucket at once, one query position at a time
+    def align_bucket(self, query_indices, bucket_indices):
+        # Pad the targets into a 2D array of sigma indices, where the padding comes after the end of every target and so
+        # never changes its score
+        target_lengths = np.asarray([len(indices) for indices in bucket_indices])
+        width = target_lengths.max()
+        padded_indices = np.zeros((len(bucket_indices), width), dtype=np.intp)
+        for padded_row, indices in zip(padded_indices, bucket_indices):
+            padded_row[: len(indices)] = indices
+        self.stats["cells_computed"] += len(query_indices) * padded_indices.size
+        self.stats["padded_cells"] += len(query_indices) * int(padded_indices.size - target_lengths.sum())
+
+        # Look up the sigma values of every query term against every target at once
+        sigma_rows = np.asarray(self.sigma_array)[:, padded_indices]
+        gap_offsets = get_linear_gap_offsets(self.sigma_array, self.delta, width)
+
+        # Each row of the score matrices of the bucket holds one row of the score matrix of every target, where the first
+        # row is the recursive base case; every row is kept if the actions are traced back
+        score_rows = np.empty(
+            (len(query_indices) + 1 if self.traceback else 1, len(bucket_indices), width + 1), gap_offsets.dtype
+        )
+        score_rows[0] = gap_offsets
+        score_row = score_rows[0]
+        for i, index_1 in enumerate(query_indices, start=1):
+            score_row = self.get_next_score_rows(score_row, sigma_rows[index_1], gap_offsets)
+            if self.traceback:
+                score_rows[i] = score_row
+
+        # The score of each target is in the column of its last term
+        scores = score_row[np.arange(len(bucket_indices)), target_lengths]
+        if not self.traceback:
+            return scores, None
+
+        # Trace the actions back through the score matrix of each target like the table engine
+        actions = [
+            get_linear_actions_from_score_matrix(
+                score_rows[:, target, : length + 1], query_indices, indices, self.sigma_array, self.delta
+            )
+            for target, (length, indices) in enumerate(zip(target_lengths, bucket_indices))
+        ]
+
+        return scores, actions
+
+    # Compute the next row of every target's score matrix from the rows above them, like dp.py does for a single target
+    def get_next_score_rows(self, previous_rows, sigma_rows, gap_offsets):
+        # A match or a deletion only depends on the previous rows, so both are computed for every target at once
+        current_rows = np.empty_like(previous_rows)
+        current_rows[:, 0] = previous_rows[:, 0] + self.delta
+        np.add(previous_rows[:, :-1], sigma_rows, out=current_rows[:, 1:])
+        np.maximum(current_rows[:, 1:], previous_rows[:, 1:] + self.delta, out=current_rows[:, 1:])
+
+        # Insertions chain along each row, which is a running maximum once the gap offsets are taken out
+        current_rows -= gap_offsets
+        np.maximum.accumulate(current_rows, axis=1, out=current_rows)
+        current_rows += gap_offsets
+
+        return current_rows
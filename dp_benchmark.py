@@ -0,0 +1,259 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+# Lengths of the DNA sequences of each benchmark pair, from 10 to a million terms
+BENCHMARK_LENGTHS = (10, 100, 1000, 10000, 100000, 1000000)
+
+# Kinds of benchmark pairs, where a random pair has two unrelated DNA sequences and a mutated pair has a DNA sequence and a
+# copy of it with substitutions, insertions and deletions
+BENCHMARK_PAIR_KINDS = ("random", "mutated")
+
+# Fraction of the terms of a mutated pair that are substituted, inserted after, or deleted, in equal parts
+BENCHMARK_MUTATION_RATE = 0.1
+
+# Seed of the random generator that builds the benchmark pairs
+BENCHMARK_SEED = 6471
+
+# Band of diagonals of the banded runs of the table engines
+BENCHMARK_BAND = 64
+
+# Engines of each script, as the module, the engine, and any extra arguments of its PairwiseAlignment class
+BENCHMARK_ENGINES = (
+    ("dp", "recursive", {}),
+    ("dp", "memoized", {}),
+    ("dp", "table", {}),
+    ("dp", "table", {"band": BENCHMARK_BAND}),
+    ("dp", "hirschberg", {}),
+    ("dp", "wavefront", {}),
+    ("dp", "striped", {}),
+    ("dp_bonus_1", "recursive", {}),
+    ("dp_bonus_1", "memoized", {}),
+    ("dp_bonus_1", "table", {}),
+    ("dp_bonus_2", "recursive", {}),
+    ("dp_bonus_2", "memoized", {}),
+    ("dp_bonus_2", "table", {}),
+    ("dp_bonus_2", "table", {"band": BENCHMARK_BAND}),
+    ("dp_bonus_2", "myers_miller", {}),
+    ("dp_bonus_2", "wavefront", {}),
+    ("dp_bonus_2", "striped", {}),
+)
+
+# Scoring of each script from its main function, as the pair score, the non-pair score, and the gap values
+BENCHMARK_SCORING = {
+    "dp": (10, 7, (3,)),
+    "dp_bonus_1": (10, 2.5, (0, 3)),
+    "dp_bonus_2": (10, 2.5, (0, 3)),
+}
+
+# Seconds each run may take before it is stopped, where the recursive engines take exponential time
+BENCHMARK_TIMEOUT = 60
+
+# Most cells of the score matrix a run may fill, past which the run is skipped instead of running out of memory
+BENCHMARK_MAX_CELLS = 10**9
+
+# Fraction by which a run may be slower than its baseline before the comparison fails
+BENCHMARK_TOLERANCE = 0.25
+
+# Seconds below which a baseline run is timed as noise, so only slowdowns past this floor fail the comparison
+BENCHMARK_MIN_SECONDS = 0.05
+
+
+# Function that runs the benchmark, prints a line for each run, saves the results as a JSON baseline if asked, and compares
+# them against a saved baseline, exiting with an error if any run regressed
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engines of dp.py, dp_bonus_1.py and dp_bonus_2.py")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(BENCHMARK_LENGTHS))
+    parser.add_argument("--kinds", nargs="+", choices=BENCHMARK_PAIR_KINDS, default=list(BENCHMARK_PAIR_KINDS))
+    parser.add_argument("--engines", nargs="+", help="names of the engines to run, like dp.py:table or dp_bonus_2.py:table+band")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED)
+    parser.add_argument("--timeout", type=float, default=BENCHMARK_TIMEOUT, help="seconds each run may take")
+    parser.add_argument("--max-cells", type=int, default=BENCHMARK_MAX_CELLS, help="most cells a run may fill")
+    parser.add_argument("--save", help="JSON file to save the results to as a baseline")
+    parser.add_argument("--compare", help="JSON baseline to compare the results against")
+    parser.add_argument("--tolerance", type=float, default=BENCHMARK_TOLERANCE, help="fraction a run may be slower")
+    arguments = parser.parse_args()
+
+    # Run the engines that were asked for, or all of them
+    engines = BENCHMARK_ENGINES
+    if arguments.engines is not None:
+        engines = [engine for engine in BENCHMARK_ENGINES if get_engine_name(*engine) in arguments.engines]
+        unknown_names = set(arguments.engines) - {get_engine_name(*engine) for engine in engines}
+        if len(unknown_names) > 0:
+            raise ValueError(f"Unknown engines {sorted(unknown_names)}, expected any of the names of BENCHMARK_ENGINES")
+    benchmark = run_benchmark(
+        arguments.lengths, arguments.kinds, engines, arguments.seed, arguments.timeout, arguments.max_cells, sys.stdout
+    )
+
+    if arguments.save is not None:
+        with open(arguments.save, "w") as handle:
+            json.dump(benchmark, handle, indent=1)
+    if arguments.compare is not None:
+        with open(arguments.compare) as handle:
+            regressions = compare_benchmarks(benchmark, json.load(handle), arguments.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+# Get the name of an engine of a script as it is printed and stored in the baselines
+def get_engine_name(module_name, engine, options):
+    return f"{module_name}.py:{engine}" + ("+band" if "band" in options else "")
+
+
+# Build a benchmark pair of DNA sequences as arrays of codes, where the generator is seeded from the seed, the kind and the
+# length, so each pair is the same whichever other pairs are built
+def get_benchmark_pair(seed, kind, length):
+    rng = np.random.default_rng([seed, BENCHMARK_PAIR_KINDS.index(kind), length])
+    codes_1 = rng.integers(0, 4, length, dtype=np.uint8)
+    if kind == "random":
+        return codes_1, rng.integers(0, 4, length, dtype=np.uint8)
+
+    # Pick the edit of each term, where a substitution adds one to three to its code and an insertion adds a random term
+    # after it
+    edits = rng.choice(4, length, p=[1 - BENCHMARK_MUTATION_RATE] + [BENCHMARK_MUTATION_RATE / 3] * 3)
+    substituted_codes = np.where(edits == 1, (codes_1 + rng.integers(1, 4, length, dtype=np.uint8)) % 4, codes_1)
+    counts = np.array([1, 1, 2, 0])[edits]
+    positions = np.cumsum(counts) - counts
+    codes_2 = np.empty(int(counts.sum()), dtype=np.uint8)
+    codes_2[positions[counts > 0]] = substituted_codes[counts > 0]
+    codes_2[positions[edits == 2] + 1] = rng.integers(0, 4, np.count_nonzero(edits == 2), dtype=np.uint8)
+
+    return codes_1, codes_2
+
+
+# Run every engine on every benchmark pair, each in its own process with a timeout, printing a line for each run as it
+# finishes; an engine that times out or is skipped on a pair is skipped on the longer pairs of the same kind
+def run_benchmark(lengths, kinds, engines, seed, timeout, max_cells, handle):
+    runs = []
+    for kind in kinds:
+        stopped_engines = set()
+        for length in sorted(lengths):
+            codes_1, codes_2 = get_benchmark_pair(seed, kind, length)
+            for module_name, engine, options in engines:
+                name = get_engine_name(module_name, engine, options)
+                cells = get_benchmark_cells(len(codes_1), len(codes_2), options)
+                if name in stopped_engines or cells > max_cells:
+                    run = {"status": "skipped"}
+                else:
+                    run = run_benchmark_case(module_name, engine, options, codes_1, codes_2, timeout)
+                if run["status"] != "ok":
+                    stopped_engines.add(name)
+                run = {"engine": name, "kind": kind, "length": length, **run}
+                runs.append(run)
+                handle.write(format_benchmark_run(run) + "\n")
+                handle.flush()
+
+    return {
+        "seed": seed,
+        "mutation_rate": BENCHMARK_MUTATION_RATE,
+        "band": BENCHMARK_BAND,
+        "timeout": timeout,
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "numpy": np.__version__},
+        "runs": runs,
+    }
+
+
+# Get the number of cells of the score matrix a run fills, which is every cell unless the run is banded
+def get_benchmark_cells(dna_size_1, dna_size_2, options):
+    if "band" in options:
+        return (dna_size_1 + 1) * min(2 * options["band"] + 1, dna_size_2 + 1)
+    return (dna_size_1 + 1) * (dna_size_2 + 1)
+
+
+# Run an engine on a benchmark pair in a new process, so a run that times out can be stopped and the peak resident memory
+# is that of a fresh interpreter running only this alignment
+def run_benchmark_case(module_name, engine, options, codes_1, codes_2, timeout):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=align_benchmark_case, args=(sender, module_name, engine, options, codes_1, codes_2))
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            return {"status": "timeout"}
+        return receiver.recv()
+    except EOFError:
+        return {"status": f"crashed with exit code {process.exitcode}"}
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+# Align a benchmark pair in the worker process and send back the wall time, the cells per second, the peak resident memory,
+# and the score, or the error that stopped the run
+def align_benchmark_case(connection, module_name, engine, options, codes_1, codes_2):
+    # Build the sigma array like the main function of the script does
+    module = importlib.import_module(module_name)
+    pair_score, non_pair_score, gap_values = BENCHMARK_SCORING[module_name]
+    sigma = np.full((4, 4), non_pair_score)
+    np.fill_diagonal(sigma, pair_score)
+
+    try:
+        pairwise_alignment = module.PairwiseAlignment(sigma, *gap_values, codes_1, codes_2, engine=engine, **options)
+        start = time.perf_counter()
+        score = pairwise_alignment.alignment_result().score
+        seconds = time.perf_counter() - start
+    except (MemoryError, RecursionError, ValueError) as error:
+        connection.send({"status": f"error: {type(error).__name__}: {error}"})
+        return
+
+    # A banded run records the cells it filled, and the peak resident memory is in kilobytes on Linux and bytes on macOS
+    cells = getattr(pairwise_alignment, "stats", {}).get("cells_computed", len(codes_1) * len(codes_2))
+    peak_rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    connection.send(
+        {
+            "status": "ok",
+            "seconds": seconds,
+            "gcups": cells / seconds / 1e9 if seconds > 0 else None,
+            "peak_rss_bytes": peak_rss_bytes,
+            "score": score.item() if isinstance(score, np.generic) else score,
+        }
+    )
+
+
+# Format a run as a line of the report
+def format_benchmark_run(run):
+    line = f"{run['engine']:28} {run['kind']:8} {run['length']:>8}  {run['status']}"
+    if run["status"] == "ok":
+        gcups = f"{run['gcups']:.4f}" if run["gcups"] is not None else "-"
+        line += f"  {run['seconds']:.4f} s  {gcups} GCUPS  {run['peak_rss_bytes'] / 2**20:.1f} MiB  score {run['score']}"
+    return line
+
+
+# Compare the runs of a benchmark against a baseline made with the same pairs, returning a line for each run that is now
+# slower past the tolerance, has a different score, or no longer finishes
+def compare_benchmarks(benchmark, baseline, tolerance):
+    for key in ("seed", "mutation_rate", "band"):
+        if benchmark[key] != baseline[key]:
+            raise ValueError(f"Baseline was made with {key} {baseline[key]}, but the benchmark used {benchmark[key]}")
+
+    baseline_runs = {(run["engine"], run["kind"], run["length"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in benchmark["runs"]:
+        key = (run["engine"], run["kind"], run["length"])
+        baseline_run = baseline_runs.get(key)
+        if baseline_run is None or baseline_run["status"] != "ok":
+            continue
+        name = f"{run['engine']} {run['kind']} {run['length']}"
+        if run["status"] != "ok":
+            regressions.append(f"{name}: {run['status']}, where the baseline finished")
+        elif run["score"] != baseline_run["score"]:
+            regressions.append(f"{name}: score {run['score']}, where the baseline scored {baseline_run['score']}")
+        elif run["seconds"] > max(baseline_run["seconds"], BENCHMARK_MIN_SECONDS) * (1 + tolerance):
+            regressions.append(f"{name}: {run['seconds']:.4f} s, where the baseline took {baseline_run['seconds']:.4f} s")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    main()
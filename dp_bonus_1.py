@@ -1,6 +1,19 @@
 #!/usr/bin/env python3
+from collections import deque
+
 import numpy as np
 
+from dp_cache import BoundedCache, recursion_limit
+from dp_result import AlignmentResult
+from dp_sequence import DnaSequence, get_sigma_profile
+from dp_shared import get_impossible_score
+
+# Relative rounding error allowed in the second differences of floating point gap values when picking the candidate lists
+GAP_SHAPE_TOLERANCE = 1e-9
+
+# Engines that can fill the score matrix
+ENGINES = ("recursive", "memoized", "table")
+
 
 # Main function to simplify Pairwise Alignment Code
 def main():
@@ -46,53 +59,65 @@ def main():
 # Class Definition for the Pairwise Alignment functions
 class PairwiseAlignment:
     # Init function that globalizes the sigma_array, alpha, beta, and dna_sequence variables
-    def __init__(self, sigma_array: np.array, alpha: int, beta: int, dna_sequence_1: list, dna_sequence_2: list):
+    def __init__(
+        self,
+        sigma_array: np.array,
+        alpha: int,
+        beta: int,
+        dna_sequence_1: list,
+        dna_sequence_2: list,
+        engine: str = "recursive",
+        cache_size: int = None,
+        cache_policy: str = "lru",
+        gap_function=None,
+    ):
         self.alpha = alpha
         self.beta = beta
         self.sigma_array = sigma_array
-        self.dna_sequence_1 = []
-        for term in dna_sequence_1:
-            self.dna_sequence_1.append(term)
-        self.dna_sequence_2 = []
-        for term in dna_sequence_2:
-            self.dna_sequence_2.append(term)
+        self.engine = engine
+        self.gap_function = gap_function
+        self.cache = BoundedCache(cache_size, cache_policy)
+
+        # Store the DNA sequences as arrays of codes, where a DnaSequence is used without copying it
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.dna_sequence_2 = DnaSequence(dna_sequence_2)
 
     def pairwise_alignment(self):
-        # Instantiate the top and bottom alignment strings
-        top_pairwise_alignment = ""
-        bottom_pairwise_alignment = ""
+        # Align the DNA sequences and render the alignment from the run-length actions in time linear in its length
+        alignment_result = self.alignment_result()
 
-        # Create copies of the DNA sequence arrays in order to modify them
-        dna_sequence_1 = self.dna_sequence_1[:]
-        dna_sequence_2 = self.dna_sequence_2[:]
+        return str(alignment_result), alignment_result.score, alignment_result.get_actions()
 
+    # Function that aligns the DNA sequences, returning an AlignmentResult that stores the optimal actions as run-length CIGAR
+    # operations and renders the alignment lazily
+    def alignment_result(self):
         # Get the actions to produce the optimal alignment and the corresponding score
-        score, actions = self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
+        score, actions = self.get_score_and_actions()
+
+        return AlignmentResult(self.dna_sequence_1, self.dna_sequence_2, score, actions)
 
-        # Iterate for each action
-        for action in actions:
-            # Logic for a "deletion"
-            if action == "deletion":
-                # Add the current value from the first DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + "_"
+    # Check that the engine is known, so that the full alignment and the score alone reject the same engines
+    def check_alignment_options(self):
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{self.engine}', expected any of {', '.join(ENGINES)}")
 
-            # Logic for an "insertion"
-            elif action == "insertion":
-                # Add the current value from the second DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + "_"
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
+    # Function that runs the selected engine on the full DNA sequences
+    def get_score_and_actions(self):
+        self.check_alignment_options()
 
-            # Logic for a "match"
-            elif action == "match":
-                # Add the current value from the first and second DNA sequences to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
+        # The recursive engine is the reference formulation and is only practical for short sequences
+        if self.engine == "recursive":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
 
-        # Concentrate the top and bottom alignments to get the final pairwise alignment
-        pairwise_alignment = top_pairwise_alignment + "\n" + bottom_pairwise_alignment
+        # The memoized engine keeps the recursive formulation but caches each pair of prefix lengths
+        elif self.engine == "memoized":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_memo()
 
-        return pairwise_alignment, score, actions
+        # The table engine fills the score matrix from the bottom up
+        elif self.engine == "table":
+            return self.get_score_and_actions_from_table()
 
     # Function that calculates the optimal actions and score of the optimal actions with Dynamic Programming
     def get_score_and_actions_from_dp(self, dna_sequence_1, dna_sequence_2):
@@ -110,7 +135,7 @@ class PairwiseAlignment:
             # Logic for when there are remaining terms in the first DNA sequence
             if dna_size_1 != 0:
                 # Calculate the score of the base case using the remaining DNA terms
-                base_case_score = self.alpha + self.beta * (dna_size_1 - 1)
+                base_case_score = self.compute_gap(dna_size_1)
 
                 # Generate the action array by adding a deletion action for each DNA term remaining
                 for _ in range(dna_size_1):
@@ -119,7 +144,7 @@ class PairwiseAlignment:
             # Logic for when there are remaining terms in the second DNA sequence
             elif dna_size_2 != 0:
                 # Calculate the score of the base case using the remaining DNA terms
-                base_case_score = self.alpha + self.beta * (dna_size_2 - 1)
+                base_case_score = self.compute_gap(dna_size_2)
 
                 # Generate the action array by adding an insertion action for each DNA term remaining
                 for _ in range(dna_size_2):
@@ -139,7 +164,7 @@ class PairwiseAlignment:
             )
 
             # Calculate the value of the match by adding the sigma value
-            match = recursive_match + self.compute_sigma(dna_sequence_1[-1], dna_sequence_2[-1])
+            match = recursive_match + self.get_sigma_value(len(dna_sequence_1), len(dna_sequence_2))
 
             # Define lists to hold the scores and previous actions of each iterative insertion
             insertions = []
@@ -156,7 +181,7 @@ class PairwiseAlignment:
                 )
 
                 # Calculate the value of the current insertion action
-                insertion = recursive_insertion + self.alpha + self.beta * k
+                insertion = recursive_insertion + self.compute_gap(k + 1)
 
                 # Add to the previous actions if there are multiple insertions
                 for _ in range(k):
@@ -186,7 +211,7 @@ class PairwiseAlignment:
                 )
 
                 # Calculate the value of the current deletion action
-                deletion = recursive_deletion + self.alpha + self.beta * k
+                deletion = recursive_deletion + self.compute_gap(k + 1)
 
                 # Add to the previous actions if there are multiple deletions
                 for _ in range(k):
@@ -223,19 +248,434 @@ class PairwiseAlignment:
 
             return max_value, max_prev_actions
 
-    # Compute the sigma value by stripping the corresponding value from the sigma array
-    def compute_sigma(self, l1, l2):
-        # Define a set to use for indexing the sigma array
-        indexing = {"A": 0, "C": 1, "G": 2, "T": 3}
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with memoized recursion
+    def get_score_and_actions_from_memo(self):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(self.dna_sequence_1)
+        dna_size_2 = len(self.dna_sequence_2)
 
-        # Find the indices of the letters from the indexing set
-        index_l1 = indexing[l1]
-        index_l2 = indexing[l2]
+        # The recursion goes at most one level deeper for each DNA term
+        with recursion_limit(dna_size_1 + dna_size_2 + 100):
+            score, _, _ = self.get_score_and_action_from_memo(dna_size_1, dna_size_2)
 
-        # Obtain sigma using the indices from above to find the corresponding value in the sigma array
-        sigma = self.sigma_array[index_l1][index_l2]
+            # Follow the last action and its number of consecutive terms back to the base case
+            actions = []
+            i = dna_size_1
+            j = dna_size_2
+            while i != 0 and j != 0:
+                _, action, length = self.get_score_and_action_from_memo(i, j)
+                actions.extend([action] * length)
+                if action != "insertion":
+                    i -= length
+                if action != "deletion":
+                    j -= length
+
+        # Add the base case actions for the remaining terms and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return score, actions
+
+    # Function that calculates the optimal score, last action, and length of the last action for the first i and j terms
+    def get_score_and_action_from_memo(self, i, j):
+        # If either of the prefixes are empty, we have hit the base case
+        if i == 0 and j == 0:
+            return 0, None, 0
+        if i == 0:
+            return self.compute_gap(j), "insertion", j
+        if j == 0:
+            return self.compute_gap(i), "deletion", i
+
+        # Return the cached result if this pair of prefixes was already solved
+        result = self.cache.get((i, j))
+        if result is not None:
+            return result
+
+        # Use recursion to calculate the value of a match on the shorter prefixes
+        match = self.get_score_and_action_from_memo(i - 1, j - 1)[0] + self.get_sigma_value(i, j)
+
+        # Find the best number of consecutive insertions; ties go to the fewest insertions like the recursion
+        max_insertion_score = None
+        max_insertion_length = 0
+        for k in range(j):
+            insertion = self.get_score_and_action_from_memo(i, j - k - 1)[0] + self.compute_gap(k + 1)
+            if max_insertion_score is None or insertion > max_insertion_score:
+                max_insertion_score = insertion
+                max_insertion_length = k + 1
+
+        # Find the best number of consecutive deletions; ties go to the fewest deletions like the recursion
+        max_deletion_score = None
+        max_deletion_length = 0
+        for k in range(i):
+            deletion = self.get_score_and_action_from_memo(i - k - 1, j)[0] + self.compute_gap(k + 1)
+            if max_deletion_score is None or deletion > max_deletion_score:
+                max_deletion_score = deletion
+                max_deletion_length = k + 1
+
+        # Find the maximum action; prioritizes match actions, then insertion actions, like the recursion
+        max_value = max(match, max_deletion_score, max_insertion_score)
+        if match == max_value:
+            result = (max_value, "match", 1)
+        elif max_insertion_score == max_value:
+            result = (max_value, "insertion", max_insertion_length)
+        else:
+            result = (max_value, "deletion", max_deletion_length)
+
+        self.cache.put((i, j), result)
+
+        return result
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with a score matrix
+    def get_score_and_actions_from_table(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        sigma_array = np.asarray(self.sigma_array)
+
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # Compute the gap values and fill the score matrix
+        gap_values = self.get_gap_values(max(dna_size_1, dna_size_2), sigma_array)
+        score_matrix = self.get_score_matrix(indices_1, indices_2, sigma_array, gap_values)
+
+        # Trace the optimal actions back from the last cell, breaking ties in the same order as the recursion
+        actions = []
+        i = dna_size_1
+        j = dna_size_2
+        while i != 0 and j != 0:
+            # Recompute the value of a match and of every number of consecutive insertions or deletions into the cell
+            match = score_matrix[i - 1, j - 1] + sigma_array[indices_1[i - 1], indices_2[j - 1]]
+            insertions = score_matrix[i, :j][::-1] + gap_values[1:][:j]
+            deletions = score_matrix[:i, j][::-1] + gap_values[1:][:i]
+
+            # Find the maximum insertion and deletion actions; ties go to the fewest consecutive terms
+            insertion_length = int(np.argmax(insertions)) + 1
+            deletion_length = int(np.argmax(deletions)) + 1
+            max_insertion_score = insertions[insertion_length - 1]
+            max_deletion_score = deletions[deletion_length - 1]
+            max_value = max(match, max_deletion_score, max_insertion_score)
+
+            # Prioritize match actions, then insertion actions, then deletion actions
+            if match == max_value:
+                actions.append("match")
+                i -= 1
+                j -= 1
+            elif max_insertion_score == max_value:
+                actions.extend(["insertion"] * insertion_length)
+                j -= insertion_length
+            else:
+                actions.extend(["deletion"] * deletion_length)
+                i -= deletion_length
+
+        # Add the base case actions for the remaining terms and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return score_matrix[dna_size_1, dna_size_2], actions
+
+    # Function that calculates only the optimal score, keeping two rows of the score matrix at a time for the alpha and
+    # beta gap; other gap functions look back at every earlier row, so they fill the whole score matrix
+    def score_only(self):
+        self.check_alignment_options()
+
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        sigma_array = np.asarray(self.sigma_array)
+
+        # Make the rows run along the shorter DNA sequence; swapping the DNA sequences swaps insertions and deletions,
+        # which score the same, and transposes the sigma array
+        if len(indices_2) > len(indices_1):
+            indices_1, indices_2 = indices_2, indices_1
+            sigma_array = sigma_array.T
+        gap_values = self.get_gap_values(len(indices_1), sigma_array)
+
+        # Any gap function other than alpha and beta needs the whole score matrix
+        if self.gap_function is not None:
+            return self.get_score_matrix(indices_1, indices_2, sigma_array, gap_values)[-1, -1]
+
+        # Keep the current row along with the running maximum of the deletions ending at each column
+        sigma_rows = get_sigma_profile(sigma_array, indices_2)
+        gap_offsets = self.get_linear_gap_offsets(len(indices_2))
+        score_row = gap_values[: len(indices_2) + 1]
+        deletion_row = np.full(len(indices_2) + 1, get_impossible_score(gap_values.dtype), dtype=gap_values.dtype)
+        for i in range(1, len(indices_1) + 1):
+            score_row, deletion_row = self.get_next_linear_gap_rows(
+                score_row, deletion_row, gap_values[i], sigma_rows[indices_1[i - 1]], gap_offsets
+            )
+
+        return score_row[-1]
+
+    # Fill the score matrix with the fastest method for the gap function
+    def get_score_matrix(self, indices_1, indices_2, sigma_array, gap_values):
+        # The alpha and beta gap keeps a running maximum per row and column, so each cell takes constant time
+        if self.gap_function is None:
+            return self.fill_linear_gap_table(indices_1, indices_2, sigma_array, gap_values)
+
+        # A gap function whose extra terms add no more, or no less, than the ones before keeps a list of the candidate gap
+        # starts that can still be optimal
+        gap_table_kind = self.get_gap_table_kind(gap_values)
+        if gap_table_kind == "newer_starts":
+            return self.fill_candidate_gap_table(indices_1, indices_2, sigma_array, gap_values, False)
+        elif gap_table_kind == "older_starts":
+            return self.fill_candidate_gap_table(indices_1, indices_2, sigma_array, gap_values, True)
+
+        # Any other gap function has to try every gap length at every cell
+        return self.fill_general_gap_table(indices_1, indices_2, sigma_array, gap_values)
+
+    # Get the method that fills the score matrix for the gap values; with extra terms that add no more than the ones before, as
+    # for convex penalties, a newer gap start stays ahead of an older one once it catches up, and with extra terms that add
+    # no less than the ones before, as for concave penalties like a logarithm of the length, an older gap start does
+    def get_gap_table_kind(self, gap_values):
+        if self.gap_function is None:
+            return "linear"
+
+        # Floating point gap values are rounded, so the second differences of a smooth gap function may be off by a little
+        second_differences = np.diff(gap_values[1:], n=2)
+        tolerance = 0
+        if np.issubdtype(gap_values.dtype, np.floating) and len(gap_values) > 1:
+            tolerance = GAP_SHAPE_TOLERANCE * max(1.0, float(np.max(np.abs(gap_values[1:]))))
+        if np.all(second_differences <= tolerance):
+            return "newer_starts"
+        elif np.all(second_differences >= -tolerance):
+            return "older_starts"
+        return "general"
+
+    # Fill the score matrix for the alpha and beta gap with a running maximum of the gaps ending at each row and column
+    def fill_linear_gap_table(self, indices_1, indices_2, sigma_array, gap_values):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # The first row and column are the recursive base cases
+        score_matrix = np.empty((dna_size_1 + 1, dna_size_2 + 1), dtype=gap_values.dtype)
+        score_matrix[0] = gap_values[: dna_size_2 + 1]
+
+        # Running maximum of the deletions that end at each column of the current row
+        deletion_row = np.full(dna_size_2 + 1, get_impossible_score(gap_values.dtype), dtype=gap_values.dtype)
+
+        # Fill the score matrix row by row
+        sigma_rows = get_sigma_profile(sigma_array, indices_2)
+        gap_offsets = self.get_linear_gap_offsets(dna_size_2)
+        for i in range(1, dna_size_1 + 1):
+            score_matrix[i], deletion_row = self.get_next_linear_gap_rows(
+                score_matrix[i - 1], deletion_row, gap_values[i], sigma_rows[indices_1[i - 1]], gap_offsets
+            )
 
-        return sigma
+        return score_matrix
+
+    # Compute a row of the score matrix for the alpha and beta gap, along with the deletions ending at each of its columns
+    def get_next_linear_gap_rows(self, previous_row, deletion_row, first_value, sigma_row, gap_offsets):
+        # Deletions either start after the previous row or extend the deletions that ended there
+        deletion_row = np.maximum(previous_row + self.alpha, deletion_row + self.beta)
+
+        # A match or a deletion only depends on the previous row, so both are computed for the whole row at once
+        current_row = np.empty_like(previous_row)
+        current_row[0] = first_value
+        current_row[1:] = np.maximum(previous_row[:-1] + sigma_row, deletion_row[1:])
+
+        # Insertions chain along the row, which is a running maximum once the gap offsets are taken out
+        opened = np.maximum.accumulate(current_row - gap_offsets)
+        current_row[1:] = np.maximum(current_row[1:], opened[:-1] + gap_offsets[:-1] + self.alpha)
+
+        return current_row, deletion_row
+
+    # Compute the gap offsets for chaining insertions along a row; consecutive gaps score best as one gap when beta is at
+    # least alpha, and as separate gaps of one term otherwise
+    def get_linear_gap_offsets(self, dna_size):
+        return max(self.alpha, self.beta) * np.arange(dna_size + 1)
+
+    # Compute the gap value of every possible number of consecutive insertions or deletions; index 0 is an empty gap
+    def get_gap_values(self, longest_gap, sigma_array):
+        gap_values = np.asarray([0] + [self.compute_gap(length) for length in range(1, longest_gap + 1)])
+        return gap_values.astype(np.result_type(sigma_array, gap_values))
+
+    # Fill the score matrix with a list of candidate gap starts for each row and column, where either the newer or the older
+    # of two gap starts stays ahead once it catches up to the other
+    def fill_candidate_gap_table(self, indices_1, indices_2, sigma_array, gap_values, older_starts_dominate):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # Pick the candidate list that keeps the gap starts which can still be optimal
+        get_best_candidate = self.get_best_gap_candidate
+        add_candidate = self.add_gap_candidate
+        if older_starts_dominate:
+            get_best_candidate = self.get_best_older_gap_candidate
+            add_candidate = self.add_older_gap_candidate
+
+        # Use Python lists since every cell is visited one at a time
+        gaps = gap_values.tolist()
+        sigma_rows = sigma_array.tolist()
+        indices_2 = indices_2.tolist()
+
+        # The first row and column are the recursive base cases, and each is the only candidate gap start to begin with
+        rows = [gaps[: dna_size_2 + 1]]
+        columns = [[gap] for gap in gaps[: dna_size_2 + 1]]
+        column_candidates = [self.get_first_gap_candidates(dna_size_1, older_starts_dominate) for _ in range(dna_size_2 + 1)]
+
+        # Fill the score matrix row by row
+        for i in range(1, dna_size_1 + 1):
+            previous_row = rows[-1]
+            current_row = [gaps[i]]
+            row_candidates = self.get_first_gap_candidates(dna_size_2, older_starts_dominate)
+            sigma_row = sigma_rows[indices_1[i - 1]]
+
+            for j in range(1, dna_size_2 + 1):
+                # Use the best candidate gap starts to find the best insertion and deletion
+                start = get_best_candidate(row_candidates, j)
+                insertion = current_row[start] + gaps[j - start]
+                start = get_best_candidate(column_candidates[j], i)
+                deletion = columns[j][start] + gaps[i - start]
+
+                # Find the maximum action and make the cell a candidate gap start for its row and column
+                current_row.append(max(previous_row[j - 1] + sigma_row[indices_2[j - 1]], insertion, deletion))
+                columns[j].append(current_row[j])
+                add_candidate(row_candidates, current_row, j, dna_size_2, gaps)
+                add_candidate(column_candidates[j], columns[j], i, dna_size_1, gaps)
+
+            rows.append(current_row)
+
+        return np.asarray(rows, dtype=gap_values.dtype)
+
+    # Fill the score matrix for any gap function by trying every number of consecutive insertions and deletions
+    def fill_general_gap_table(self, indices_1, indices_2, sigma_array, gap_values):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # The first row and column are the recursive base cases
+        score_matrix = np.empty((dna_size_1 + 1, dna_size_2 + 1), dtype=gap_values.dtype)
+        score_matrix[0] = gap_values[: dna_size_2 + 1]
+        score_matrix[:, 0] = gap_values[: dna_size_1 + 1]
+
+        # Fill the score matrix one cell at a time
+        for i in range(1, dna_size_1 + 1):
+            for j in range(1, dna_size_2 + 1):
+                match = score_matrix[i - 1, j - 1] + sigma_array[indices_1[i - 1], indices_2[j - 1]]
+                insertion = np.max(score_matrix[i, :j][::-1] + gap_values[1:][:j])
+                deletion = np.max(score_matrix[:i, j][::-1] + gap_values[1:][:i])
+                score_matrix[i, j] = max(match, insertion, deletion)
+
+        return score_matrix
+
+    # Get the candidate gap starts of a row or column before any cell of it is filled, where the first cell is the only
+    # candidate; each candidate holds the first position where it is the best when newer gap starts dominate, and the last
+    # position where it is the best when older gap starts dominate
+    def get_first_gap_candidates(self, last_position, older_starts_dominate):
+        if older_starts_dominate:
+            return [[0, last_position]]
+        return deque([[0, 1]])
+
+    # Return the candidate gap start that is best at a position, dropping candidates that can no longer be best
+    def get_best_gap_candidate(self, candidates, position):
+        while len(candidates) > 1 and candidates[1][1] <= position:
+            candidates.popleft()
+
+        return candidates[0][0]
+
+    # Add a new gap start to the candidates, which are in order of the position where each becomes the best candidate
+    def add_gap_candidate(self, candidates, scores, new_start, last_position, gaps):
+        # There are no positions left where the new gap start could be used
+        if new_start >= last_position:
+            return
+
+        # With a concave gap function a newer gap start stays at least as good once it catches up to an older one
+        while candidates:
+            start, position = candidates[-1]
+            position = max(position, new_start + 1)
+
+            # Remove the newest candidate if the new gap start is already at least as good everywhere it was the best
+            if scores[new_start] + gaps[position - new_start] >= scores[start] + gaps[position - start]:
+                candidates.pop()
+                continue
+
+            # Binary search for the first position where the new gap start catches up to the newest candidate
+            low = position + 1
+            high = last_position + 1
+            while low < high:
+                middle = (low + high) // 2
+                if scores[new_start] + gaps[middle - new_start] >= scores[start] + gaps[middle - start]:
+                    high = middle
+                else:
+                    low = middle + 1
+
+            if low <= last_position:
+                candidates.append([new_start, low])
+            return
+
+        candidates.append([new_start, new_start + 1])
+
+    # Return the candidate gap start that is best at a position when older gap starts dominate, dropping the newest
+    # candidates whose positions have all gone by
+    def get_best_older_gap_candidate(self, candidates, position):
+        while candidates[-1][1] < position:
+            candidates.pop()
+
+        return candidates[-1][0]
+
+    # Add a new gap start to the candidates when older gap starts dominate, which are a stack with the newest candidate on
+    # top, each holding the last position where it is the best candidate
+    def add_older_gap_candidate(self, candidates, scores, new_start, last_position, gaps):
+        # There are no positions left where the new gap start could be used
+        if new_start >= last_position:
+            return
+
+        # Drop the candidates whose positions all come before the first position where the new gap start can be used
+        first_position = new_start + 1
+        while candidates and candidates[-1][1] < first_position:
+            candidates.pop()
+
+        # A newer gap start falls behind an older one for longer gaps, so it takes over at most the nearest positions
+        while candidates:
+            start, position = candidates[-1]
+
+            # Remove the newest candidate if the new gap start is still at least as good at its last position
+            if scores[new_start] + gaps[position - new_start] >= scores[start] + gaps[position - start]:
+                candidates.pop()
+                continue
+
+            # Binary search for the first position where the new gap start falls behind the newest candidate
+            low = first_position
+            high = position
+            while low < high:
+                middle = (low + high) // 2
+                if scores[new_start] + gaps[middle - new_start] >= scores[start] + gaps[middle - start]:
+                    low = middle + 1
+                else:
+                    high = middle
+
+            if low > first_position:
+                candidates.append([new_start, low - 1])
+            return
+
+        candidates.append([new_start, last_position])
+
+    # Convert a DNA sequence to an array of indices into the sigma array
+    def get_sigma_indices(self, dna_sequence):
+        # The codes of a DNA sequence are its sigma array indices
+        return DnaSequence(dna_sequence).codes
+
+    # Compute the gap value of a number of consecutive insertions or deletions
+    def compute_gap(self, length):
+        # Use the gap function if one was given, otherwise alpha opens the gap and beta extends it
+        if self.gap_function is not None:
+            return self.gap_function(length)
+
+        return self.alpha + self.beta * (length - 1)
+
+    # Gather the sigma profile of the second DNA sequence as lists, for the engines that look up one sigma value at a time
+    def prepare_sigma_values(self):
+        self.sigma_codes_1 = self.get_sigma_indices(self.dna_sequence_1).tolist()
+        self.sigma_values = get_sigma_profile(self.sigma_array, self.dna_sequence_2).tolist()
+
+    # Get the sigma value of the i-th term of the first DNA sequence against the j-th term of the second DNA sequence
+    def get_sigma_value(self, i, j):
+        return self.sigma_values[self.sigma_codes_1[i - 1]][j - 1]
 
 
 if __name__ == "__main__":
@@ -1,6 +1,38 @@
 #!/usr/bin/env python3
 import numpy as np
 
+from dp_band import BandedScoreMatrix
+from dp_cache import BoundedCache, recursion_limit
+from dp_sequence import DnaSequence, get_sigma_profile
+from dp_shared import (
+    STRIPED_DTYPES,
+    STRIPED_LANES,
+    AlignmentResultMethods,
+    chain_local_gaps,
+    chain_striped_gaps,
+    get_impossible_score,
+    get_previous_positions,
+    get_rest_bound,
+    get_striped_dtype,
+    get_striped_values,
+)
+
+# Actions in the order the recursion checks them, so a later action wins a tie for the previous action
+ACTIONS = ("deletion", "insertion", "match")
+
+# Bit shift of the 2-bit code of the previous action of each action in a byte of the direction matrix of the table engine
+DIRECTION_SHIFTS = {"deletion": 0, "insertion": 2, "match": 4}
+
+# Ends of the DNA sequences whose gaps can be made free, where a leading gap skips the terms of a DNA sequence before the
+# alignment starts and a trailing gap skips the terms after it ends
+FREE_END_GAPS = ("leading_1", "trailing_1", "leading_2", "trailing_2")
+
+# Engines that can fill the score matrix
+ENGINES = ("recursive", "memoized", "table", "myers_miller", "wavefront", "striped")
+
+# Largest set of score matrices the Myers-Miller engine fills directly instead of splitting the alignment in half
+MYERS_MILLER_TABLE_CELLS = 1 << 14
+
 
 # Main function to simplify Pairwise Alignment Code
 def main():
@@ -44,55 +76,176 @@ def main():
 
 
 # Class Definition for the Pairwise Alignment functions
-class PairwiseAlignment:
+class PairwiseAlignment(AlignmentResultMethods):
     # Init function that globalizes the sigma_array, alpha, beta, and dna_sequence variables
-    def __init__(self, sigma_array: np.array, alpha: int, beta: int, dna_sequence_1: list, dna_sequence_2: list):
+    def __init__(
+        self,
+        sigma_array: np.array,
+        alpha: int,
+        beta: int,
+        dna_sequence_1: list,
+        dna_sequence_2: list,
+        engine: str = "recursive",
+        cache_size: int = None,
+        cache_policy: str = "lru",
+        track_memory: bool = False,
+        band: int = None,
+        x_drop: int = None,
+        mode: str = "global",
+        free_end_gaps: tuple = (),
+        min_score: int = None,
+    ):
         self.alpha = alpha
         self.beta = beta
         self.sigma_array = sigma_array
-        self.dna_sequence_1 = []
-        for term in dna_sequence_1:
-            self.dna_sequence_1.append(term)
-        self.dna_sequence_2 = []
-        for term in dna_sequence_2:
-            self.dna_sequence_2.append(term)
+        self.engine = engine
+        self.track_memory = track_memory
+        self.band = band
+        self.x_drop = x_drop
+        self.mode = mode
+        self.free_end_gaps = tuple(free_end_gaps)
+        self.min_score = min_score
+        self.cache = BoundedCache(cache_size, cache_policy)
+        self.stats = {}
+
+        # Store the DNA sequences as arrays of codes, where a DnaSequence is used without copying it
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.dna_sequence_2 = DnaSequence(dna_sequence_2)
 
     def pairwise_alignment(self):
-        # Instantiate the top and bottom alignment strings
-        top_pairwise_alignment = ""
-        bottom_pairwise_alignment = ""
-
-        # Create copies of the DNA sequence arrays in order to modify them
-        dna_sequence_1 = self.dna_sequence_1[:]
-        dna_sequence_2 = self.dna_sequence_2[:]
-
-        # Get the actions to produce the optimal alignment and the corresponding score
-        score, actions = self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
-
-        # Iterate for each action
-        for action in actions:
-            # Logic for a "deletion"
-            if action == "deletion":
-                # Add the current value from the first DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + "_"
-
-            # Logic for an "insertion"
-            elif action == "insertion":
-                # Add the current value from the second DNA sequence and a blank space to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + "_"
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
+        # Align the DNA sequences and render the alignment from the run-length actions in time linear in its length
+        alignment_result = self.alignment_result()
+
+        return str(alignment_result), alignment_result.score, alignment_result.get_actions()
+
+    # Function that calculates only the optimal score, keeping two rows of each action's score matrix at a time, since every
+    # engine fills the same score matrices
+    def score_only(self):
+        self.check_alignment_options()
+
+        # The local mode needs the whole score matrices to find their best cell, and the band and X-drop modes only fill the
+        # cells near the diagonal, so both keep the cells of the table engine
+        if self.mode != "global" or self.band is not None or self.x_drop is not None:
+            return self.get_score_and_actions()[0]
+
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        sigma_array = np.asarray(self.sigma_array)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0
+
+        # Free end gaps change the base cases and the cell where the alignment ends, so the rows keep running along the first
+        # DNA sequence and the last column of each action is kept along with the last rows
+        if len(self.free_end_gaps) > 0:
+            score_rows, last_columns = self.get_last_score_rows_and_columns(indices_1, indices_2)
+            if score_rows is None:
+                return None
+            return self.get_end_cell(score_rows, last_columns)[3]
+
+        # Make the rows run along the shorter DNA sequence; swapping the DNA sequences swaps insertions and deletions,
+        # which score the same, and transposes the sigma array
+        if len(indices_2) > len(indices_1):
+            indices_1, indices_2 = indices_2, indices_1
+            sigma_array = sigma_array.T
+
+        # Fill the score rows of each action down to the last row
+        sigma_rows = get_sigma_profile(sigma_array, indices_2)
+        gap_offsets = self.beta * np.arange(len(indices_2) + 1)
+        score_rows = self.get_first_score_rows(len(indices_2), "match", gap_offsets)
+        for i, index_1 in enumerate(indices_1):
+            if not self.can_reach_min_score(score_rows, i, len(indices_1)):
+                return None
+            score_rows = self.get_next_score_rows(score_rows, sigma_rows[index_1], gap_offsets)
+        if not self.can_reach_min_score(score_rows, len(indices_1), len(indices_1)):
+            return None
+
+        # The score is the value of the best final action
+        final_values = {action: score_rows[action][-1] for action in ACTIONS}
+        action = self.get_final_action(final_values, len(indices_1), len(indices_2), None)
+
+        return final_values[action]
+
+    # Check that the free end gaps are known ends and that the table engine is used without a band or X-drop
+    def check_free_end_gaps(self):
+        unknown_ends = [end for end in self.free_end_gaps if end not in FREE_END_GAPS]
+        if len(unknown_ends) > 0:
+            raise ValueError(f"Unknown free end gaps {unknown_ends}, expected any of {', '.join(FREE_END_GAPS)}")
+        if self.engine != "table" or self.band is not None or self.x_drop is not None:
+            raise ValueError(f"Free end gaps need the 'table' engine without a band or X-drop, got '{self.engine}'")
+
+    # Check that the engine, the mode, and the options can be used together, so that the full alignment and the score alone
+    # reject the same combinations
+    def check_alignment_options(self):
+        # The minimum score is checked against each row of the table engine as the rows are filled
+        if self.min_score is not None and (
+            self.mode != "global" or self.engine != "table" or self.band is not None or self.x_drop is not None
+        ):
+            raise ValueError(
+                f"A minimum score needs the 'table' engine in the global mode without a band or X-drop, got '{self.engine}'"
+            )
+
+        # The local mode fills its own score matrices on the table engine, where every cell can start an alignment
+        if self.mode == "local":
+            if self.engine != "table" or self.band is not None or self.x_drop is not None or len(self.free_end_gaps) > 0:
+                raise ValueError(
+                    f"The local mode needs the 'table' engine without a band, X-drop, or free end gaps, got '{self.engine}'"
+                )
+        elif self.mode != "global":
+            raise ValueError(f"Unknown mode '{self.mode}', expected 'global' or 'local'")
+
+        # Free end gaps change the base cases and the cell where the table engine's traceback starts
+        if len(self.free_end_gaps) > 0:
+            self.check_free_end_gaps()
+
+        # The band and X-drop modes only limit the cells the table engine fills
+        if (self.band is not None or self.x_drop is not None) and self.engine != "table":
+            raise ValueError(f"The band and X-drop modes need the 'table' engine, got '{self.engine}'")
+
+        # Every other engine fills the same score matrices in its own order
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{self.engine}', expected any of {', '.join(ENGINES)}")
+
+    # Function that runs the selected engine on the full DNA sequences
+    def get_score_and_actions(self):
+        self.check_alignment_options()
+
+        # The local mode fills its own score matrices, where every cell can start an alignment
+        if self.mode == "local":
+            return self.get_score_and_actions_from_local()
+
+        # The band and X-drop modes only limit the cells the table engine fills
+        if self.band is not None or self.x_drop is not None:
+            return self.get_score_and_actions_from_band()
+
+        # The recursive engine is the reference formulation and is only practical for short sequences
+        if self.engine == "recursive":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_dp(self.dna_sequence_1, self.dna_sequence_2)
+
+        # The memoized engine keeps the recursive formulation but caches each action and pair of prefix lengths
+        elif self.engine == "memoized":
+            self.prepare_sigma_values()
+            return self.get_score_and_actions_from_memo()
 
-            # Logic for a "match"
-            elif action == "match":
-                # Add the current value from the first and second DNA sequences to the running alignments
-                top_pairwise_alignment = top_pairwise_alignment + dna_sequence_1.pop(0)
-                bottom_pairwise_alignment = bottom_pairwise_alignment + dna_sequence_2.pop(0)
+        # The table engine fills a score matrix for each action from the bottom up
+        elif self.engine == "table":
+            return self.get_score_and_actions_from_table()
 
-        # Concentrate the top and bottom alignments to get the final pairwise alignment
-        pairwise_alignment = top_pairwise_alignment + "\n" + bottom_pairwise_alignment
+        # The Myers-Miller engine only keeps a few rows of each score matrix at a time
+        elif self.engine == "myers_miller":
+            return self.get_score_and_actions_from_myers_miller()
 
-        return pairwise_alignment, score, actions
+        # The wavefront engine fills the score matrix of each action one anti-diagonal at a time
+        elif self.engine == "wavefront":
+            return self.get_score_and_actions_from_wavefront()
+
+        # The striped engine fills the score matrix of each action one column at a time with the first DNA sequence striped
+        # across lanes
+        elif self.engine == "striped":
+            return self.get_score_and_actions_from_striped()
 
     # Function that calculates the optimal actions and score of the optimal actions with Dynamic Programming
     def get_score_and_actions_from_dp(self, dna_sequence_1, dna_sequence_2):
@@ -100,6 +253,10 @@ class PairwiseAlignment:
         dna_size_1 = len(dna_sequence_1)
         dna_size_2 = len(dna_sequence_2)
 
+        # If both of the DNA sequences are empty, there are no actions to take
+        if dna_size_1 == 0 and dna_size_2 == 0:
+            return 0, []
+
         # Define an empty set to hold the possible actions with their corresponding values and action lists
         action_values = {}
 
@@ -149,7 +306,7 @@ class PairwiseAlignment:
         recursive_dna_size_2 = len(recursive_dna_sequence_2)
 
         # Calculate the sigma value for the last terms in the DNA sequences
-        match_value = self.compute_sigma(dna_sequence_1[-1], dna_sequence_2[-1])
+        match_value = self.get_sigma_value(len(dna_sequence_1), len(dna_sequence_2))
 
         # If both of the DNA sequences are empty, we have hit the base case
         if recursive_dna_size_1 == 0 and recursive_dna_size_2 == 0:
@@ -206,17 +363,15 @@ class PairwiseAlignment:
 
     # Dynamic Programming function for the insertion action
     def insertion_dp(self, dna_sequence_1, dna_sequence_2):
-        # Create DNA sequence arrays without the last term to do recursion
-        recursive_dna_sequence_1 = dna_sequence_1[:-1]
+        # Create a DNA sequence array without the last term to do recursion
         recursive_dna_sequence_2 = dna_sequence_2[:-1]
 
         # Define variables to hold the size of the different DNA sequences
         dna_size_1 = len(dna_sequence_1)
-        recursive_dna_size_1 = len(recursive_dna_sequence_1)
         recursive_dna_size_2 = len(recursive_dna_sequence_2)
 
-        # If both of the DNA sequences are empty, we have hit the base case
-        if recursive_dna_size_1 == 0 and recursive_dna_size_2 == 0:
+        # If the first DNA sequence and the recursive second DNA sequence are empty, we have hit the base case
+        if dna_size_1 == 0 and recursive_dna_size_2 == 0:
             return self.alpha, ["insertion"]
 
         # If it is not at the base case, do the following
@@ -268,17 +423,15 @@ class PairwiseAlignment:
 
     # Dynamic Programming function for the deletion action
     def deletion_dp(self, dna_sequence_1, dna_sequence_2):
-        # Create DNA sequence arrays without the last term to do recursion
+        # Create a DNA sequence array without the last term to do recursion
         recursive_dna_sequence_1 = dna_sequence_1[:-1]
-        recursive_dna_sequence_2 = dna_sequence_2[:-1]
 
         # Define variables to hold the size of the different DNA sequences
         dna_size_2 = len(dna_sequence_2)
         recursive_dna_size_1 = len(recursive_dna_sequence_1)
-        recursive_dna_size_2 = len(recursive_dna_sequence_2)
 
-        # If both of the DNA sequences are empty, we have hit the base case
-        if recursive_dna_size_1 == 0 and recursive_dna_size_2 == 0:
+        # If the recursive first DNA sequence and the second DNA sequence are empty, we have hit the base case
+        if recursive_dna_size_1 == 0 and dna_size_2 == 0:
             return self.alpha, ["deletion"]
 
         # If it is not at the base case, do the following
@@ -328,19 +481,1113 @@ class PairwiseAlignment:
 
             return max_value, max_prev_actions
 
-    # Compute the sigma value by stripping the corresponding value from the sigma array
-    def compute_sigma(self, l1, l2):
-        # Define a set to use for indexing the sigma array
-        indexing = {"A": 0, "C": 1, "G": 2, "T": 3}
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with memoized recursion
+    def get_score_and_actions_from_memo(self):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(self.dna_sequence_1)
+        dna_size_2 = len(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if dna_size_1 == 0 and dna_size_2 == 0:
+            return 0, []
+
+        # The recursion goes at most one level deeper for each DNA term
+        with recursion_limit(dna_size_1 + dna_size_2 + 100):
+            # Define an empty set to hold the possible final actions with their corresponding values
+            action_values = {}
+            if dna_size_1 != 0 and dna_size_2 != 0:
+                action_values["match"] = self.get_score_and_action_from_memo("match", dna_size_1, dna_size_2)[0]
+            if dna_size_2 != 0:
+                action_values["insertion"] = self.get_score_and_action_from_memo("insertion", dna_size_1, dna_size_2)[0]
+            if dna_size_1 != 0:
+                action_values["deletion"] = self.get_score_and_action_from_memo("deletion", dna_size_1, dna_size_2)[0]
+
+            # Find the maximum final action; uses the last action in the set like the recursion
+            score = max(action_values.values())
+            action = [action for action, value in action_values.items() if value == score][-1]
+
+            # Follow the previous action of each action and pair of prefix lengths back to the base case
+            actions = []
+            i = dna_size_1
+            j = dna_size_2
+            while action is not None:
+                actions.append(action)
+                _, previous_action = self.get_score_and_action_from_memo(action, i, j)
+                if action != "insertion":
+                    i -= 1
+                if action != "deletion":
+                    j -= 1
+                action = previous_action
+
+        # Put the actions in order
+        actions.reverse()
+
+        return score, actions
+
+    # Function that calculates the optimal score and previous action when the first i and j terms end with the given action
+    def get_score_and_action_from_memo(self, action, i, j):
+        # If the action uses up both of the prefixes, we have hit the base case
+        if action == "match" and i == 1 and j == 1:
+            return self.get_sigma_value(1, 1), None
+        if (action == "insertion" and i == 0 and j == 1) or (action == "deletion" and i == 1 and j == 0):
+            return self.alpha, None
+
+        # Return the cached result if this action and pair of prefixes was already solved
+        result = self.cache.get((action, i, j))
+        if result is not None:
+            return result
+
+        # Define the prefixes before the action and the value added by the action for each previous action
+        if action == "match":
+            previous_i = i - 1
+            previous_j = j - 1
+            match_value = self.get_sigma_value(i, j)
+            added_values = {"deletion": match_value, "insertion": match_value, "match": match_value}
+        elif action == "insertion":
+            previous_i = i
+            previous_j = j - 1
+            added_values = {"deletion": self.alpha, "insertion": self.beta, "match": self.alpha}
+        else:
+            previous_i = i - 1
+            previous_j = j
+            added_values = {"deletion": self.beta, "insertion": self.alpha, "match": self.alpha}
 
-        # Find the indices of the letters from the indexing set
-        index_l1 = indexing[l1]
-        index_l2 = indexing[l2]
+        # Define an empty set to hold the possible previous actions with their corresponding values
+        action_values = {}
+        if previous_i != 0:
+            deletion = self.get_score_and_action_from_memo("deletion", previous_i, previous_j)[0]
+            action_values["deletion"] = deletion + added_values["deletion"]
+        if previous_j != 0:
+            insertion = self.get_score_and_action_from_memo("insertion", previous_i, previous_j)[0]
+            action_values["insertion"] = insertion + added_values["insertion"]
+        if previous_i != 0 and previous_j != 0:
+            match = self.get_score_and_action_from_memo("match", previous_i, previous_j)[0]
+            action_values["match"] = match + added_values["match"]
+
+        # Find the maximum previous action; uses the last action in the set to prioritize match actions
+        max_value = max(action_values.values())
+        previous_action = [action for action, value in action_values.items() if value == max_value][-1]
+        result = (max_value, previous_action)
+
+        self.cache.put((action, i, j), result)
+
+        return result
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_dp with Gotoh's three matrices
+    def get_score_and_actions_from_table(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0, []
+
+        # Fill the score rows of each action while recording the previous action of every action and cell, find the cell and
+        # the final action where the alignment ends, and walk the directions back from it once
+        score_rows, direction_matrix, last_columns = self.get_direction_matrix(indices_1, indices_2)
+        if score_rows is None:
+            return None, []
+        i, j, action, score = self.get_end_cell(score_rows, last_columns)
+        actions = self.get_actions_from_direction_matrix(direction_matrix, i, j, action)
+
+        # A free trailing gap skips the rest of a DNA sequence after the end cell
+        actions.extend(["deletion"] * (len(indices_1) - i))
+        actions.extend(["insertion"] * (len(indices_2) - j))
+
+        return score, actions
+
+    # Function that calculates the optimal actions and score like the table engine, but only fills the cells inside the band
+    # around the main diagonal that the X-drop keeps
+    def get_score_and_actions_from_band(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0, []
+
+        # Fill the cells of a score matrix for each action inside the band and the X-drop
+        score_matrices = self.get_banded_score_matrices(indices_1, indices_2)
+        self.stats["cells_computed"] = score_matrices["match"].cells
+
+        # If the X-drop pruned every path to the last cell, fall back to the full score matrices
+        is_pruned = not any(score_matrices[action].is_computed(len(indices_1), len(indices_2)) for action in ACTIONS)
+        if is_pruned:
+            score_matrices = self.get_score_matrices(indices_1, indices_2, "match")
+            self.stats["cells_computed"] += score_matrices["match"].size
+
+        # Find the best final action, trace the actions back from it, and check whether a cell that was not filled could lead
+        # to a better alignment
+        final_values = {action: score_matrices[action][-1, -1] for action in ACTIONS}
+        action = self.get_final_action(final_values, len(indices_1), len(indices_2), None)
+        actions = self.get_actions_from_score_matrices(score_matrices, indices_1, indices_2, action)
+        score = final_values[action]
+        self.stats["band_constrained"] = is_pruned or self.is_band_constrained(
+            score_matrices, len(indices_1), len(indices_2), score
+        )
+
+        return score, actions
+
+    # Yield the local alignments one after another as their score, actions, start cell, and best cell, where the cells of
+    # each alignment are blocked before the next one is found
+    def iter_local_alignments(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+        dtype = self.get_score_dtype()
+
+        # Column j of the sigma rows holds the sigma values against term j of the second DNA sequence, where the first column
+        # has no term to match
+        sigma_profile = get_sigma_profile(self.sigma_array, indices_2)
+        sigma_rows = np.full((len(sigma_profile), len(indices_2) + 1), get_impossible_score(dtype), dtype=dtype)
+        sigma_rows[:, 1:] = sigma_profile
+
+        # Fill every row of the score matrices, keeping the best score of each row so the best cell is found without a scan
+        score_matrices = {action: np.empty((len(indices_1) + 1, len(indices_2) + 1), dtype=dtype) for action in ACTIONS}
+        blocked_cells = np.zeros(score_matrices["match"].shape, dtype=bool)
+        row_maxima = np.empty(len(blocked_cells), dtype=dtype)
+        for i in range(len(blocked_cells)):
+            self.fill_local_score_rows(score_matrices, blocked_cells, i, 0, sigma_rows, indices_1)
+            row_maxima[i] = max(score_matrices[action][i].max() for action in ACTIONS)
+        self.stats["cells_computed"] = blocked_cells.size
+
+        # Take the best cell that is left until no cell is above zero
+        while True:
+            i = int(np.argmax(row_maxima))
+            best_row = np.maximum(
+                np.maximum(score_matrices["deletion"][i], score_matrices["insertion"][i]), score_matrices["match"][i]
+            )
+            j = int(np.argmax(best_row))
+            if not best_row[j] > 0:
+                return
+
+            # Find the best action in the cell; uses the last action in the set to prioritize match actions
+            action = [action for action in ACTIONS if score_matrices[action][i, j] == best_row[j]][-1]
+            actions, cells, start_cell = self.get_actions_from_local_score_matrices(
+                score_matrices, blocked_cells, sigma_rows, indices_1, i, j, action
+            )
+            yield best_row[j], actions, start_cell, (i, j)
+
+            self.refill_local_score_matrices(score_matrices, blocked_cells, cells, sigma_rows, indices_1, row_maxima)
+
+    # Block the cells of a local alignment and fill again the cells that depend on them, which are below them and to their
+    # right, stopping at the first row below the alignment that is left unchanged
+    def refill_local_score_matrices(self, score_matrices, blocked_cells, cells, sigma_rows, indices_1, row_maxima):
+        # Find the first blocked column of each row of the alignment, whose rows follow one another
+        blocked_starts = {}
+        for i, j in cells:
+            blocked_cells[i, j] = True
+            blocked_starts[i] = min(j, blocked_starts.get(i, j))
+
+        # A row is filled again from its first blocked column or from the first column that changed in the row above, since a
+        # change only reaches the cell below it, the cell below and to its right, and the insertions that chain from those
+        changed_start = None
+        for i in range(min(blocked_starts), len(blocked_cells)):
+            starts = [start for start in (changed_start, blocked_starts.get(i)) if start is not None]
+            if len(starts) == 0:
+                break
+            start = min(starts)
+            changed_columns = self.fill_local_score_rows(score_matrices, blocked_cells, i, start, sigma_rows, indices_1)
+            self.stats["cells_computed"] += blocked_cells.shape[1] - start
+            row_maxima[i] = max(score_matrices[action][i].max() for action in ACTIONS)
+            changed_start = start + int(changed_columns[0]) if len(changed_columns) > 0 else None
+
+    # Fill row i of each action's local score matrix from the start column on, where every cell can also start an alignment
+    # with a match score of zero and the blocked cells can only start one, and return the columns from the start whose score
+    # changed in any of the score matrices
+    def fill_local_score_rows(self, score_matrices, blocked_cells, i, start, sigma_rows, indices_1):
+        dtype = score_matrices["match"].dtype
+        impossible = get_impossible_score(dtype)
+        columns = slice(start, None)
+        blocked = blocked_cells[i, columns]
+
+        # A match or a deletion only depends on the row above, where the first row has no row above it
+        if i == 0:
+            match_row = np.zeros(len(blocked), dtype=dtype)
+            deletion_row = np.full(len(blocked), impossible, dtype=dtype)
+        else:
+            previous_rows = {action: score_matrices[action][i - 1] for action in ACTIONS}
+            previous_best = np.maximum(np.maximum(previous_rows["deletion"], previous_rows["insertion"]), previous_rows["match"])
+            diagonal_best = np.concatenate(([impossible], previous_best[:-1]))
+            match_row = np.maximum(diagonal_best[columns] + sigma_rows[indices_1[i - 1], columns], 0)
+            deletion_row = np.maximum(
+                previous_rows["deletion"][columns] + self.beta,
+                np.maximum(previous_rows["insertion"][columns], previous_rows["match"][columns]) + self.alpha,
+            )
+        match_row[blocked] = 0
+        deletion_row[blocked] = impossible
+
+        # An insertion opens from the deletion or match in the cell before it and chains along the row from the cell before
+        # the start, but never through a blocked cell
+        if start != 0:
+            first_opened = max(score_matrices["deletion"][i, start - 1], score_matrices["match"][i, start - 1])
+            first_value = score_matrices["insertion"][i, start - 1]
+        else:
+            first_opened = impossible
+            first_value = impossible
+        opened = np.concatenate(([first_opened], np.maximum(deletion_row, match_row)[:-1])) + self.alpha
+        insertion_row = chain_local_gaps(opened, first_value, self.beta, blocked, impossible)
+
+        # Store the rows and find the columns where any of them changed
+        score_rows = {"deletion": deletion_row, "insertion": insertion_row, "match": match_row}
+        changed = np.zeros(len(blocked), dtype=bool)
+        for action in ACTIONS:
+            changed |= score_rows[action] != score_matrices[action][i, columns]
+            score_matrices[action][i, columns] = score_rows[action]
+
+        return np.flatnonzero(changed)
+
+    # Trace the actions of a local alignment back from an action in a cell of the local score matrices, breaking ties like the
+    # table engine, until a match is no better than starting over or is in a blocked cell; return the actions, the cells they
+    # align from the last one back, and the cell the alignment starts at
+    def get_actions_from_local_score_matrices(self, score_matrices, blocked_cells, sigma_rows, indices_1, i, j, action):
+        # Define the value added by each previous action for each gap action
+        gap_values = {
+            "insertion": {"deletion": self.alpha, "insertion": self.beta, "match": self.alpha},
+            "deletion": {"deletion": self.beta, "insertion": self.alpha, "match": self.alpha},
+        }
+
+        actions = []
+        cells = []
+        while True:
+            # Define the value added by the action for each previous action, where the match that starts the alignment adds
+            # nothing to a score of zero
+            if action == "match":
+                if blocked_cells[i, j] or i == 0 or j == 0:
+                    break
+                match_value = sigma_rows[indices_1[i - 1], j]
+                if match_value + max(score_matrices[previous][i - 1, j - 1] for previous in ACTIONS) <= 0:
+                    break
+                added_values = {"deletion": match_value, "insertion": match_value, "match": match_value}
+                cells.append((i, j))
+                i -= 1
+                j -= 1
+            elif action == "insertion":
+                added_values = gap_values["insertion"]
+                cells.append((i, j))
+                j -= 1
+            else:
+                added_values = gap_values["deletion"]
+                cells.append((i, j))
+                i -= 1
+            actions.append(action)
+
+            # Find the maximum previous action; uses the last action in the set to prioritize match actions
+            action_values = {action: score_matrices[action][i, j] + added_values[action] for action in ACTIONS}
+            max_value = max(action_values.values())
+            action = [action for action, value in action_values.items() if value == max_value][-1]
+
+        actions.reverse()
+
+        return actions, cells, (i, j)
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_table along anti-diagonals
+    def get_score_and_actions_from_wavefront(self):
+        # Convert the DNA sequences to sigma array indices so a whole anti-diagonal of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0, []
+
+        # Fill a score matrix for each action, find the best final action, and trace the actions back like the table engine
+        score_matrices = self.get_score_matrices_by_wavefront(indices_1, indices_2)
+        final_values = {action: score_matrices[action][-1, -1] for action in ACTIONS}
+        action = self.get_final_action(final_values, len(indices_1), len(indices_2), None)
+        actions = self.get_actions_from_score_matrices(score_matrices, indices_1, indices_2, action)
+
+        return score_matrices[action][-1, -1], actions
+
+    # Function that calculates the same optimal actions and score as get_score_and_actions_from_table with a striped query
+    def get_score_and_actions_from_striped(self):
+        # Convert the DNA sequences to sigma array indices so the query profile can be built at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0, []
+
+        # Fill a score matrix for each action, find the best final action, and trace the actions back like the table engine
+        score_matrices = self.get_score_matrices_by_striping(indices_1, indices_2)
+        final_values = {action: score_matrices[action][-1, -1] for action in ACTIONS}
+        action = self.get_final_action(final_values, len(indices_1), len(indices_2), None)
+        actions = self.get_actions_from_score_matrices(score_matrices, indices_1, indices_2, action)
+
+        return score_matrices[action][-1, -1], actions
+
+    # Function that calculates the same optimal actions and score in linear space by splitting the alignment in half
+    def get_score_and_actions_from_myers_miller(self):
+        # Convert the DNA sequences to sigma array indices so a whole row of sigma values can be looked up at once
+        indices_1 = self.get_sigma_indices(self.dna_sequence_1)
+        indices_2 = self.get_sigma_indices(self.dna_sequence_2)
+
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(indices_1) == 0 and len(indices_2) == 0:
+            return 0, []
+
+        # Build the actions half by half, starting as if after a match like the first row of the table engine
+        actions = []
+        score = self.align_with_myers_miller(indices_1, indices_2, "match", None, actions)
+
+        return score, actions
+
+    # Append the optimal actions for two DNA sequences to the running list of actions and return their score
+    # The alignment starts after the start action, and ends with the end action or the best final action if it is None
+    def align_with_myers_miller(self, indices_1, indices_2, start_action, end_action, actions):
+        # Define variables for the size of each DNA sequence
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+
+        # Small alignments and alignments with a single row use score matrices, which only take linear space here
+        if dna_size_1 <= 1 or (dna_size_1 + 1) * (dna_size_2 + 1) <= MYERS_MILLER_TABLE_CELLS:
+            score_matrices = self.get_score_matrices(indices_1, indices_2, start_action)
+            final_values = {action: score_matrices[action][-1, -1] for action in ACTIONS}
+            action = self.get_final_action(final_values, dna_size_1, dna_size_2, end_action)
+            actions.extend(self.get_actions_from_score_matrices(score_matrices, indices_1, indices_2, action))
+            return score_matrices[action][-1, -1]
+
+        # Fill the score rows down to the middle row, then keep filling while tracking for every action and cell the
+        # action and column where its traceback crosses the middle row, which gives a point of the optimal traceback
+        middle = dna_size_1 // 2
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.beta * np.arange(dna_size_2 + 1)
+        score_rows = self.get_first_score_rows(dna_size_2, start_action, gap_offsets)
+        for index_1 in indices_1[:middle]:
+            score_rows = self.get_next_score_rows(score_rows, sigma_rows[index_1], gap_offsets)
+        crossing_rows = {action: len(ACTIONS) * np.arange(dna_size_2 + 1) + code for code, action in enumerate(ACTIONS)}
+        for index_1 in indices_1[middle:]:
+            score_rows, crossing_rows = self.get_next_score_and_crossing_rows(
+                score_rows, crossing_rows, sigma_rows[index_1], gap_offsets
+            )
+
+        # The split is a cell of the middle row along with the action that ends there, which is the deletion or insertion
+        # action when the traceback crosses the middle row inside a gap
+        final_values = {action: score_rows[action][-1] for action in ACTIONS}
+        action = self.get_final_action(final_values, dna_size_1, dna_size_2, end_action)
+        split, code = divmod(int(crossing_rows[action][-1]), len(ACTIONS))
+
+        # Align each half on its own, in order; the second half starts after the action the first half ends with
+        self.align_with_myers_miller(indices_1[:middle], indices_2[:split], start_action, ACTIONS[code], actions)
+        self.align_with_myers_miller(indices_1[middle:], indices_2[split:], ACTIONS[code], end_action, actions)
+
+        return score_rows[action][-1]
+
+    # Compute the score rows of each action and where the traceback of each of their cells crosses the middle row
+    def get_next_score_and_crossing_rows(self, previous_rows, previous_crossing_rows, sigma_row, gap_offsets):
+        score_rows = self.get_next_score_rows(previous_rows, sigma_row, gap_offsets)
+
+        # A match comes from the cell before it on the diagonal with its best previous action
+        match_crossings = np.full_like(previous_crossing_rows["match"], -1)
+        match_crossings[1:] = self.choose_crossings(
+            {action: previous_rows[action][:-1] + sigma_row for action in ACTIONS},
+            {action: previous_crossing_rows[action][:-1] for action in ACTIONS},
+        )
+
+        # A deletion comes from the cell above it with its best previous action
+        deletion_crossings = self.choose_crossings(
+            {
+                "deletion": previous_rows["deletion"] + self.beta,
+                "insertion": previous_rows["insertion"] + self.alpha,
+                "match": previous_rows["match"] + self.alpha,
+            },
+            previous_crossing_rows,
+        )
+
+        # An insertion comes from the cell to its left, so a previous insertion takes the crossing of the nearest cell to
+        # the left where the insertion started after a deletion or a match
+        insertion_values = {
+            "deletion": score_rows["deletion"][:-1] + self.alpha,
+            "insertion": score_rows["insertion"][:-1] + self.beta,
+            "match": score_rows["match"][:-1] + self.alpha,
+        }
+        max_values = np.maximum(
+            np.maximum(insertion_values["deletion"], insertion_values["insertion"]), insertion_values["match"]
+        )
+        is_match = insertion_values["match"] == max_values
+        is_insertion = insertion_values["insertion"] == max_values
+        is_insertion &= ~is_match
+        insertion_crossings = np.full_like(previous_crossing_rows["insertion"], -1)
+        insertion_crossings[1:] = np.where(is_match, match_crossings[:-1], deletion_crossings[:-1])
+        sources = np.arange(len(insertion_crossings))
+        sources[1:][is_insertion] = 0
+        np.maximum.accumulate(sources, out=sources)
+
+        crossing_rows = {
+            "deletion": deletion_crossings,
+            "insertion": insertion_crossings[sources],
+            "match": match_crossings,
+        }
+
+        return score_rows, crossing_rows
+
+    # Choose the crossing of the best previous action for every cell; uses the last best action to prioritize match actions
+    def choose_crossings(self, action_values, crossing_rows):
+        max_values = np.maximum(np.maximum(action_values["deletion"], action_values["insertion"]), action_values["match"])
+        crossings = np.where(action_values["insertion"] == max_values, crossing_rows["insertion"], crossing_rows["deletion"])
+        return np.where(action_values["match"] == max_values, crossing_rows["match"], crossings)
+
+    # Fill a score matrix for each action, where each cell is the optimal score of a pair of prefixes ending with the action
+    def get_score_matrices(self, indices_1, indices_2, start_action):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.beta * np.arange(len(indices_2) + 1)
+
+        # Start the first row of each matrix as if after the start action, then fill the matrices row by row
+        score_rows = self.get_first_score_rows(len(indices_2), start_action, gap_offsets)
+        score_matrices = {
+            action: np.empty((len(indices_1) + 1, len(indices_2) + 1), dtype=score_rows[action].dtype) for action in ACTIONS
+        }
+        for i in range(len(indices_1) + 1):
+            if i != 0:
+                score_rows = self.get_next_score_rows(score_rows, sigma_rows[indices_1[i - 1]], gap_offsets)
+            for action in ACTIONS:
+                score_matrices[action][i] = score_rows[action]
+
+        return score_matrices
+
+    # Fill the score rows of each action two rows at a time, keeping only the previous action of each action in each cell as
+    # a 2-bit code, which fits all three actions of a cell in a byte, and return the last score rows with the direction matrix
+    def get_direction_matrix(self, indices_1, indices_2):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.beta * np.arange(len(indices_2) + 1)
+        free_start = "leading_1" in self.free_end_gaps
+
+        # The first row is only reached by insertions
+        score_rows = self.get_first_score_rows(len(indices_2), "match", gap_offsets, "leading_2" in self.free_end_gaps)
+        direction_matrix = np.zeros((len(indices_1) + 1, len(indices_2) + 1), dtype=np.uint8)
+        direction_matrix[0, 1:] = self.get_insertion_directions(score_rows)
+
+        # Fill the score rows row by row and record the directions and the last cell of each row
+        last_columns = {action: np.empty(len(indices_1) + 1, dtype=score_rows[action].dtype) for action in ACTIONS}
+        for action in ACTIONS:
+            last_columns[action][0] = score_rows[action][-1]
+        for i in range(1, len(indices_1) + 1):
+            if not self.can_reach_min_score(score_rows, i - 1, len(indices_1), last_columns):
+                return None, None, None
+            previous_rows = score_rows
+            score_rows = self.get_next_score_rows(previous_rows, sigma_rows[indices_1[i - 1]], gap_offsets, free_start)
+            direction_matrix[i] = self.get_directions(previous_rows, score_rows, sigma_rows[indices_1[i - 1]])
+            for action in ACTIONS:
+                last_columns[action][i] = score_rows[action][-1]
+        if not self.can_reach_min_score(score_rows, len(indices_1), len(indices_1), last_columns):
+            return None, None, None
+
+        return score_rows, direction_matrix, last_columns
+
+    # Find the previous action of each action in each cell of a row, breaking ties in the same order as the recursion
+    def get_directions(self, previous_rows, score_rows, sigma_row):
+        directions = np.zeros(len(score_rows["match"]), dtype=np.uint8)
+
+        # A deletion comes from the cell above
+        deletion_values = {
+            "deletion": previous_rows["deletion"] + self.beta,
+            "insertion": previous_rows["insertion"] + self.alpha,
+            "match": previous_rows["match"] + self.alpha,
+        }
+        directions |= self.choose_directions(deletion_values) << DIRECTION_SHIFTS["deletion"]
+
+        # An insertion comes from the cell to the left and a match from the cell above and to the left, so neither reaches
+        # the first column
+        directions[1:] |= self.get_insertion_directions(score_rows)
+        match_values = {action: previous_rows[action][:-1] + sigma_row for action in ACTIONS}
+        directions[1:] |= self.choose_directions(match_values) << DIRECTION_SHIFTS["match"]
+
+        return directions
+
+    # Find the previous action of the insertions in each cell of a row after the first column, shifted into place
+    def get_insertion_directions(self, score_rows):
+        insertion_values = {
+            "deletion": score_rows["deletion"][:-1] + self.alpha,
+            "insertion": score_rows["insertion"][:-1] + self.beta,
+            "match": score_rows["match"][:-1] + self.alpha,
+        }
+        return self.choose_directions(insertion_values) << DIRECTION_SHIFTS["insertion"]
+
+    # Choose the code of the best previous action; uses the last best action to prioritize match actions, which is the
+    # largest code of the actions that reach the maximum
+    def choose_directions(self, action_values):
+        max_values = np.maximum(np.maximum(action_values["deletion"], action_values["insertion"]), action_values["match"])
+        return np.maximum(
+            (action_values["match"] == max_values).view(np.uint8) << 1, (action_values["insertion"] == max_values).view(np.uint8)
+        )
+
+    # Walk the directions back from the final action in a cell of a direction matrix to rebuild the optimal actions
+    def get_actions_from_direction_matrix(self, direction_matrix, i, j, action):
+        actions = []
+
+        # Stop at the match that starts the alignment, which is in the first cell unless a free leading gap lets it start
+        # anywhere in the first row or column
+        while action != "match" or (i != 0 and j != 0):
+            actions.append(action)
+            previous_action = ACTIONS[(direction_matrix[i, j] >> DIRECTION_SHIFTS[action]) & 3]
+            if action != "insertion":
+                i -= 1
+            if action != "deletion":
+                j -= 1
+            action = previous_action
+
+        # Add the free leading gap before the start and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return actions
+
+    # Fill the cells of the score matrix of each action, starting after a match, inside the band of diagonals around the main
+    # diagonal that the X-drop keeps, which trims each row to the cells between the first and last cells where the best
+    # action is not more than X below the best score so far
+    def get_banded_score_matrices(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        gap_offsets = self.beta * np.arange(dna_size_2 + 1)
+        first_rows = self.get_first_score_rows(dna_size_2, "match", gap_offsets)
+        impossible = get_impossible_score(first_rows["match"].dtype)
+
+        # Column j of the sigma rows holds the sigma values against term j - 1, and the first column has no match
+        sigma_array = np.asarray(self.sigma_array)
+        sigma_rows = np.zeros((sigma_array.shape[0], dna_size_2 + 1), dtype=first_rows["match"].dtype)
+        sigma_rows[:, 1:] = get_sigma_profile(sigma_array, indices_2)
+
+        # The band covers the diagonals j - i from the diagonal of the first cell to the diagonal of the last cell, widened
+        # by the band on both sides
+        lowest_diagonal = -dna_size_1
+        highest_diagonal = dna_size_2
+        if self.band is not None:
+            if self.band < 0:
+                raise ValueError(f"Band must be at least 0, got {self.band}")
+            lowest_diagonal = min(0, dna_size_2 - dna_size_1) - self.band
+            highest_diagonal = max(0, dna_size_2 - dna_size_1) + self.band
+        if self.x_drop is not None and self.x_drop < 0:
+            raise ValueError(f"X-drop must be at least 0, got {self.x_drop}")
+
+        # Fill the rows one at a time, where the X-drop keeps the range of columns between the first and last cells where the
+        # best action is not more than X below the best score so far
+        score_matrices = {action: BandedScoreMatrix(dna_size_2 + 1, impossible) for action in ACTIONS}
+        best_score = None
+        for i in range(dna_size_1 + 1):
+            # The cells of a row come from the cells of the previous rows above or diagonally before them and from the cells
+            # to their left, and the first rows start from the first cell
+            limit = min(i + highest_diagonal, dna_size_2) + 1
+            start = 0
+            stop = limit
+            if i != 0:
+                start = max(score_matrices["match"].row_starts[-1], i + lowest_diagonal)
+                stop = min(score_matrices["match"].get_row_stop(i - 1) + 1, limit)
+            sigma_row = sigma_rows[indices_1[i - 1]] if i != 0 else None
+            while start < stop:
+                score_rows = self.get_next_banded_score_rows(
+                    score_matrices, i, start, stop, limit, sigma_row, gap_offsets, first_rows, best_score
+                )
+                if self.x_drop is None:
+                    break
+
+                # Keep the rows up to their last kept cell if they start with a kept cell, or else fill them again without
+                # the cells before their first kept cell, since the insertions they start are left out with them
+                best_values = np.maximum(np.maximum(score_rows["deletion"], score_rows["insertion"]), score_rows["match"])
+                row_best_score = best_values.max() if best_score is None else max(best_score, best_values.max())
+                kept = np.flatnonzero(best_values >= row_best_score - self.x_drop)
+                if len(kept) != 0 and kept[0] == 0:
+                    best_score = row_best_score
+                    stop_kept = kept[-1] + 1
+                    score_rows = {action: score_rows[action][:stop_kept] for action in ACTIONS}
+                    break
+
+                # Every alignment starts from the first cell, so the first rows cannot be filled again without it
+                start = stop if len(kept) == 0 or i == 0 else start + kept[0]
+            if start >= stop:
+                break
+
+            for action in ACTIONS:
+                score_matrices[action].append_row(start, score_rows[action])
+
+        return score_matrices
+
+    # Compute the cells of each action's row from the start column, up to the stop column from the kept cells of the
+    # previous rows, and past them up to the limit column through insertions
+    def get_next_banded_score_rows(self, score_matrices, i, start, stop, limit, sigma_row, gap_offsets, first_rows, best_score):
+        # The first rows are the same as in the table engine
+        if i == 0:
+            return {action: first_rows[action][:stop].copy() for action in ACTIONS}
+
+        # Line the previous rows up with the columns from start - 1 to stop - 1, where the columns they do not keep are
+        # impossible
+        impossible = score_matrices["match"].impossible
+        previous_start = score_matrices["match"].row_starts[i - 1]
+        previous_rows = {action: score_matrices[action].rows[i - 1] for action in ACTIONS}
+        overlap_start = max(previous_start, start - 1)
+        overlap_stop = min(previous_start + len(previous_rows["match"]), stop)
+        target = slice(overlap_start - start + 1, overlap_stop - start + 1)
+        source = slice(overlap_start - previous_start, overlap_stop - previous_start)
+        previous_values = {}
+        for action in ACTIONS:
+            previous_values[action] = np.full(stop - start + 1, impossible, dtype=previous_rows[action].dtype)
+            previous_values[action][target] = previous_rows[action][source]
+
+        # A match or a deletion only depends on the previous rows, so both are computed for the whole row at once
+        score_rows = {
+            "match": sigma_row[start:stop]
+            + np.maximum(
+                np.maximum(previous_values["deletion"][:-1], previous_values["insertion"][:-1]), previous_values["match"][:-1]
+            )
+        }
+        score_rows["deletion"] = np.maximum(
+            previous_values["deletion"][1:] + self.beta,
+            np.maximum(previous_values["insertion"][1:], previous_values["match"][1:]) + self.alpha,
+        )
+
+        # An insertion is never possible in the first kept column, since the cell to its left is not kept
+        score_rows["insertion"] = np.full_like(score_rows["match"], impossible)
+        score_rows["insertion"] = self.get_insertion_row(score_rows, gap_offsets[start:stop])
+
+        # Cells past the previous rows are only reached by insertions from the left, which the X-drop stops once they drop
+        # more than X below the best score so far
+        tail_length = limit - stop
+        first_tail_value = max(
+            max(score_rows["deletion"][-1], score_rows["match"][-1]) + self.alpha, score_rows["insertion"][-1] + self.beta
+        )
+        if self.x_drop is not None and self.beta < 0:
+            threshold = max(best_score, max(row.max() for row in score_rows.values())) - self.x_drop
+            tail_length = min(tail_length, max(0, int((first_tail_value - threshold) // -self.beta) + 1))
+        if tail_length > 0:
+            impossible_tail = np.full(tail_length, impossible, dtype=score_rows["match"].dtype)
+            insertion_tail = first_tail_value - gap_offsets[stop] + gap_offsets[stop:][:tail_length]
+            score_rows = {
+                "deletion": np.concatenate((score_rows["deletion"], impossible_tail)),
+                "insertion": np.concatenate((score_rows["insertion"], insertion_tail)),
+                "match": np.concatenate((score_rows["match"], impossible_tail)),
+            }
+
+        return score_rows
+
+    # Check whether an alignment through a cell that the band or the X-drop left out could score more than the banded score.
+    # Such an alignment leaves the filled cells from a cell next to one that was left out, so the best action in that cell
+    # plus the rest bound from it caps the alignment
+    def is_band_constrained(self, score_matrices, dna_size_1, dna_size_2, score):
+        match_score, gap_score = self.get_rest_scores()
+        band = score_matrices["match"]
+        score_bound = -np.inf
+        row_stops = [band.get_row_stop(i) for i in range(len(band.rows))]
+        for i, start in enumerate(band.row_starts):
+            # A cell leaves the filled cells if the cell to its right, below it, or diagonally after it was left out, where
+            # every cell below the last filled row was left out
+            columns = np.arange(start, row_stops[i])
+            next_start, next_stop = (band.row_starts[i + 1], row_stops[i + 1]) if i + 1 < len(row_stops) else (0, 0)
+            leaves = (columns == row_stops[i] - 1) & (columns < dna_size_2)
+            if i < dna_size_1:
+                leaves |= (columns < next_start) | (columns >= next_stop)
+                leaves |= (columns < dna_size_2) & ((columns + 1 < next_start) | (columns + 1 >= next_stop))
+            if np.any(leaves):
+                best_row = np.maximum(
+                    np.maximum(score_matrices["deletion"].rows[i], score_matrices["insertion"].rows[i]), band.rows[i]
+                )
+                rest_bound = get_rest_bound(dna_size_1 - i, dna_size_2 - columns[leaves], match_score, gap_score)
+                score_bound = max(score_bound, np.max(best_row[leaves] + rest_bound))
+
+        return bool(score_bound > score)
+
+    # Fill the same score matrices as get_score_matrices one anti-diagonal at a time, starting after a match, since each
+    # cell only depends on cells of the two anti-diagonals before it
+    def get_score_matrices_by_wavefront(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        score_matrices = self.get_base_case_score_matrices(dna_size_1, dna_size_2)
+        if dna_size_2 == 0:
+            return score_matrices
+
+        # Cell (i, j) is at i * (dna_size_2 + 1) + j in each flattened matrix, so the cells of an anti-diagonal are a
+        # strided slice with a step of dna_size_2, and shifted views put each cell at the same index as the cell diagonally
+        # before it, the cell above it, and the cell to its left
+        cells = {action: score_matrices[action].reshape(-1) for action in ACTIONS}
+        step = dna_size_2
+        above_offset = 1
+        left_offset = step + 1
+        current_offset = step + 2
+        current_cells = {action: cells[action][current_offset:] for action in ACTIONS}
+        above_cells = {action: cells[action][above_offset:] for action in ACTIONS}
+        left_cells = {action: cells[action][left_offset:] for action in ACTIONS}
+
+        # Precompute the index arrays into the flattened sigma array; walking down an anti-diagonal walks back along the
+        # second DNA sequence, so its indices are reversed to make the sigma lookups of each anti-diagonal slices as well
+        sigma_array = np.asarray(self.sigma_array)
+        sigma_values = sigma_array.reshape(-1)
+        sigma_row_indices = indices_1.astype(np.intp) * sigma_array.shape[1]
+        reversed_indices_2 = indices_2[::-1]
+
+        # Fill each anti-diagonal, where i + j is the diagonal, below the first row and to the right of the first column
+        for diagonal in range(2, dna_size_1 + dna_size_2 + 1):
+            first_i = max(1, diagonal - dna_size_2)
+            last_i = min(dna_size_1, diagonal - 1)
+            cells_on_diagonal = slice((first_i - 1) * step + diagonal - 2, (last_i - 1) * step + diagonal - 1, step)
+
+            # A match adds the sigma value to the best action in the cell diagonally before it
+            row_start = first_i - 1
+            reversed_start = dna_size_2 - diagonal + first_i
+            reversed_stop = dna_size_2 - diagonal + last_i + 1
+            sigma_indices = sigma_row_indices[row_start:last_i] + reversed_indices_2[reversed_start:reversed_stop]
+            match_cells = current_cells["match"][cells_on_diagonal]
+            np.maximum(cells["deletion"][cells_on_diagonal], cells["insertion"][cells_on_diagonal], out=match_cells)
+            np.maximum(match_cells, cells["match"][cells_on_diagonal], out=match_cells)
+            match_cells += sigma_values[sigma_indices]
+
+            # A deletion extends a deletion in the cell above it or opens after an insertion or a match there
+            deletion_cells = current_cells["deletion"][cells_on_diagonal]
+            np.maximum(above_cells["insertion"][cells_on_diagonal], above_cells["match"][cells_on_diagonal], out=deletion_cells)
+            deletion_cells += self.alpha
+            np.maximum(above_cells["deletion"][cells_on_diagonal] + self.beta, deletion_cells, out=deletion_cells)
+
+            # An insertion extends an insertion in the cell to its left or opens after a deletion or a match there
+            insertion_cells = current_cells["insertion"][cells_on_diagonal]
+            np.maximum(left_cells["deletion"][cells_on_diagonal], left_cells["match"][cells_on_diagonal], out=insertion_cells)
+            insertion_cells += self.alpha
+            np.maximum(insertion_cells, left_cells["insertion"][cells_on_diagonal] + self.beta, out=insertion_cells)
+
+        return score_matrices
+
+    # Fill the same score matrices as get_score_matrices one column at a time, starting after a match, with the first DNA
+    # sequence as the query striped across lanes, so that query position q is in segment q % segment_length of lane
+    # q // segment_length
+    def get_score_matrices_by_striping(self, indices_1, indices_2):
+        dna_size_1 = len(indices_1)
+        dna_size_2 = len(indices_2)
+        score_matrices = self.get_base_case_score_matrices(dna_size_1, dna_size_2)
+        if dna_size_1 == 0 or dna_size_2 == 0:
+            return score_matrices
+
+        # In the first row, the best action and the best action to open a deletion after are always possible
+        first_rows = {action: score_matrices[action][0] for action in ACTIONS}
+        first_best_values = np.maximum(np.maximum(first_rows["deletion"], first_rows["insertion"]), first_rows["match"])
+        first_opening_values = np.maximum(first_rows["insertion"], first_rows["match"]) + self.alpha
+
+        # Precompute the query profile, which holds the sigma values of every query position against each term in striped
+        # order, so each column only looks up the profile of its term
+        segment_length = -(-dna_size_1 // STRIPED_LANES)
+        sigma_array = np.asarray(self.sigma_array)
+        profile = np.zeros((sigma_array.shape[1], STRIPED_LANES * segment_length), dtype=first_best_values.dtype)
+        profile[:, :dna_size_1] = get_sigma_profile(sigma_array.T, indices_1)
+        profile = profile.reshape(sigma_array.shape[1], STRIPED_LANES, segment_length).transpose(0, 2, 1)
+
+        # Scores change by at most one step per action, and the deletion offsets of a lane add up to one step per segment,
+        # so a data type is wide enough while the scores stay this far from a quarter of its range
+        step_size = max(abs(self.alpha), abs(self.beta), np.abs(sigma_array).max())
+        margin = (segment_length + 2) * step_size
+        first_magnitude = max(np.abs(first_best_values).max().item(), np.abs(first_opening_values).max().item())
+        magnitude = max(first_magnitude, np.abs(score_matrices["deletion"][1:, 0]).max().item()) + margin
+
+        # Start from the narrowest data type, or the data type of the scores if they are floats
+        dtype = np.dtype(STRIPED_DTYPES[0])
+        if np.issubdtype(first_best_values.dtype, np.floating):
+            dtype = first_best_values.dtype
+        columns = {action: get_striped_values(score_matrices[action][1:, 0], segment_length) for action in ACTIONS}
+        striped_profile = None
+        for j in range(1, dna_size_2 + 1):
+            # Widen the data type before any score of this column could overflow, moving the cells where an action is
+            # impossible to the impossible score of the new data type
+            striped_dtype = get_striped_dtype(magnitude, dtype)
+            if striped_profile is None or striped_dtype != dtype:
+                dtype = striped_dtype
+                impossible = get_impossible_score(dtype)
+                columns = {action: np.maximum(column, dtype.type(impossible)).astype(dtype) for action, column in columns.items()}
+                striped_profile = profile.astype(dtype)
+                alpha = dtype.type(self.alpha)
+                beta = dtype.type(self.beta)
+                segment_offsets = beta * np.arange(segment_length, dtype=dtype)[:, None]
+
+            columns = self.get_next_striped_columns(
+                columns,
+                dtype.type(first_best_values[j - 1]),
+                dtype.type(first_opening_values[j]),
+                striped_profile[indices_2[j - 1]],
+                alpha,
+                beta,
+                segment_offsets,
+            )
+            magnitude = first_magnitude
+            for action in ACTIONS:
+                score_matrices[action][1:, j] = columns[action].T.reshape(-1)[:dna_size_1]
+                magnitude = max(magnitude, abs(columns[action].max().item()), abs(columns[action].min().item()))
+            magnitude += margin
+
+        self.stats["striped_dtype"] = dtype.name
+
+        return score_matrices
+
+    # Compute the striped column of each action from the columns before them, the first row values of the previous and
+    # current column, and the query profile of the term for the column
+    def get_next_striped_columns(
+        self, previous_columns, previous_best_value, opening_value, profile_column, alpha, beta, segment_offsets
+    ):
+        # A match adds the sigma value to the best action at the previous query position in the previous column
+        best_column = np.maximum(
+            np.maximum(previous_columns["deletion"], previous_columns["insertion"]), previous_columns["match"]
+        )
+        columns = {"match": get_previous_positions(best_column, previous_best_value)}
+        columns["match"] += profile_column
+
+        # An insertion extends an insertion or opens after a deletion or a match at the same query position in the previous
+        # column
+        columns["insertion"] = np.maximum(previous_columns["deletion"], previous_columns["match"])
+        columns["insertion"] += alpha
+        np.maximum(columns["insertion"], previous_columns["insertion"] + beta, out=columns["insertion"])
+
+        # A deletion extends a deletion or opens after an insertion or a match at the previous query position in the same
+        # column, starting from the first row
+        opening_column = np.maximum(columns["insertion"], columns["match"])
+        opening_column += alpha
+        columns["deletion"] = get_previous_positions(opening_column, opening_value)
+        chain_striped_gaps(columns["deletion"], segment_offsets)
+
+        # Deletions that cross from the last segment of a lane into the next lane are corrected lazily, which takes at most
+        # one pass per lane and usually none
+        while True:
+            carried_values = columns["deletion"][-1, :-1] + beta
+            if not (carried_values > columns["deletion"][0, 1:]).any():
+                return columns
+            np.maximum(columns["deletion"][0, 1:], carried_values, out=columns["deletion"][0, 1:])
+            chain_striped_gaps(columns["deletion"], segment_offsets)
+
+    # Get score matrices with the first row and column of each action filled in like the table engine starting after a
+    # match, where only deletions reach the first column below the first row
+    def get_base_case_score_matrices(self, dna_size_1, dna_size_2):
+        gap_offsets = self.beta * np.arange(dna_size_2 + 1)
+        score_rows = self.get_first_score_rows(dna_size_2, "match", gap_offsets)
+        dtype = score_rows["match"].dtype
+        impossible = get_impossible_score(dtype)
+        score_matrices = {action: np.full((dna_size_1 + 1, dna_size_2 + 1), impossible, dtype=dtype) for action in ACTIONS}
+        for action in ACTIONS:
+            score_matrices[action][0] = score_rows[action]
+        for i in range(1, dna_size_1 + 1):
+            score_matrices["deletion"][i, 0] = max(
+                score_matrices["deletion"][i - 1, 0] + self.beta,
+                max(score_matrices["insertion"][i - 1, 0], score_matrices["match"][i - 1, 0]) + self.alpha,
+            )
+
+        return score_matrices
+
+    # Compute the first score row of each action, where the empty prefixes end with the start action
+    def get_first_score_rows(self, dna_size_2, start_action, gap_offsets, free_start=False):
+        # Cells where the action is impossible hold a value far below any reachable score, and a free start lets the alignment
+        # start anywhere in the first row
+        dtype = self.get_score_dtype()
+        impossible = get_impossible_score(dtype)
+        score_rows = {action: np.full(dna_size_2 + 1, impossible, dtype=dtype) for action in ACTIONS}
+        score_rows[start_action][: len(score_rows[start_action]) if free_start else 1] = 0
+
+        # Insertions chain along the first row from the empty prefixes
+        score_rows["insertion"] = self.get_insertion_row(score_rows, gap_offsets)
+
+        return score_rows
+
+    # Compute the last rows of each action's score matrix and the last cell of every row with free end gaps, keeping two rows
+    # of each at a time
+    def get_last_score_rows_and_columns(self, indices_1, indices_2):
+        sigma_rows = get_sigma_profile(self.sigma_array, indices_2)
+        gap_offsets = self.beta * np.arange(len(indices_2) + 1)
+        free_start = "leading_1" in self.free_end_gaps
+
+        score_rows = self.get_first_score_rows(len(indices_2), "match", gap_offsets, "leading_2" in self.free_end_gaps)
+        last_columns = {action: np.empty(len(indices_1) + 1, dtype=score_rows[action].dtype) for action in ACTIONS}
+        for action in ACTIONS:
+            last_columns[action][0] = score_rows[action][-1]
+        for i, index_1 in enumerate(indices_1, start=1):
+            if not self.can_reach_min_score(score_rows, i - 1, len(indices_1), last_columns):
+                return None, None
+            score_rows = self.get_next_score_rows(score_rows, sigma_rows[index_1], gap_offsets, free_start)
+            for action in ACTIONS:
+                last_columns[action][i] = score_rows[action][-1]
+        if not self.can_reach_min_score(score_rows, len(indices_1), len(indices_1), last_columns):
+            return None, None
+
+        return score_rows, last_columns
+
+    # Check whether an alignment can still reach the minimum score from the score rows filled after i terms of the first DNA
+    # sequence, recording the cells computed so far and stopping the rows early once the score bound falls below it, where a
+    # free trailing gap on the first DNA sequence may already have ended an alignment in the last columns filled so far
+    def can_reach_min_score(self, score_rows, i, dna_size_1, last_columns=None):
+        if self.min_score is None:
+            return True
+        self.stats["cells_computed"] = (i + 1) * len(score_rows["match"])
+        self.stats["status"] = "completed"
+        if self.get_score_bound(score_rows, dna_size_1 - i) >= self.min_score:
+            return True
+        if "trailing_1" in self.free_end_gaps and last_columns is not None:
+            if max(np.max(last_columns[action][: i + 1]) for action in ACTIONS) >= self.min_score:
+                return True
+        self.stats["status"] = "rejected_early"
+        return False
+
+    # Get an upper bound on the final score from the score rows, which is the best action in the best cell of the rows plus
+    # the most the rest of the DNA sequences can add: the largest sigma value for each pair of terms that can still be
+    # matched and the larger of alpha and beta for each gap, where a free trailing gap scores zero
+    def get_score_bound(self, score_rows, rows_left):
+        best_row = np.maximum(np.maximum(score_rows["deletion"], score_rows["insertion"]), score_rows["match"])
+        match_score, gap_score = self.get_rest_scores()
+        columns_left = np.arange(len(best_row) - 1, -1, -1)
+        score_bound = np.max(best_row + get_rest_bound(rows_left, columns_left, match_score, gap_score))
+
+        # A free leading gap on the first DNA sequence lets an alignment start in the first column of any later row with a
+        # score of zero, where the bound on the rest is largest when the rows left are none, all, or as many as the columns
+        if "leading_1" in self.free_end_gaps:
+            later_rows_left = np.array([0, min(rows_left, len(columns_left) - 1), rows_left])
+            score_bound = max(score_bound, np.max(get_rest_bound(later_rows_left, len(columns_left) - 1, match_score, gap_score)))
+
+        return score_bound
+
+    # Get the most a pair of terms and a gap can add to an alignment, where a gap adds at most the larger of alpha and beta,
+    # a free trailing gap scores zero, and two gaps can stand in for a match, so a pair of terms adds whichever is larger
+    def get_rest_scores(self):
+        gap_score = max(self.alpha, self.beta)
+        if "trailing_1" in self.free_end_gaps or "trailing_2" in self.free_end_gaps:
+            gap_score = max(gap_score, 0)
+        return max(np.max(self.sigma_array), 2 * gap_score), gap_score
+
+    # Find the cell and the final action where the alignment ends along with its score, which is the last cell unless a free
+    # trailing gap reaches a better cell of the last column or the last row; ties go to the last cell, then to the lowest
+    # cell of the last column
+    def get_end_cell(self, last_rows, last_columns):
+        i = len(last_columns["match"]) - 1
+        j = len(last_rows["match"]) - 1
+        end_values = {action: last_rows[action][j] for action in ACTIONS}
+        end_score = max(end_values.values())
+        if "trailing_1" in self.free_end_gaps:
+            best_column = np.maximum(np.maximum(last_columns["deletion"], last_columns["insertion"]), last_columns["match"])
+            row = len(best_column) - 1 - int(np.argmax(best_column[::-1]))
+            if best_column[row] > end_score:
+                i, end_score = row, best_column[row]
+                end_values = {action: last_columns[action][row] for action in ACTIONS}
+        if "trailing_2" in self.free_end_gaps:
+            best_row = np.maximum(np.maximum(last_rows["deletion"], last_rows["insertion"]), last_rows["match"])
+            column = len(best_row) - 1 - int(np.argmax(best_row[::-1]))
+            if best_row[column] > end_score:
+                i, j, end_score = len(last_columns["match"]) - 1, column, best_row[column]
+                end_values = {action: last_rows[action][column] for action in ACTIONS}
+        # Find the final action like get_final_action, where the actions that are not possible in the cell are far below the
+        # end score
+        action = [action for action in ("match", "insertion", "deletion") if end_values[action] == end_score][-1]
+
+        return i, j, action, end_score
+
+    # Compute the score row of each action from the rows above them and the sigma values of the term for the row, where a
+    # free start lets the alignment start in the first column
+    def get_next_score_rows(self, previous_rows, sigma_row, gap_offsets, free_start=False):
+        impossible = get_impossible_score(previous_rows["match"].dtype)
+
+        # A match or a deletion only depends on the previous row, so both are computed for the whole row at once
+        score_rows = {"match": np.full_like(previous_rows["match"], impossible)}
+        if free_start:
+            score_rows["match"][0] = 0
+        score_rows["match"][1:] = sigma_row + np.maximum(
+            np.maximum(previous_rows["deletion"][:-1], previous_rows["insertion"][:-1]), previous_rows["match"][:-1]
+        )
+        score_rows["deletion"] = np.maximum(
+            previous_rows["deletion"] + self.beta,
+            np.maximum(previous_rows["insertion"], previous_rows["match"]) + self.alpha,
+        )
+
+        # An insertion is never possible in the first column below the first row
+        score_rows["insertion"] = np.full_like(previous_rows["insertion"], impossible)
+        score_rows["insertion"] = self.get_insertion_row(score_rows, gap_offsets)
+
+        return score_rows
+
+    # Compute the insertion row from the deletion and match rows, which is a running maximum once the gap offsets are out
+    def get_insertion_row(self, score_rows, gap_offsets):
+        opened = np.maximum(score_rows["deletion"], score_rows["match"]) - gap_offsets
+        insertion_row = np.empty_like(score_rows["insertion"])
+        insertion_row[0] = score_rows["insertion"][0]
+        insertion_row[1:] = np.maximum(
+            np.maximum.accumulate(opened[:-1]) + gap_offsets[:-1] + self.alpha, insertion_row[0] + gap_offsets[1:]
+        )
+
+        return insertion_row
+
+    # Find the final action, which is the end action if there is one or else the best final action like the recursion
+    def get_final_action(self, final_values, dna_size_1, dna_size_2, end_action):
+        if end_action is not None:
+            return end_action
+
+        # Define an empty set to hold the possible final actions with their corresponding values
+        action_values = {}
+        if dna_size_1 != 0 and dna_size_2 != 0:
+            action_values["match"] = final_values["match"]
+        if dna_size_2 != 0:
+            action_values["insertion"] = final_values["insertion"]
+        if dna_size_1 != 0:
+            action_values["deletion"] = final_values["deletion"]
+
+        # Find the maximum final action; uses the last action in the set like the recursion
+        max_value = max(action_values.values())
+        return [action for action, value in action_values.items() if value == max_value][-1]
+
+    # Trace the actions back from the final action in the last cell, breaking ties in the same order as the recursion
+    def get_actions_from_score_matrices(self, score_matrices, indices_1, indices_2, action):
+        sigma_array = np.asarray(self.sigma_array)
+
+        # Define the value added by each previous action for each gap action
+        gap_values = {
+            "insertion": {"deletion": self.alpha, "insertion": self.beta, "match": self.alpha},
+            "deletion": {"deletion": self.beta, "insertion": self.alpha, "match": self.alpha},
+        }
+
+        # Trace the actions back until both prefixes are used up
+        actions = []
+        i = len(indices_1)
+        j = len(indices_2)
+        while True:
+            actions.append(action)
+
+            # Define the prefixes before the action and the value added by the action for each previous action
+            if action == "match":
+                match_value = sigma_array[indices_1[i - 1], indices_2[j - 1]]
+                added_values = {"deletion": match_value, "insertion": match_value, "match": match_value}
+                i -= 1
+                j -= 1
+            elif action == "insertion":
+                added_values = gap_values["insertion"]
+                j -= 1
+            else:
+                added_values = gap_values["deletion"]
+                i -= 1
 
-        # Obtain sigma using the indices from above to find the corresponding value in the sigma array
-        sigma = self.sigma_array[index_l1][index_l2]
+            # Stop once both prefixes are used up
+            if i == 0 and j == 0:
+                break
 
-        return sigma
+            # Find the maximum previous action; uses the last action in the set to prioritize match actions
+            action_values = {}
+            if i != 0:
+                action_values["deletion"] = score_matrices["deletion"][i, j] + added_values["deletion"]
+            if j != 0:
+                action_values["insertion"] = score_matrices["insertion"][i, j] + added_values["insertion"]
+            if i != 0 and j != 0:
+                action_values["match"] = score_matrices["match"][i, j] + added_values["match"]
+            max_value = max(action_values.values())
+            action = [action for action, value in action_values.items() if value == max_value][-1]
+
+        # Put the actions in order
+        actions.reverse()
+
+        return actions
+
+    # Get the data type that holds every score, which is a float if sigma, alpha, or beta are floats
+    def get_score_dtype(self):
+        return np.result_type(np.asarray(self.sigma_array), self.alpha, self.beta)
+
+    # Convert a DNA sequence to an array of indices into the sigma array
+    def get_sigma_indices(self, dna_sequence):
+        # The codes of a DNA sequence are its sigma array indices
+        return DnaSequence(dna_sequence).codes
+
+    # Gather the sigma profile of the second DNA sequence as lists, for the engines that look up one sigma value at a time
+    def prepare_sigma_values(self):
+        self.sigma_codes_1 = self.get_sigma_indices(self.dna_sequence_1).tolist()
+        self.sigma_values = get_sigma_profile(self.sigma_array, self.dna_sequence_2).tolist()
+
+    # Get the sigma value of the i-th term of the first DNA sequence against the j-th term of the second DNA sequence
+    def get_sigma_value(self, i, j):
+        return self.sigma_values[self.sigma_codes_1[i - 1]][j - 1]
 
 
 if __name__ == "__main__":
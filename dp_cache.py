@@ -0,0 +1,67 @@
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Eviction policies supported by the bounded cache
+CACHE_POLICIES = ("lru", "fifo")
+
+
+# Class Definition for the bounded cache used by the memoized engines
+class BoundedCache:
+    # Init function that globalizes the maximum size and eviction policy, a maximum size of None never evicts
+    def __init__(self, max_size: int = None, policy: str = "lru"):
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"Cache size must be at least 1 or None, got {max_size}")
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy '{policy}', expected one of {', '.join(CACHE_POLICIES)}")
+        self.max_size = max_size
+        self.policy = policy
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Return the cached value for a key, or None if the key is not cached
+    def get(self, key):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        # A hit makes the entry the most recently used one when evicting the least recently used entry
+        self.hits += 1
+        if self.policy == "lru":
+            self.entries.move_to_end(key)
+
+        return value
+
+    # Insert a value into the cache and evict the oldest entry if the cache is full
+    def put(self, key, value):
+        self.entries[key] = value
+        if self.policy == "lru":
+            self.entries.move_to_end(key)
+        if self.max_size is not None and len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # Remove every entry and reset the counters
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+# Context manager that raises the recursion limit to at least the given depth and restores it afterwards
+@contextmanager
+def recursion_limit(depth):
+    previous_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(previous_limit, depth))
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(previous_limit)
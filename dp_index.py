@@ -0,0 +1,175 @@
+import json
+import os
+
+import numpy as np
+
+from dp import PairwiseAlignment
+from dp_result import AlignmentResult
+from dp_sequence import DnaSequence, load_dna_sequence, save_dna_sequence
+
+# Number of terms in each k-mer of the index, where a k-mer of up to 32 terms fits in 64 bits at two bits per term
+INDEX_KMER_SIZE = 12
+
+# Most reference positions a k-mer of the read may have before it is skipped as a repeat
+INDEX_MAX_OCCURRENCES = 64
+
+# Number of reference terms added on each side of a candidate window before it is extended
+INDEX_WINDOW_PADDING = 32
+
+# Band of diagonals around the candidate window that the extension fills, which bounds the net length of the gaps
+INDEX_EXTEND_BAND = 16
+
+# Largest number of candidate windows extended for each read
+INDEX_MAX_CANDIDATES = 4
+
+
+# Class Definition for a k-mer index of a reference, which holds every k-mer of the reference in sorted order along with the
+# reference position it starts at, so the positions of a k-mer are found with a binary search
+class ReferenceIndex:
+    # Init function that builds the index of the reference, or wraps the sorted k-mers and positions of a saved index
+    def __init__(self, reference, kmer_size: int = INDEX_KMER_SIZE, kmers: np.ndarray = None, positions: np.ndarray = None):
+        if not 1 <= kmer_size <= 32:
+            raise ValueError(f"K-mer size must be from 1 to 32, got {kmer_size}")
+        self.reference = DnaSequence(reference)
+        self.kmer_size = kmer_size
+        self.stats = {}
+
+        # Sort the positions by their k-mers, keeping equal k-mers in the order of their positions
+        if kmers is None or positions is None:
+            reference_kmers = get_kmer_codes(self.reference, kmer_size)
+            positions = np.argsort(reference_kmers, kind="stable")
+            kmers = reference_kmers[positions]
+        self.kmers = kmers
+        self.positions = positions
+
+    # Find the reference positions of every k-mer of a read, skipping the k-mers with more positions than the most
+    # occurrences, and return the reference and read positions of each seed
+    def get_seeds(self, read, max_occurrences=INDEX_MAX_OCCURRENCES):
+        read_kmers = get_kmer_codes(read, self.kmer_size)
+        starts = np.searchsorted(self.kmers, read_kmers, side="left")
+        stops = np.searchsorted(self.kmers, read_kmers, side="right")
+        counts = stops - starts
+        self.stats["repeat_kmers"] = int(np.count_nonzero(counts > max_occurrences))
+        counts[counts > max_occurrences] = 0
+
+        # Expand each k-mer of the read into one seed per reference position
+        read_positions = np.repeat(np.arange(len(read_kmers)), counts)
+        offsets = np.arange(len(read_positions)) - np.repeat(np.cumsum(counts) - counts, counts)
+        reference_positions = self.positions[np.repeat(starts, counts) + offsets]
+        self.stats["seeds"] = len(read_positions)
+
+        return reference_positions, read_positions
+
+    # Chain the seeds into candidate windows of the reference, where the seeds on diagonals no more than the band apart are
+    # chained together, and return the best windows as reference ranges padded on both sides, from the most seeds down
+    def get_candidate_windows(self, reference_positions, read_positions, read_size, window_padding, band, max_candidates):
+        if len(reference_positions) == 0:
+            return []
+
+        # Each seed lies on the diagonal of the reference position where the read would start
+        diagonals = np.sort(np.asarray(reference_positions, dtype=np.int64) - read_positions)
+        chain_starts = np.flatnonzero(np.concatenate(([True], np.diff(diagonals) > band)))
+        chain_stops = np.append(chain_starts[1:], len(diagonals))
+
+        # Take the chains with the most seeds, where ties go to the chain that comes first along the reference
+        order = np.argsort(chain_starts - chain_stops, kind="stable")[:max_candidates]
+        windows = []
+        for chain in order:
+            start = max(int(diagonals[chain_starts[chain]]) - window_padding, 0)
+            stop = min(int(diagonals[chain_stops[chain] - 1]) + read_size + window_padding, len(self.reference))
+            windows.append((start, stop))
+
+        return windows
+
+    # Function that maps a read onto the reference by seeding it against the index, chaining the seeds into candidate
+    # windows, and extending only those windows with a banded semi-global alignment of the linear gap model of dp.py, where
+    # the scoring is the pair of the sigma array and delta; returns an AlignmentResult for each window from the best score
+    # down, placed on the whole reference
+    def map_read(
+        self,
+        read,
+        scoring,
+        max_occurrences=INDEX_MAX_OCCURRENCES,
+        window_padding=INDEX_WINDOW_PADDING,
+        band=INDEX_EXTEND_BAND,
+        max_candidates=INDEX_MAX_CANDIDATES,
+    ):
+        sigma_array, delta = scoring
+        read = DnaSequence(read)
+        self.stats = {}
+
+        # Seed the read and chain the seeds into the windows to extend
+        reference_positions, read_positions = self.get_seeds(read, max_occurrences)
+        windows = self.get_candidate_windows(reference_positions, read_positions, len(read), window_padding, band, max_candidates)
+        self.stats["candidates"] = len(windows)
+        self.stats["cells_computed"] = 0
+
+        results = []
+        for start, stop in windows:
+            # The padding around the read is skipped by free leading and trailing gaps on the reference
+            pairwise_alignment = PairwiseAlignment(
+                sigma_array,
+                delta,
+                self.reference[start:stop],
+                read,
+                engine="table",
+                band=band,
+                free_end_gaps=("leading_1", "trailing_1"),
+            )
+            alignment_result = pairwise_alignment.alignment_result()
+            self.stats["cells_computed"] += pairwise_alignment.stats["cells_computed"]
+
+            # Drop the free gaps and place the alignment on the whole reference
+            actions = alignment_result.get_actions()
+            leading_gap = get_run_length(actions, "deletion")
+            trailing_gap = get_run_length(actions[::-1], "deletion") if leading_gap < len(actions) else 0
+            actions = actions[leading_gap:][: len(actions) - leading_gap - trailing_gap]
+            results.append(AlignmentResult(self.reference, read, alignment_result.score, actions, start + leading_gap, 0))
+
+        results.sort(key=lambda result: result.score, reverse=True)
+
+        return results
+
+
+# Get the 2-bit code of the k-mer that starts at each position of a DNA sequence, with the first term in the highest bits
+def get_kmer_codes(dna_sequence, kmer_size):
+    codes = DnaSequence(dna_sequence).codes
+    kmer_count = max(len(codes) - kmer_size + 1, 0)
+
+    # Shift in one term of every k-mer at a time, so the k-mers are built in as many passes as they have terms
+    kmers = np.zeros(kmer_count, dtype=np.uint64)
+    for offset in range(kmer_size if kmer_count > 0 else 0):
+        kmers <<= np.uint64(2)
+        kmers |= codes[offset:][:kmer_count]
+
+    return kmers
+
+
+# Count the actions at the start of a list of actions that are the given action
+def get_run_length(actions, action):
+    run_length = 0
+    while run_length < len(actions) and actions[run_length] == action:
+        run_length += 1
+    return run_length
+
+
+# Save a reference index as a directory of .npy files, which can be memory-mapped when the index is loaded
+def save_reference_index(path, reference_index):
+    os.makedirs(path, exist_ok=True)
+    save_dna_sequence(os.path.join(path, "reference.npy"), reference_index.reference)
+    np.save(os.path.join(path, "kmers.npy"), reference_index.kmers)
+    np.save(os.path.join(path, "positions.npy"), reference_index.positions)
+    with open(os.path.join(path, "index.json"), "w") as handle:
+        json.dump({"kmer_size": reference_index.kmer_size}, handle)
+
+
+# Load a reference index saved with save_reference_index, memory-mapping the reference, the k-mers and the positions
+def load_reference_index(path):
+    with open(os.path.join(path, "index.json")) as handle:
+        kmer_size = json.load(handle)["kmer_size"]
+    return ReferenceIndex(
+        load_dna_sequence(os.path.join(path, "reference.npy")),
+        kmer_size,
+        np.load(os.path.join(path, "kmers.npy"), mmap_mode="r"),
+        np.load(os.path.join(path, "positions.npy"), mmap_mode="r"),
+    )
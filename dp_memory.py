@@ -0,0 +1,28 @@
+import tracemalloc
+
+
+# Class Definition for a context manager that measures the peak memory allocated while it is active
+class PeakMemory:
+    # Init function that starts the peak at zero
+    def __init__(self):
+        self.peak_bytes = 0
+        self.started_tracing = False
+        self.baseline_bytes = 0
+
+    # Start tracing allocations, or reuse the tracing that is already running, and reset the peak
+    def __enter__(self):
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.baseline_bytes = tracemalloc.get_traced_memory()[0]
+
+        return self
+
+    # Record the peak above the memory that was already allocated, and stop tracing if it was started here
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.peak_bytes = tracemalloc.get_traced_memory()[1] - self.baseline_bytes
+        if self.started_tracing:
+            tracemalloc.stop()
+
+        return False
@@ -0,0 +1,246 @@
+import numpy as np
+
+import dp
+import dp_bonus_2
+from dp_result import AlignmentResult
+from dp_sequence import DnaSequence, get_sigma_profile
+
+# Number of terms the buffer of the growing DNA sequence holds before it first grows
+ONLINE_INITIAL_CAPACITY = 64
+
+
+# Class Definition for aligning a fixed first DNA sequence against a second DNA sequence that grows as terms are appended,
+# with the linear gap model of dp.py, keeping the last column of the score matrix and the directions of every column
+class OnlineAlignment:
+    # Init function that globalizes the delta and sigma_array, fills the first column for the first DNA sequence, and appends
+    # the terms of the second DNA sequence that are already known
+    def __init__(self, sigma_array: np.array, delta: int, dna_sequence_1: list, dna_sequence_2: list = ""):
+        self.delta = delta
+        self.sigma_array = sigma_array
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.stats = {"cells_computed": 0}
+
+        # The pairwise alignment of the first DNA sequence holds the scoring helpers of the table engine
+        self.aligner = dp.PairwiseAlignment(sigma_array, delta, self.dna_sequence_1, "", engine="table")
+        self.indices_1 = self.aligner.get_sigma_indices(self.dna_sequence_1)
+        self.gap_offsets = self.aligner.get_gap_offsets(len(self.indices_1))
+
+        # Row a of the sigma columns holds the sigma value of every term of the first DNA sequence against the term with code a
+        self.sigma_columns = get_sigma_profile(np.asarray(sigma_array).T, self.indices_1)
+
+        # The first column is reached by deletions, and its first cell by no action at all
+        self.packed_size = -(-(len(self.indices_1) + 1) // 4)
+        self.score_column = self.gap_offsets
+        directions = np.full(len(self.indices_1) + 1, dp.DIRECTION_ACTIONS.index("deletion"), dtype=np.uint8)
+        self.direction_columns = [self.aligner.pack_directions(directions, self.packed_size)]
+
+        # The second DNA sequence is kept in a buffer that doubles when it is full
+        self.codes_2 = np.empty(ONLINE_INITIAL_CAPACITY, dtype=np.uint8)
+        self.dna_size_2 = 0
+        self.extend(dna_sequence_2)
+
+    # Append terms to the second DNA sequence, computing one column of the score matrix for each term in time linear in the
+    # length of the first DNA sequence
+    def extend(self, bases):
+        codes = DnaSequence(bases).codes
+        self.codes_2 = append_codes(self.codes_2, self.dna_size_2, codes)
+        self.dna_size_2 += len(codes)
+        self.dna_sequence_2 = DnaSequence(self.codes_2[: self.dna_size_2])
+
+        for code in codes:
+            previous_column = self.score_column
+            sigma_column = self.sigma_columns[code]
+
+            # Deletions chain down the column like insertions chain along a row, so the column is the next row of the score
+            # matrix of the swapped DNA sequences, whose insertions and deletions score the same
+            self.score_column = self.aligner.get_next_score_row(previous_column, sigma_column, self.gap_offsets)
+            directions = self.get_directions(previous_column, self.score_column, sigma_column)
+            self.direction_columns.append(self.aligner.pack_directions(directions, self.packed_size))
+            self.stats["cells_computed"] += len(self.score_column)
+
+    # Find the action that reaches each cell of a score column, breaking ties in the same order as the table engine
+    def get_directions(self, previous_column, score_column, sigma_column):
+        # Recompute the value of each action into the cells after the first row, which is reached by an insertion
+        deletion = score_column[:-1] + self.delta
+        insertion = previous_column[1:] + self.delta
+        match = previous_column[:-1] + sigma_column
+        max_values = np.maximum(np.maximum(deletion, insertion), match)
+
+        # Prioritize match actions, then insertion actions, then deletion actions, which is the largest code of the actions
+        # that reach the maximum
+        directions = np.full(len(score_column), dp.DIRECTION_ACTIONS.index("insertion"), dtype=np.uint8)
+        np.maximum((match == max_values).view(np.uint8) << 1, (insertion == max_values).view(np.uint8), out=directions[1:])
+
+        return directions
+
+    # Get the optimal score of aligning the first DNA sequence with the second DNA sequence so far
+    def get_score(self):
+        return self.score_column[-1]
+
+    # Function that aligns the DNA sequences so far, returning the same triple as the pairwise_alignment function of dp.py
+    def pairwise_alignment(self):
+        alignment_result = self.alignment_result()
+
+        return str(alignment_result), alignment_result.score, alignment_result.get_actions()
+
+    # Function that traces the optimal actions back from the last cell of the columns so far, returning an AlignmentResult
+    def alignment_result(self):
+        actions = []
+        i = len(self.indices_1)
+        j = self.dna_size_2
+        while i != 0 and j != 0:
+            action = dp.DIRECTION_ACTIONS[(self.direction_columns[j][i >> 2] >> dp.DIRECTION_SHIFTS[i & 3]) & 3]
+            actions.append(action)
+            if action != "insertion":
+                i -= 1
+            if action != "deletion":
+                j -= 1
+
+        # Add the base case actions for the remaining terms and put the actions in order
+        actions.extend(["deletion"] * i)
+        actions.extend(["insertion"] * j)
+        actions.reverse()
+
+        return AlignmentResult(self.dna_sequence_1, self.dna_sequence_2, self.get_score(), actions)
+
+
+# Class Definition for aligning a fixed first DNA sequence against a growing second DNA sequence like OnlineAlignment, but
+# with the affine gap model of dp_bonus_2.py, keeping the last column of each action's score matrix
+class OnlineAffineAlignment:
+    # Init function that globalizes the sigma_array, alpha, and beta, fills the first columns for the first DNA sequence, and
+    # appends the terms of the second DNA sequence that are already known
+    def __init__(self, sigma_array: np.array, alpha: int, beta: int, dna_sequence_1: list, dna_sequence_2: list = ""):
+        self.alpha = alpha
+        self.beta = beta
+        self.sigma_array = sigma_array
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.stats = {"cells_computed": 0}
+
+        # The pairwise alignment of the first DNA sequence holds the scoring helpers of the table engine
+        self.aligner = dp_bonus_2.PairwiseAlignment(sigma_array, alpha, beta, self.dna_sequence_1, "", engine="table")
+        self.indices_1 = self.aligner.get_sigma_indices(self.dna_sequence_1)
+        self.gap_offsets = beta * np.arange(len(self.indices_1) + 1)
+        self.sigma_columns = get_sigma_profile(np.asarray(sigma_array).T, self.indices_1)
+
+        # The first columns start with a match in the first cell and are reached by deletions below it
+        first_rows = self.aligner.get_first_score_rows(len(self.indices_1), "match", self.gap_offsets)
+        self.score_columns = self.swap_gaps(first_rows)
+        directions = np.zeros(len(self.indices_1) + 1, dtype=np.uint8)
+        directions[1:] = self.get_deletion_directions(self.score_columns)
+        self.direction_columns = [directions]
+
+        # The second DNA sequence is kept in a buffer that doubles when it is full
+        self.codes_2 = np.empty(ONLINE_INITIAL_CAPACITY, dtype=np.uint8)
+        self.dna_size_2 = 0
+        self.extend(dna_sequence_2)
+
+    # Append terms to the second DNA sequence, computing one column of each action's score matrix for each term in time
+    # linear in the length of the first DNA sequence
+    def extend(self, bases):
+        codes = DnaSequence(bases).codes
+        self.codes_2 = append_codes(self.codes_2, self.dna_size_2, codes)
+        self.dna_size_2 += len(codes)
+        self.dna_sequence_2 = DnaSequence(self.codes_2[: self.dna_size_2])
+
+        for code in codes:
+            previous_columns = self.score_columns
+            sigma_column = self.sigma_columns[code]
+
+            # The columns are the next rows of the score matrices of the swapped DNA sequences, where insertions and deletions
+            # trade places
+            next_rows = self.aligner.get_next_score_rows(self.swap_gaps(previous_columns), sigma_column, self.gap_offsets)
+            self.score_columns = self.swap_gaps(next_rows)
+            self.direction_columns.append(self.get_directions(previous_columns, self.score_columns, sigma_column))
+            self.stats["cells_computed"] += len(self.score_columns["match"])
+
+    # Swap the score rows or columns of the insertions and deletions
+    def swap_gaps(self, score_rows):
+        return {"deletion": score_rows["insertion"], "insertion": score_rows["deletion"], "match": score_rows["match"]}
+
+    # Find the previous action of each action in each cell of a column, breaking ties in the same order as the table engine
+    def get_directions(self, previous_columns, score_columns, sigma_column):
+        directions = np.zeros(len(score_columns["match"]), dtype=np.uint8)
+
+        # An insertion comes from the cell to the left
+        insertion_values = {
+            "deletion": previous_columns["deletion"] + self.alpha,
+            "insertion": previous_columns["insertion"] + self.beta,
+            "match": previous_columns["match"] + self.alpha,
+        }
+        directions |= self.aligner.choose_directions(insertion_values) << dp_bonus_2.DIRECTION_SHIFTS["insertion"]
+
+        # A deletion comes from the cell above and a match from the cell above and to the left, so neither reaches the
+        # first row
+        directions[1:] |= self.get_deletion_directions(score_columns)
+        match_values = {action: previous_columns[action][:-1] + sigma_column for action in dp_bonus_2.ACTIONS}
+        directions[1:] |= self.aligner.choose_directions(match_values) << dp_bonus_2.DIRECTION_SHIFTS["match"]
+
+        return directions
+
+    # Find the previous action of the deletions in each cell of a column after the first row, shifted into place
+    def get_deletion_directions(self, score_columns):
+        deletion_values = {
+            "deletion": score_columns["deletion"][:-1] + self.beta,
+            "insertion": score_columns["insertion"][:-1] + self.alpha,
+            "match": score_columns["match"][:-1] + self.alpha,
+        }
+        return self.aligner.choose_directions(deletion_values) << dp_bonus_2.DIRECTION_SHIFTS["deletion"]
+
+    # Get the optimal score of aligning the first DNA sequence with the second DNA sequence so far, along with the final
+    # action that reaches it
+    def get_score_and_final_action(self):
+        # If both of the DNA sequences are empty, there are no actions to take
+        if len(self.indices_1) == 0 and self.dna_size_2 == 0:
+            return 0, None
+
+        final_values = {action: self.score_columns[action][-1] for action in dp_bonus_2.ACTIONS}
+        action = self.aligner.get_final_action(final_values, len(self.indices_1), self.dna_size_2, None)
+
+        return final_values[action], action
+
+    # Get the optimal score of aligning the first DNA sequence with the second DNA sequence so far
+    def get_score(self):
+        return self.get_score_and_final_action()[0]
+
+    # Function that aligns the DNA sequences so far, returning the same triple as the pairwise_alignment function of
+    # dp_bonus_2.py
+    def pairwise_alignment(self):
+        alignment_result = self.alignment_result()
+
+        return str(alignment_result), alignment_result.score, alignment_result.get_actions()
+
+    # Function that traces the optimal actions back from the final action in the last cell of the columns so far, returning
+    # an AlignmentResult
+    def alignment_result(self):
+        score, action = self.get_score_and_final_action()
+        actions = []
+        if action is not None:
+            i = len(self.indices_1)
+            j = self.dna_size_2
+
+            # Stop at the match that starts the alignment in the first cell
+            while action != "match" or (i != 0 and j != 0):
+                actions.append(action)
+                previous_action = dp_bonus_2.ACTIONS[(self.direction_columns[j][i] >> dp_bonus_2.DIRECTION_SHIFTS[action]) & 3]
+                if action != "insertion":
+                    i -= 1
+                if action != "deletion":
+                    j -= 1
+                action = previous_action
+            actions.reverse()
+
+        return AlignmentResult(self.dna_sequence_1, self.dna_sequence_2, score, actions)
+
+
+# Append codes to a buffer that holds the given number of codes, doubling the buffer until they fit so that appending one
+# term at a time takes amortized constant time
+def append_codes(buffer, size, codes):
+    if size + len(codes) > len(buffer):
+        capacity = len(buffer)
+        while capacity < size + len(codes):
+            capacity *= 2
+        grown_buffer = np.empty(capacity, dtype=np.uint8)
+        grown_buffer[:size] = buffer[:size]
+        buffer = grown_buffer
+    buffer[size:][: len(codes)] = codes
+    return buffer
@@ -0,0 +1,98 @@
+import numpy as np
+
+from dp_sequence import DNA_ALPHABET, DnaSequence
+
+
+# Class Definition for a prefilter that bounds the score of the linear gap model of dp.py from the edit distance, when the
+# sigma array has one pair score on its diagonal and one non-pair score everywhere else like the one built in main()
+class EditDistancePrefilter:
+    # Init function that checks the shape of the sigma array and globalizes the cost of a mismatch and of a gap, which are
+    # what each edit takes off the score of matching every term
+    def __init__(self, sigma_array: np.array, delta: int):
+        sigma_array = np.asarray(sigma_array)
+        pair_scores = np.diagonal(sigma_array)
+        non_pair_scores = sigma_array[~np.eye(len(sigma_array), dtype=bool)]
+        if np.any(pair_scores != pair_scores[0]) or np.any(non_pair_scores != non_pair_scores[0]):
+            raise ValueError("The edit distance prefilter needs one pair score on the diagonal and one non-pair score elsewhere")
+        self.pair_score = pair_scores[0].item()
+        self.mismatch_cost = self.pair_score - non_pair_scores[0].item()
+        self.gap_cost = self.pair_score / 2 - delta
+
+        # With a negative cost, more edits can raise the score, so the edit distance does not bound it
+        if self.mismatch_cost < 0 or self.gap_cost < 0:
+            raise ValueError(
+                "The edit distance prefilter needs a pair score at least the non-pair score and at least twice delta, "
+                f"got cost {self.mismatch_cost} per mismatch and {self.gap_cost} per gap"
+            )
+
+    # Function that decides whether the alignment of the DNA sequences can reach the minimum score, without aligning them
+    def can_reach(self, dna_sequence_1, dna_sequence_2, min_score):
+        return self.get_score_bound(dna_sequence_1, dna_sequence_2) >= min_score
+
+    # Get an upper bound on the score of the alignment of the DNA sequences, which is the score of matching every term less
+    # the cheapest cost of the edits that the edit distance and the difference in length call for
+    def get_score_bound(self, dna_sequence_1, dna_sequence_2):
+        dna_size_1 = len(dna_sequence_1)
+        dna_size_2 = len(dna_sequence_2)
+
+        # Every alignment has at least as many gaps as the difference in length, and at least as many mismatches and gaps
+        # together as the edit distance
+        gap_count = abs(dna_size_1 - dna_size_2)
+        edit_count = max(self.get_edit_distance(dna_sequence_1, dna_sequence_2) - gap_count, 0)
+
+        return (
+            self.pair_score * (dna_size_1 + dna_size_2) / 2
+            - self.gap_cost * gap_count
+            - min(self.mismatch_cost, self.gap_cost) * edit_count
+        )
+
+    # Compute the unit-cost edit distance of the DNA sequences with the bit-vector algorithm of Myers as laid out by Hyyrö,
+    # where the longer DNA sequence is the pattern held in the bits of Python integers, so each operation updates a whole
+    # column of the edit distance matrix 64 cells per machine word
+    def get_edit_distance(self, dna_sequence_1, dna_sequence_2):
+        pattern = DnaSequence(dna_sequence_1).codes
+        text = DnaSequence(dna_sequence_2).codes
+        if len(text) > len(pattern):
+            pattern, text = text, pattern
+        if len(text) == 0:
+            return len(pattern)
+
+        # Bit i of the mask of a term is set where the pattern holds the term, and the vertical differences of the first
+        # column are all +1
+        pattern_masks = self.get_pattern_masks(pattern)
+        all_bits = (1 << len(pattern)) - 1
+        last_bit = 1 << (len(pattern) - 1)
+        positive_vertical = all_bits
+        negative_vertical = 0
+        distance = len(pattern)
+
+        for code in text.tolist():
+            # Find the horizontal differences of the column from the vertical differences of the column before it
+            match_bits = pattern_masks[code]
+            vertical_changes = match_bits | negative_vertical
+            horizontal_changes = (
+                (((match_bits & positive_vertical) + positive_vertical) & all_bits) ^ positive_vertical
+            ) | match_bits
+            positive_horizontal = negative_vertical | (~(horizontal_changes | positive_vertical) & all_bits)
+            negative_horizontal = positive_vertical & horizontal_changes
+
+            # The horizontal difference of the last row moves the distance along the last row
+            if positive_horizontal & last_bit:
+                distance += 1
+            elif negative_horizontal & last_bit:
+                distance -= 1
+
+            # The first row of a global alignment grows by one in every column, which shifts in a +1
+            positive_horizontal = ((positive_horizontal << 1) | 1) & all_bits
+            negative_horizontal = (negative_horizontal << 1) & all_bits
+            positive_vertical = negative_horizontal | (~(vertical_changes | positive_horizontal) & all_bits)
+            negative_vertical = positive_horizontal & vertical_changes
+
+        return distance
+
+    # Get the bit mask of each term of the alphabet over the pattern, with the first term of the pattern in the lowest bit
+    def get_pattern_masks(self, pattern):
+        return [
+            int.from_bytes(np.packbits(pattern == code, bitorder="little").tobytes(), "little")
+            for code in range(len(DNA_ALPHABET))
+        ]
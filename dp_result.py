@@ -0,0 +1,106 @@
+import numpy as np
+
+from dp_sequence import DNA_LETTERS, DnaSequence
+
+# Actions in the order of their codes in the CIGAR operations, along with the SAM letter of each, where the first DNA sequence
+# is the reference and the second is the query, so an insertion adds a query term and a deletion skips a reference term
+CIGAR_ACTIONS = ("match", "insertion", "deletion")
+CIGAR_LETTERS = "MID"
+
+# Number of alignment columns in each block when the alignment is rendered in blocks
+ALIGNMENT_BLOCK_WIDTH = 60
+
+# Byte of a gap in the rendered alignment
+GAP_BYTE = ord("_")
+
+
+# Class Definition for the result of a pairwise alignment, which stores the optimal actions as run-length CIGAR operations
+class AlignmentResult:
+    # Init function that globalizes the DNA sequences and the score, and stores the actions as runs of CIGAR operations, where
+    # a local alignment starts at the given positions of the DNA sequences
+    def __init__(self, dna_sequence_1, dna_sequence_2, score, actions, start_1=0, start_2=0):
+        self.dna_sequence_1 = DnaSequence(dna_sequence_1)
+        self.dna_sequence_2 = DnaSequence(dna_sequence_2)
+        self.score = score
+
+        # Each run is an operation code and the number of consecutive actions with it
+        action_codes = {action: code for code, action in enumerate(CIGAR_ACTIONS)}
+        codes = np.fromiter((action_codes[action] for action in actions), dtype=np.uint8, count=len(actions))
+        run_starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1]))) if len(codes) > 0 else np.zeros(0, int)
+        self.operations = codes[run_starts]
+        self.lengths = np.diff(np.append(run_starts, len(codes)))
+
+        # Column where each run ends, and the positions in the DNA sequences where each run starts, to render any columns
+        self.column_stops = np.cumsum(self.lengths)
+        terms_1 = self.lengths * (self.operations != CIGAR_ACTIONS.index("insertion"))
+        terms_2 = self.lengths * (self.operations != CIGAR_ACTIONS.index("deletion"))
+        self.positions_1 = start_1 + np.cumsum(terms_1) - terms_1
+        self.positions_2 = start_2 + np.cumsum(terms_2) - terms_2
+
+        # Positions in the DNA sequences where the alignment starts and stops
+        self.start_1 = start_1
+        self.start_2 = start_2
+        self.end_1 = start_1 + int(terms_1.sum())
+        self.end_2 = start_2 + int(terms_2.sum())
+
+    # Number of columns in the alignment
+    def __len__(self):
+        return int(self.column_stops[-1]) if len(self.column_stops) > 0 else 0
+
+    # Render the whole alignment as the top row and the bottom row, one after the other on separate lines
+    def __str__(self):
+        top_row, bottom_row = self.get_rows()
+        return top_row + "\n" + bottom_row
+
+    # Get the optimal actions as a list of words
+    def get_actions(self):
+        actions = []
+        for operation, length in zip(self.operations, self.lengths):
+            actions.extend([CIGAR_ACTIONS[operation]] * int(length))
+        return actions
+
+    # Get the SAM CIGAR string of the alignment, which is "*" for an empty alignment
+    def get_cigar(self):
+        if len(self.operations) == 0:
+            return "*"
+        return "".join(f"{length}{CIGAR_LETTERS[operation]}" for operation, length in zip(self.operations, self.lengths))
+
+    # Render the columns of the alignment from start to stop as the top row and the bottom row, in time linear in the number
+    # of columns
+    def get_rows(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return "", ""
+
+        # Find the runs that overlap the columns and expand them to one operation per column
+        first_run = int(np.searchsorted(self.column_stops, start, side="right"))
+        last_run = int(np.searchsorted(self.column_stops - self.lengths, stop, side="left"))
+        run_starts = np.maximum(self.column_stops[first_run:last_run] - self.lengths[first_run:last_run], start)
+        run_stops = np.minimum(self.column_stops[first_run:last_run], stop)
+        column_operations = np.repeat(self.operations[first_run:last_run], run_stops - run_starts)
+
+        # The columns start partway through the first run, which moves the first position along each DNA sequence it uses
+        skipped = start - (self.column_stops[first_run] - self.lengths[first_run])
+        operation = self.operations[first_run]
+        position_1 = self.positions_1[first_run] + (skipped if operation != CIGAR_ACTIONS.index("insertion") else 0)
+        position_2 = self.positions_2[first_run] + (skipped if operation != CIGAR_ACTIONS.index("deletion") else 0)
+
+        top_row = self.render_row(column_operations, CIGAR_ACTIONS.index("insertion"), self.dna_sequence_1, position_1)
+        bottom_row = self.render_row(column_operations, CIGAR_ACTIONS.index("deletion"), self.dna_sequence_2, position_2)
+
+        return top_row, bottom_row
+
+    # Render a row of the alignment, which holds the next term of the DNA sequence in every column except the gaps
+    def render_row(self, column_operations, gap_operation, dna_sequence, position):
+        terms = column_operations != gap_operation
+        row = np.full(len(column_operations), GAP_BYTE, dtype=np.uint8)
+        row[terms] = DNA_LETTERS[dna_sequence.codes[position:][: np.count_nonzero(terms)]]
+        return row.tobytes().decode("ascii")
+
+    # Render the alignment in blocks of a fixed number of columns, yielding the top row and the bottom row of each block, so a
+    # long alignment is never rendered whole
+    def iter_blocks(self, width=ALIGNMENT_BLOCK_WIDTH):
+        if width < 1:
+            raise ValueError(f"Block width must be at least 1, got {width}")
+        for start in range(0, len(self), width):
+            yield self.get_rows(start, start + width)
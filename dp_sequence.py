@@ -0,0 +1,103 @@
+import hashlib
+
+import numpy as np
+
+from dp_cache import BoundedCache
+
+# Terms of a DNA sequence, in the order of the rows and columns of the sigma array, so the code of each term is its index
+DNA_ALPHABET = "ACGT"
+
+# Term of each code, as the bytes of its letter
+DNA_LETTERS = np.frombuffer(DNA_ALPHABET.encode("ascii"), dtype=np.uint8)
+
+# Code of each byte, where the bytes that are not DNA terms have the code 255
+DNA_CODES = np.full(256, 255, dtype=np.uint8)
+DNA_CODES[DNA_LETTERS] = np.arange(len(DNA_ALPHABET))
+
+# Bit shift of each of the four terms packed into a byte, where the first term takes the lowest two bits
+DNA_PACKED_SHIFTS = np.arange(0, 8, 2, dtype=np.uint8)
+
+# Number of sigma profiles kept for the alignments that reuse a DNA sequence and sigma array
+SIGMA_PROFILE_CACHE_SIZE = 32
+
+# Recent sigma profiles, keyed by the sigma array and a digest of the codes of the DNA sequence
+sigma_profile_cache = BoundedCache(SIGMA_PROFILE_CACHE_SIZE, "lru")
+
+
+# Class Definition for a DNA sequence stored as a NumPy array with one code from 0 to 3 per term
+class DnaSequence:
+    # Init function that encodes a string or list of DNA terms, or wraps a uint8 array of codes or another DNA sequence
+    # without copying it
+    def __init__(self, dna_sequence):
+        if isinstance(dna_sequence, DnaSequence):
+            self.codes = dna_sequence.codes
+        elif isinstance(dna_sequence, np.ndarray):
+            if dna_sequence.dtype != np.uint8 or dna_sequence.ndim != 1:
+                raise ValueError(f"DNA sequence codes must be a 1D uint8 array, got {dna_sequence.ndim}D {dna_sequence.dtype}")
+            self.codes = dna_sequence
+        else:
+            terms = "".join(dna_sequence).encode("ascii", errors="replace")
+            self.codes = DNA_CODES[np.frombuffer(terms, dtype=np.uint8)]
+            if len(self.codes) > 0 and self.codes.max() == 255:
+                raise ValueError(f"DNA sequence has a term that is not one of {', '.join(DNA_ALPHABET)}")
+
+    def __len__(self):
+        return len(self.codes)
+
+    # Get a term as its letter, or a slice as a DNA sequence that shares the codes
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return DnaSequence(self.codes[key])
+        return DNA_ALPHABET[self.codes[key]]
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __str__(self):
+        return DNA_LETTERS[self.codes].tobytes().decode("ascii")
+
+    def __repr__(self):
+        return f"DnaSequence({str(self)!r})"
+
+    # Pack the codes into two bits each, four terms per byte, where the last byte is padded with the code 0
+    def pack(self):
+        padded_codes = np.zeros(-(-len(self.codes) // 4) * 4, dtype=np.uint8)
+        padded_codes[: len(self.codes)] = self.codes
+        return np.bitwise_or.reduce(padded_codes.reshape(-1, 4) << DNA_PACKED_SHIFTS, axis=1).astype(np.uint8)
+
+
+# Unpack the codes of a DNA sequence of the given length from the packed bytes
+def unpack_dna_sequence(packed_codes, dna_size):
+    codes = (np.asarray(packed_codes, dtype=np.uint8)[:, None] >> DNA_PACKED_SHIFTS) & 3
+    return DnaSequence(codes.ravel()[:dna_size])
+
+
+# Save the codes of a DNA sequence as a .npy file, which can be memory-mapped when it is loaded
+def save_dna_sequence(path, dna_sequence):
+    np.save(path, DnaSequence(dna_sequence).codes)
+
+
+# Load a DNA sequence saved with save_dna_sequence, memory-mapping the codes instead of reading them into memory
+def load_dna_sequence(path):
+    return DnaSequence(np.load(path, mmap_mode="r"))
+
+
+# Get the sigma profile of a DNA sequence, where row a holds the sigma value of the term with code a against each term of
+# the DNA sequence, so a whole row of sigma values is looked up at once; the profile is cached and shared by the alignments
+# that reuse the same DNA sequence and sigma array, so it must not be modified
+def get_sigma_profile(sigma_array, dna_sequence):
+    sigma_array = np.asarray(sigma_array)
+    codes = DnaSequence(dna_sequence).codes
+    key = (
+        sigma_array.dtype.str,
+        sigma_array.shape,
+        sigma_array.tobytes(),
+        hashlib.blake2b(np.ascontiguousarray(codes), digest_size=16).digest(),
+    )
+    sigma_profile = sigma_profile_cache.get(key)
+    if sigma_profile is None:
+        sigma_profile = np.take(sigma_array, codes, axis=1)
+        sigma_profile.flags.writeable = False
+        sigma_profile_cache.put(key, sigma_profile)
+
+    return sigma_profile
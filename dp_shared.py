@@ -0,0 +1,175 @@
+import itertools
+
+import numpy as np
+
+from dp_memory import PeakMemory
+from dp_result import AlignmentResult
+
+# Number of lanes in the striped layout of the query, as many as 16-bit scores in a 256-bit vector register
+STRIPED_LANES = 16
+
+# Integer data types the striped engine works in, from the narrowest to the widest
+STRIPED_DTYPES = (np.int16, np.int32, np.int64)
+
+
+# Get a score far below any reachable score, used for cells that are not computed or where an action is impossible, which is
+# a quarter of the integer range so that adding scores to it cannot overflow
+def get_impossible_score(dtype):
+    if np.issubdtype(dtype, np.floating):
+        return -np.inf
+    return np.iinfo(dtype).min // 4
+
+
+# Get the most the rest of the DNA sequences can add to an alignment, with the given numbers of terms left in each, where every
+# pair of terms left adds at most the match score and every other term at most the gap score
+def get_rest_bound(rows_left, columns_left, match_score, gap_score):
+    match_count = np.minimum(columns_left, rows_left)
+    return match_count * match_score + (columns_left + rows_left - 2 * match_count) * gap_score
+
+
+# Get the data type that holds every score of the linear gap model, which is a float if sigma or delta are floats
+def get_linear_score_dtype(sigma_array, delta):
+    return np.result_type(np.asarray(sigma_array), delta)
+
+
+# Compute the score of every number of consecutive insertions of the linear gap model, which is also the first row of the
+# score matrix
+def get_linear_gap_offsets(sigma_array, delta, dna_size):
+    return delta * np.arange(dna_size + 1, dtype=get_linear_score_dtype(sigma_array, delta))
+
+
+# Trace the optimal actions back from the last cell of a score matrix of the linear gap model, breaking ties in the same order
+# as the recursion of dp.py
+def get_linear_actions_from_score_matrix(score_matrix, indices_1, indices_2, sigma_array, delta):
+    sigma_array = np.asarray(sigma_array)
+    actions = []
+    i = len(indices_1)
+    j = len(indices_2)
+    while i != 0 and j != 0:
+        # Recompute the value of each action into the current cell
+        deletion = score_matrix[i - 1, j] + delta
+        insertion = score_matrix[i, j - 1] + delta
+        match = score_matrix[i - 1, j - 1] + sigma_array[indices_1[i - 1], indices_2[j - 1]]
+        max_value = max(deletion, insertion, match)
+
+        # Prioritize match actions, then insertion actions, then deletion actions
+        if match == max_value:
+            actions.append("match")
+            i -= 1
+            j -= 1
+        elif insertion == max_value:
+            actions.append("insertion")
+            j -= 1
+        else:
+            actions.append("deletion")
+            i -= 1
+
+    # Add the base case actions for the remaining terms and put the actions in order
+    actions.extend(["deletion"] * i)
+    actions.extend(["insertion"] * j)
+    actions.reverse()
+
+    return actions
+
+
+# Get the value at the previous query position for every position of a striped column, which is the segment before it in the
+# same lane, or the last segment of the lane before it for the first segment
+def get_previous_positions(column, first_value):
+    previous_positions = np.empty_like(column)
+    previous_positions[1:] = column[:-1]
+    previous_positions[0, 1:] = column[-1, :-1]
+    previous_positions[0, 0] = first_value
+
+    return previous_positions
+
+
+# Chain the gaps down each lane of a striped column, which is a running maximum once the segment offsets are taken out
+def chain_striped_gaps(column, segment_offsets):
+    column -= segment_offsets
+    np.maximum.accumulate(column, axis=0, out=column)
+    column += segment_offsets
+
+
+# Put the values of the query positions in striped order, padding the last lanes with zeros
+def get_striped_values(values, segment_length):
+    striped_values = np.zeros(STRIPED_LANES * segment_length, dtype=values.dtype)
+    striped_values[: len(values)] = values
+
+    return np.ascontiguousarray(striped_values.reshape(STRIPED_LANES, segment_length).T)
+
+
+# Get the narrowest striped data type, at least as wide as the current one, that holds scores of the given magnitude a quarter
+# of its range away from overflowing; float scores keep their data type
+def get_striped_dtype(magnitude, dtype):
+    if np.issubdtype(dtype, np.floating):
+        return np.dtype(dtype)
+    for striped_dtype in STRIPED_DTYPES:
+        if np.dtype(striped_dtype).itemsize >= np.dtype(dtype).itemsize and magnitude < np.iinfo(striped_dtype).max // 4:
+            return np.dtype(striped_dtype)
+
+    return np.dtype(STRIPED_DTYPES[-1])
+
+
+# Chain gaps along part of a row, where each value is the best of its own value and the value before it plus the gap, and the
+# value before the first is given; a blocked value is held at the blocked value and the chain starts over from it
+def chain_local_gaps(values, first_value, gap, blocked, blocked_value):
+    values = values.copy()
+    values[blocked] = blocked_value
+    segment_start = 0
+    for segment_stop in [*np.flatnonzero(blocked), len(values)]:
+        # Each segment between blocked values is a running maximum once the gap offsets are taken out
+        if segment_stop > segment_start:
+            segment = values[segment_start:segment_stop]
+            gap_offsets = gap * np.arange(1, len(segment) + 1, dtype=values.dtype)
+            values[segment_start:segment_stop] = (
+                np.maximum(np.maximum.accumulate(segment - gap_offsets), first_value) + gap_offsets
+            )
+        first_value = blocked_value
+        segment_start = segment_stop + 1
+
+    return values
+
+
+# Class Definition for the functions that turn the scores and actions of an engine into AlignmentResults, shared by the
+# PairwiseAlignment classes of dp.py and dp_bonus_2.py, which hold the DNA sequences, track_memory, and stats, and run the
+# engines through get_score_and_actions and iter_local_alignments
+class AlignmentResultMethods:
+    # Function that aligns the DNA sequences, returning an AlignmentResult that stores the optimal actions as run-length CIGAR
+    # operations and renders the alignment lazily
+    def alignment_result(self):
+        # Get the actions to produce the optimal alignment and the corresponding score, measuring the peak memory if asked
+        self.stats = {}
+        if self.track_memory:
+            with PeakMemory() as peak_memory:
+                score, actions = self.get_score_and_actions()
+            self.stats["peak_memory_bytes"] = peak_memory.peak_bytes
+        else:
+            score, actions = self.get_score_and_actions()
+
+        # A local alignment starts at the cell its traceback stopped at
+        start_1, start_2 = self.stats.get("local_start", (0, 0))
+
+        return AlignmentResult(self.dna_sequence_1, self.dna_sequence_2, score, actions, start_1, start_2)
+
+    # Function that finds the best local alignment like Smith-Waterman, where every cell can start an alignment with a score
+    # of zero, and reports the best cell along with the cell where the alignment starts
+    def get_score_and_actions_from_local(self):
+        for score, actions, start_cell, best_cell in self.iter_local_alignments():
+            self.stats["local_start"] = start_cell
+            self.stats["best_cell"] = best_cell
+            return score, actions
+
+        # Without a cell above zero, the best local alignment is empty
+        self.stats["local_start"] = (0, 0)
+        self.stats["best_cell"] = (0, 0)
+        return self.get_score_dtype().type(0), []
+
+    # Function that finds up to count local alignments from the best one down like Waterman-Eggert, where no two of them
+    # align the same cell; after each one, only the part of the score matrix that depends on its cells is filled again
+    def local_alignment_results(self, count):
+        self.stats = {}
+        results = []
+        for score, actions, start_cell, _ in itertools.islice(self.iter_local_alignments(), count):
+            results.append(AlignmentResult(self.dna_sequence_1, self.dna_sequence_2, score, actions, *start_cell))
+
+        return results
@@ -0,0 +1,225 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from dp import PairwiseAlignment
+
+# Largest number of pairs waiting on the alignment workers for each worker
+STREAM_PENDING_PER_WORKER = 4
+
+# Columns of the TSV results, which are also the keys of the JSON-lines results
+STREAM_RESULT_FIELDS = ("name_1", "name_2", "score", "cigar", "alignment_1", "alignment_2")
+
+# A record of a FASTA or FASTQ file, along with the byte offset of its header in the uncompressed file
+SequenceRecord = namedtuple("SequenceRecord", ["name", "sequence", "offset"])
+
+
+# Function that aligns the pairs of records in two FASTA or FASTQ files and writes the results as they finish
+def main():
+    # Parse the input files, the pairing, the scoring, and the output format
+    parser = argparse.ArgumentParser(description="Align the pairs of records in two FASTA or FASTQ files, which may be gzipped")
+    parser.add_argument("sequences_1", help="FASTA or FASTQ file of the first DNA sequences")
+    parser.add_argument("sequences_2", help="FASTA or FASTQ file of the second DNA sequences")
+    parser.add_argument("--pairs", help="TSV file of record name pairs to align, instead of pairing the records by index")
+    parser.add_argument("--format", choices=["tsv", "jsonl"], default="tsv", help="format of the results")
+    parser.add_argument("--delta", type=int, default=3)
+    parser.add_argument("--pair-score", type=int, default=10)
+    parser.add_argument("--non-pair-score", type=int, default=7)
+    parser.add_argument("--engine", default="table")
+    parser.add_argument("--score-only", action="store_true", help="only compute the scores, without the alignments")
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    # Build the sigma array like dp.py does and stream the results to the standard output
+    sigma = np.full((4, 4), arguments.non_pair_score)
+    np.fill_diagonal(sigma, arguments.pair_score)
+    if arguments.pairs is None:
+        record_pairs = pair_records_by_index(arguments.sequences_1, arguments.sequences_2)
+    else:
+        record_pairs = pair_records_from_file(arguments.pairs, arguments.sequences_1, arguments.sequences_2)
+    results = align_record_pairs(
+        record_pairs, (sigma, arguments.delta), arguments.engine, arguments.score_only, arguments.workers
+    )
+    write_results(results, sys.stdout, arguments.format, sys.stderr)
+
+
+# Open a FASTA or FASTQ file for reading bytes, decompressing it if it starts with the gzip magic number
+def open_sequence_file(path):
+    with open(path, "rb") as handle:
+        magic_number = handle.read(2)
+    if magic_number == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+# Open a FASTA or FASTQ file for reading bytes at any offset, where a gzipped file is decompressed once into a temporary file,
+# since seeking back in a gzipped file decompresses it again from the start
+def open_seekable_sequence_file(path):
+    handle = open_sequence_file(path)
+    if not isinstance(handle, gzip.GzipFile):
+        return handle
+    with handle:
+        seekable_handle = tempfile.TemporaryFile()
+        shutil.copyfileobj(handle, seekable_handle)
+    seekable_handle.seek(0)
+    return seekable_handle
+
+
+# Read the records of a FASTA or FASTQ file one at a time, so that only the current record is held in memory
+def read_sequence_records(path):
+    with open_sequence_file(path) as handle:
+        yield from parse_sequence_records(handle)
+
+
+# Parse the records of an open FASTA or FASTQ file from its current position, which is the byte offset given
+def parse_sequence_records(handle, offset=0):
+    name = None
+    sequence_lines = []
+    record_offset = offset
+    for line in handle:
+        line_offset = offset
+        offset += len(line)
+        line = line.strip()
+        if len(line) == 0:
+            continue
+
+        # A FASTA header ends the record before it
+        if line.startswith(b">"):
+            if name is not None:
+                yield SequenceRecord(name, b"".join(sequence_lines).decode("ascii").upper(), record_offset)
+            name = line[1:].split(maxsplit=1)[0].decode() if len(line) > 1 else ""
+            sequence_lines = []
+            record_offset = line_offset
+
+        # A FASTQ record is a header, the sequence, a separator, and the qualities, which are skipped
+        elif line.startswith(b"@") and name is None:
+            sequence = handle.readline()
+            separator = handle.readline()
+            qualities = handle.readline()
+            offset += len(sequence) + len(separator) + len(qualities)
+            if not separator.startswith(b"+"):
+                raise ValueError(f"FASTQ record at byte {line_offset} has no '+' separator line")
+            yield SequenceRecord(line[1:].split(maxsplit=1)[0].decode(), sequence.strip().decode("ascii").upper(), line_offset)
+
+        # Any other line is part of the sequence of a FASTA record
+        elif name is not None:
+            sequence_lines.append(line)
+        else:
+            raise ValueError(f"Line at byte {line_offset} is not part of a FASTA or FASTQ record")
+
+    # The last FASTA record ends with the file
+    if name is not None:
+        yield SequenceRecord(name, b"".join(sequence_lines).decode("ascii").upper(), record_offset)
+
+
+# Read the record of a FASTA or FASTQ file that starts at a byte offset
+def read_sequence_record_at(handle, offset):
+    handle.seek(offset)
+    return next(parse_sequence_records(handle, offset))
+
+
+# Pair the records of two FASTA or FASTQ files by their index, streaming both files together
+def pair_records_by_index(path_1, path_2):
+    yield from zip(read_sequence_records(path_1), read_sequence_records(path_2), strict=True)
+
+
+# Pair the records of two FASTA or FASTQ files by the names on each line of a TSV pairs file, where only the offsets of the
+# records are held in memory and each record is read again from its offset when it is paired
+def pair_records_from_file(pairs_path, path_1, path_2):
+    handle_1 = open_seekable_sequence_file(path_1)
+    handle_2 = open_seekable_sequence_file(path_2)
+    with open(pairs_path) as pairs, handle_1, handle_2:
+        offsets_1 = {record.name: record.offset for record in parse_sequence_records(handle_1)}
+        offsets_2 = {record.name: record.offset for record in parse_sequence_records(handle_2)}
+        for line_number, line in enumerate(pairs, start=1):
+            names = line.split()
+            if len(names) == 0:
+                continue
+            if len(names) != 2:
+                raise ValueError(f"Line {line_number} of {pairs_path} does not hold two record names")
+            if names[0] not in offsets_1 or names[1] not in offsets_2:
+                raise ValueError(f"Line {line_number} of {pairs_path} names a record that is not in the sequence files")
+            yield read_sequence_record_at(handle_1, offsets_1[names[0]]), read_sequence_record_at(handle_2, offsets_2[names[1]])
+
+
+# Align a stream of record pairs on a pool of worker processes, yielding the results as they finish, where at most a few
+# pairs per worker wait in the queue so that the stream is never read far ahead of the alignments
+def align_record_pairs(record_pairs, scoring, engine="table", score_only=False, max_workers=None, max_pending=None):
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = STREAM_PENDING_PER_WORKER * max_workers
+    with ProcessPoolExecutor(max_workers) as executor:
+        pending = set()
+        for record_1, record_2 in record_pairs:
+            # Wait for a result to finish once the queue is full
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+            pending.add(executor.submit(align_record_pair, record_1, record_2, scoring, engine, score_only))
+
+        # Drain the queue once every pair was read
+        while len(pending) > 0:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+
+# Align a pair of records in a worker process, where the scoring is the pair of the sigma array and delta; a record with a
+# term other than A, C, G or T gives a result that only holds the names and the error, so the rest of the stream goes on
+def align_record_pair(record_1, record_2, scoring, engine, score_only):
+    sigma_array, delta = scoring
+    try:
+        pairwise_alignment = PairwiseAlignment(sigma_array, delta, record_1.sequence, record_2.sequence, engine=engine)
+    except ValueError as error:
+        return {"name_1": record_1.name, "name_2": record_2.name, "error": str(error)}
+    if score_only:
+        score = pairwise_alignment.score_only()
+        cigar, alignment_1, alignment_2 = "*", "", ""
+    else:
+        alignment_result = pairwise_alignment.alignment_result()
+        score = alignment_result.score
+        cigar = alignment_result.get_cigar()
+        alignment_1, alignment_2 = alignment_result.get_rows()
+
+    return {
+        "name_1": record_1.name,
+        "name_2": record_2.name,
+        "score": score.item() if isinstance(score, np.generic) else score,
+        "cigar": cigar,
+        "alignment_1": alignment_1,
+        "alignment_2": alignment_2,
+    }
+
+
+# Write each result as soon as it arrives, as a TSV line with a header or as a JSON line, where a pair that could not be
+# aligned is skipped and reported on the error handle if one is given
+def write_results(results, handle, output_format="tsv", error_handle=None):
+    if output_format not in ("tsv", "jsonl"):
+        raise ValueError(f"Unknown output format {output_format!r}, expected 'tsv' or 'jsonl'")
+    if output_format == "tsv":
+        handle.write("\t".join(STREAM_RESULT_FIELDS) + "\n")
+    for result in results:
+        if "error" in result:
+            if error_handle is not None:
+                error_handle.write(f"Skipped {result['name_1']} and {result['name_2']}: {result['error']}\n")
+                error_handle.flush()
+            continue
+        if output_format == "tsv":
+            handle.write("\t".join(str(result[field]) for field in STREAM_RESULT_FIELDS) + "\n")
+        else:
+            handle.write(json.dumps(result) + "\n")
+        handle.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from dp import DIRECTION_ACTIONS, PairwiseAlignment
+from dp_sequence import get_sigma_profile
+
+
+# Class Definition for aligning many queries against one target with the linear gap model of dp.py, where the queries are
+# walked as a trie so that the rows of the score matrix for a prefix shared by several queries are computed once
+class TrieBatchAlignment:
+    # Init function that globalizes the delta, sigma_array, queries, target, and whether to trace the actions back
+    def __init__(self, sigma_array: np.array, delta: int, queries: list, target: str, traceback: bool = False):
+        self.delta = delta
+        self.sigma_array = sigma_array
+        self.queries = list(queries)
+        self.target = target
+        self.traceback = traceback
+        self.stats = {}
+
+        # The pairwise alignment of the target holds the scoring helpers and the traceback of the table engine
+        self.target_alignment = PairwiseAlignment(sigma_array, delta, "", target, engine="table")
+
+    # Function that aligns every query against the target, returning the scores in the order of the queries, along with the
+    # actions for each query if the traceback was asked for
+    def batch_alignment(self):
+        query_indices = [self.target_alignment.get_sigma_indices(query) for query in self.queries]
+        target_indices = self.target_alignment.get_sigma_indices(self.target)
+        sigma_rows = get_sigma_profile(self.sigma_array, target_indices)
+        gap_offsets = self.target_alignment.get_gap_offsets(len(target_indices))
+
+        # Walking the queries in sorted order visits the trie of the queries depth first, where the depth a query shares
+        # with the query before it is the length of their common prefix
+        order = sorted(range(len(query_indices)), key=lambda query: query_indices[query].tobytes())
+        max_depth = max((len(indices) for indices in query_indices), default=0)
+
+        # Keep one score row per depth of the trie, along with one row of packed directions per depth if the actions are
+        # traced back, where the first row is the recursive base case
+        score_rows = np.empty((max_depth + 1, len(target_indices) + 1), dtype=gap_offsets.dtype)
+        score_rows[0] = gap_offsets
+        direction_rows = None
+        if self.traceback:
+            direction_rows = np.empty((max_depth + 1, -(-(len(target_indices) + 1) // 4)), dtype=np.uint8)
+            directions = np.full(len(target_indices) + 1, DIRECTION_ACTIONS.index("insertion"), dtype=np.uint8)
+            directions[0] = DIRECTION_ACTIONS.index("deletion")
+            direction_rows[0] = self.target_alignment.pack_directions(directions, direction_rows.shape[1])
+
+        scores = np.empty(len(query_indices), dtype=gap_offsets.dtype)
+        actions = [None] * len(query_indices) if self.traceback else None
+        self.stats = {"cells_computed": 0, "shared_cells": 0}
+        previous_indices = np.zeros(0, dtype=np.uint8)
+        for query in order:
+            indices = query_indices[query]
+
+            # Go back up the trie to the common prefix, then down along the rest of the query
+            depth = get_common_prefix_length(previous_indices, indices)
+            self.stats["shared_cells"] += depth * score_rows.shape[1]
+            for i in range(depth + 1, len(indices) + 1):
+                sigma_row = sigma_rows[indices[i - 1]]
+                score_rows[i] = self.target_alignment.get_next_score_row(score_rows[i - 1], sigma_row, gap_offsets)
+                if self.traceback:
+                    directions = self.target_alignment.get_directions(score_rows[i - 1], score_rows[i], sigma_row)
+                    direction_rows[i] = self.target_alignment.pack_directions(directions, direction_rows.shape[1])
+            self.stats["cells_computed"] += (len(indices) - depth) * score_rows.shape[1]
+            depth = len(indices)
+            previous_indices = indices
+
+            # The score of the query is in the last cell of the row at its depth
+            scores[query] = score_rows[depth, -1]
+            if self.traceback:
+                actions[query] = self.target_alignment.get_actions_from_direction_matrix(
+                    direction_rows, depth, len(target_indices)
+                )
+
+        return scores, actions
+
+
+# Get the number of terms at the start of two arrays of sigma array indices that are the same
+def get_common_prefix_length(indices_1, indices_2):
+    size = min(len(indices_1), len(indices_2))
+    differences = np.flatnonzero(indices_1[:size] != indices_2[:size])
+    return int(differences[0]) if len(differences) > 0 else size